@@ -36,17 +36,14 @@ except Exception as e:
     st.error(f"⚠️ Configuration Error: {e}")
     st.stop()
 
-@st.cache_resource
-def get_chat_service():
-    """Initialize chat service"""
-    return ChatService()
-
 # ============================================================================
 # SESSION STATE
 # ============================================================================
 
+# One ChatService per browser session (clients and connection pools are
+# shared process-wide by the ClientRegistry)
 if "chat_service" not in st.session_state:
-    st.session_state.chat_service = get_chat_service()
+    st.session_state.chat_service = ChatService()
     st.session_state.conversation_ended = False
 
 # ============================================================================
@@ -69,10 +66,14 @@ with st.sidebar:
     with col2:
         st.metric("Tokens", int(metrics['tokens']))
     st.metric("Est. Cost", f"${metrics['cost']:.6f}")
+    st.metric("Prompt Cache Hit Rate", f"{metrics['cache_hit_rate']:.0%}")
+    st.metric("Context Tokens", f"~{metrics['context_tokens']:,}",
+              help="Local estimate of the history sent with the next message")
     
     st.markdown("---")
     
     if st.button("🔄 New Conversation", use_container_width=True):
+        st.session_state.chat_service.close()
         st.session_state.chat_service = ChatService()
         st.session_state.conversation_ended = False
         st.rerun()
@@ -136,10 +137,20 @@ if st.session_state.conversation_ended:
     
     st.info("💬 **Ready for your next conversation?** Click 'New Conversation' in the sidebar to start fresh!")
 
+# Live per-message sentiment trend
+sentiment_history = st.session_state.chat_service.chatbot.get_sentiment_history()
+if sentiment_history:
+    with st.expander("📈 Live Sentiment Trend", expanded=True):
+        st.plotly_chart(ChartBuilder.create_sentiment_chart(sentiment_history), use_container_width=True)
+
 # Display chat messages
 for message in st.session_state.chat_service.chatbot.conversation_history:
     with st.chat_message("user", avatar="👤"):
         st.write(message['user_message'])
+        sentiment = message.get('sentiment')
+        if sentiment:
+            st.caption(f"{SentimentUtils.get_emoji(sentiment['score'])} "
+                       f"{sentiment['classification']} ({sentiment['score']:+.2f})")
     
     with st.chat_message("assistant", avatar="🤖"):
         st.write(message['bot_response'])
@@ -151,22 +162,20 @@ if not st.session_state.conversation_ended:
         with st.chat_message("user", avatar="👤"):
             st.write(prompt)
         
-        # Get bot response
-        with st.spinner("🤖 Thinking..."):
-            response = st.session_state.chat_service.send_message(prompt)
-        
-        # Display bot response
+        # Stream bot response as it is generated
         with st.chat_message("assistant", avatar="🤖"):
-            st.write(response['response'])
+            st.write_stream(st.session_state.chat_service.stream_message(prompt))
         
         # Check if conversation ended
         if not st.session_state.chat_service.chatbot.chat_active:
+            st.session_state.chat_service.end_conversation()
             st.session_state.conversation_ended = True
             st.rerun()
         else:
             st.rerun()
 else:
     if st.button("🔄 Start New Chat", type="primary", use_container_width=True):
+        st.session_state.chat_service.close()
         st.session_state.chat_service = ChatService()
         st.session_state.conversation_ended = False
         st.rerun()
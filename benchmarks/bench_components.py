@@ -0,0 +1,247 @@
+"""
+Component microbenchmarks, fully offline
+
+Runs against FakeOpenAI and MemoryMongoClient (see benchmarks.fakes), so no
+API key or database is needed:
+
+- build_messages: request history build at several history sizes (cold: a
+  fresh context window every call; incremental: one new turn per call)
+- parse_response: _clean_json_response + json.loads on plain and fenced
+  replies, with and without a conversation summary
+- send_message: one whole turn against a zero-latency backend
+- save_complete_conversation / get_statistics on the in-memory store
+- ConsoleDisplay rendering paths (output discarded)
+
+Results are written as JSON; pass a previous results file with --compare to
+list benchmarks that got slower.
+    
+    python -m benchmarks.bench_components --output results.json
+    python -m benchmarks.bench_components --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from database import DatabaseManager
+from src.core.chatbot import SentimentChatbot
+from src.core.context import ContextWindow
+from src.ui.display import ConsoleDisplay
+from .fakes import FakeOpenAI, MemoryMongoClient, canned_summary
+
+HISTORY_SIZES = [10, 100, 1000]
+CONVERSATION_SIZES = [10, 100]
+ROUNDS = 5
+
+
+def _make_turn(i: int) -> Dict:
+    return {
+        'user_message': f"Message {i}: my card payment failed again, can you check it?",
+        'bot_response': f"Reply {i}: I'm sorry about that. Let me look into the payment for you.",
+        'timestamp': datetime.utcnow().isoformat(),
+        'sentiment': {'score': -0.4, 'classification': 'negative', 'confidence': 'medium'}
+    }
+
+
+def measure(name: str, fn: Callable[[], object], repeats: int, **params) -> Dict:
+    """
+    Time fn over ROUNDS rounds of repeats calls
+    
+    Returns:
+        Result row with per-call times in microseconds (the minimum round is
+        the least disturbed by other load and the one to compare)
+    """
+    fn()  # warm up
+    per_call = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        per_call.append((time.perf_counter() - start) / repeats * 1e6)
+    return {
+        "name": name,
+        "params": params,
+        "repeats": repeats,
+        "min_us": min(per_call),
+        "median_us": statistics.median(per_call),
+        "mean_us": statistics.mean(per_call),
+        "stdev_us": statistics.stdev(per_call)
+    }
+
+
+def bench_build_messages(chatbot: SentimentChatbot) -> List[Dict]:
+    """_build_messages at several history sizes"""
+    results = []
+    for size in HISTORY_SIZES:
+        chatbot.conversation_history = [_make_turn(i) for i in range(size)]
+        
+        def cold():
+            chatbot.context = ContextWindow()
+            chatbot._build_messages()
+        
+        def incremental():
+            chatbot.conversation_history.append(_make_turn(len(chatbot.conversation_history)))
+            chatbot._build_messages()
+        
+        repeats = max(2000 // size, 5)
+        results.append(measure("build_messages.cold", cold, repeats, history_turns=size))
+        chatbot.context = ContextWindow()
+        chatbot._build_messages()
+        results.append(measure("build_messages.incremental", incremental, repeats, history_turns=size))
+    chatbot.conversation_history = []
+    chatbot.context = ContextWindow()
+    return results
+
+
+def bench_parse_response(chatbot: SentimentChatbot) -> List[Dict]:
+    """_clean_json_response + json.loads on representative replies"""
+    plain = json.dumps({"response": "Thanks for the details, " + "noted " * 40})
+    summary = json.dumps({"response": "Goodbye!", "conversation_summary": canned_summary(10)})
+    replies = {
+        "plain": plain,
+        "fenced": f"```json\n{plain}\n```",
+        "summary": summary,
+        "summary_fenced": f"```json\n{summary}\n```"
+    }
+    return [
+        measure("parse_response", lambda text=text: json.loads(chatbot._clean_json_response(text)),
+                20000, reply=kind)
+        for kind, text in replies.items()
+    ]
+
+
+def bench_send_message(chatbot: SentimentChatbot) -> List[Dict]:
+    """One turn through SentimentChatbot against a zero-latency backend"""
+    chatbot.response_cache = None  # every turn reaches the backend
+    
+    def turn():
+        chatbot.send_message("My card payment failed again, can you check it?")
+        if len(chatbot.conversation_history) >= 50:
+            chatbot.conversation_history.clear()
+            chatbot.context = ContextWindow()
+    
+    return [measure("send_message", turn, 500, backend_latency_s=0.0)]
+
+
+def bench_database(db: DatabaseManager) -> List[Dict]:
+    """save_complete_conversation and get_statistics on the in-memory store"""
+    results = []
+    summary = canned_summary(10)
+    for size in CONVERSATION_SIZES:
+        messages = [_make_turn(i) for i in range(size)]
+        results.append(measure(
+            "save_complete_conversation",
+            lambda: db.save_complete_conversation("bench-user", messages, summary, datetime.utcnow()),
+            max(2000 // size, 20), turns=size
+        ))
+    results.append(measure("get_statistics", db.get_statistics, 5000))
+    return results
+
+
+def bench_display() -> List[Dict]:
+    """ConsoleDisplay rendering paths"""
+    response = {"response": "Thanks for the details, " + "noted " * 40}
+    final = dict(response, conversation_summary=canned_summary(10))
+    sentiment = {"score": -0.4, "classification": "negative", "confidence": "medium"}
+    stats = {"total_conversations": 1200, "total_messages": 9800, "average_sentiment": 0.12}
+    cost = {
+        "input_tokens": 12000, "cached_input_tokens": 8000, "output_tokens": 900,
+        "total_tokens": 12900, "cache_hit_rate": 0.66, "input_cost": 0.0012,
+        "cached_input_cost": 0.0004, "uncached_input_cost": 0.0008,
+        "output_cost": 0.0005, "total_cost": 0.0017, "compaction_saved_tokens": 300
+    }
+    chunks = response["response"].split(" ")
+    cases = {
+        "response": lambda: ConsoleDisplay.display_response(response),
+        "response_with_summary": lambda: ConsoleDisplay.display_response(final),
+        "stream": lambda: ConsoleDisplay.display_stream(chunk + " " for chunk in chunks),
+        "sentiment": lambda: ConsoleDisplay.display_sentiment(sentiment),
+        "statistics": lambda: ConsoleDisplay.display_statistics(stats),
+        "cost": lambda: ConsoleDisplay.display_cost(cost)
+    }
+    return [measure("console_display", fn, 2000, view=view) for view, fn in cases.items()]
+
+
+def run() -> List[Dict]:
+    """Run every benchmark and return the result rows"""
+    # The code under test prints diagnostics; keep them out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        chatbot = SentimentChatbot(user_id="bench-user", client=FakeOpenAI())
+        db = DatabaseManager(client=MemoryMongoClient())
+        results = bench_build_messages(chatbot) + bench_parse_response(chatbot)
+        results += bench_send_message(chatbot)
+        results += bench_database(db)
+        results += bench_display()
+    return results
+
+
+def _key(row: Dict) -> str:
+    """Identity of a result row across runs"""
+    params = ",".join(f"{key}={value}" for key, value in sorted(row["params"].items()))
+    return f"{row['name']}[{params}]"
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    """Benchmarks whose min_us grew by more than threshold (a fraction)"""
+    previous = {_key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get(_key(row))
+        if before and row["min_us"] > before["min_us"] * (1 + threshold):
+            regressions.append(
+                f"{_key(row)}: {before['min_us']:.1f} µs -> {row['min_us']:.1f} µs "
+                f"({row['min_us'] / before['min_us'] - 1:+.0%})"
+            )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Offline component microbenchmarks")
+    parser.add_argument("--output", default="benchmark-results.json",
+                        help="JSON results file to write")
+    parser.add_argument("--compare", default=None,
+                        help="previous results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown (fraction of min time) reported as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run, print and save the benchmarks; exit status 1 on regressions"""
+    args = parse_args(argv)
+    results = run()
+    
+    print(f"{'benchmark':<55} {'min µs':>10} {'median µs':>10}")
+    for row in results:
+        print(f"{_key(row):<55} {row['min_us']:>10.1f} {row['median_us']:>10.1f}")
+    
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results
+        }, file, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file)["results"], args.threshold)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   • {line}")
+            return 1
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
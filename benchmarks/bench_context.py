@@ -0,0 +1,73 @@
+"""
+Microbenchmark: per-turn request build cost as history grows
+
+Compares the original list-rebuilding _build_messages (one dict and one
+json.dumps per past turn, every turn) against ContextWindow backed by the
+append-only ConversationState. Compaction is disabled (huge budget) so both
+send the full history.
+    
+    python -m benchmarks.bench_context
+"""
+
+import json
+import time
+from typing import Dict, List
+from src.core.context import ContextWindow
+from src.core.prompts import Prompts
+
+HISTORY_SIZES = [10, 100, 1000, 5000]
+REPEATS = 200
+
+
+def _make_turn(i: int) -> Dict:
+    return {
+        'user_message': f"Message {i}: my card payment failed again, can you check it?",
+        'bot_response': f"Reply {i}: I'm sorry about that. Let me look into the payment for you."
+    }
+
+
+def legacy_build_messages(history: List[Dict]) -> List[Dict]:
+    """The pre-ConversationState implementation of _build_messages"""
+    messages = [{"role": "system", "content": Prompts.get_system_prompt()}]
+    for msg in history:
+        messages.append({"role": "user", "content": msg['user_message']})
+        messages.append({"role": "assistant", "content": json.dumps({
+            "response": msg['bot_response']
+        })})
+    return messages
+
+
+def _time_per_call(fn, repeats: int = REPEATS) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def run() -> List[Dict]:
+    """Run the benchmark and return one result row per history size"""
+    results = []
+    system_prompt = Prompts.get_system_prompt()
+    for size in HISTORY_SIZES:
+        history = [_make_turn(i) for i in range(size)]
+        window = ContextWindow(token_budget=10 ** 12)
+        window.build_messages(system_prompt, history)  # prepare existing turns once
+        
+        # One new turn per call, as in a live conversation
+        def incremental():
+            history.append(_make_turn(len(history)))
+            window.build_messages(system_prompt, history)
+        
+        results.append({
+            "history_turns": size,
+            "legacy_us": _time_per_call(lambda: legacy_build_messages(history)) * 1e6,
+            "state_us": _time_per_call(incremental) * 1e6
+        })
+        del history[size:]
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'turns':>8} {'legacy µs/turn':>16} {'state µs/turn':>15}")
+    for row in run():
+        print(f"{row['history_turns']:>8} {row['legacy_us']:>16.1f} {row['state_us']:>15.1f}")
@@ -0,0 +1,665 @@
+"""
+Offline stand-ins for the OpenAI and MongoDB clients
+
+FakeOpenAI answers chat.completions.create like the real API (plain and
+streamed, with usage blocks) after a configurable delay, and ends the
+conversation with a canned summary when the user says goodbye.
+MemoryMongoClient keeps collections in process memory and implements the
+subset of the pymongo API that DatabaseManager uses for embedded and
+bucketed storage.
+
+Async variants mirror both. Install them for the whole process with
+ClientRegistry.install, or pass them to SentimentChatbot(client=...) /
+DatabaseManager(client=...).
+"""
+
+import asyncio
+import copy
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+import bson
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+GOODBYES = ("bye", "goodbye", "see you")
+
+Latency = Union[float, Callable[[], float]]
+
+
+def fixed_latency(seconds: float) -> Callable[[], float]:
+    """Always the same delay"""
+    return lambda: seconds
+
+
+def lognormal_latency(median: float, sigma: float = 0.5,
+                      seed: Optional[int] = None) -> Callable[[], float]:
+    """Right-skewed delays around a median, like real completion latencies"""
+    rng = random.Random(seed)
+    return lambda: median * rng.lognormvariate(0.0, sigma)
+
+
+def canned_summary(turns: int) -> Dict:
+    """A conversation_summary in the shape the system prompt asks for"""
+    phase = {"sentiment": "neutral", "score": 0.0, "description": "Benchmark conversation"}
+    return {
+        "total_user_messages": turns,
+        "full_conversation_sentiment": {
+            "overall_emotional_direction": "neutral",
+            "average_sentiment_score": 0.0,
+            "narrative_description": "A scripted conversation with a stable tone."
+        },
+        "sentiment_journey": {
+            "opening_phase": dict(phase),
+            "middle_phase": dict(phase),
+            "closing_phase": dict(phase),
+            "mood_shift_analysis": "No shift"
+        },
+        "key_emotional_moments": [{
+            "message_number": 1,
+            "sentiment_classification": "neutral",
+            "sentiment_score": 0.0,
+            "significance": "Opening message"
+        }],
+        "insights": ["Scripted traffic"]
+    }
+
+
+class FakeCompletions:
+    """chat.completions with a configurable delay and token counts"""
+    
+    def __init__(self,
+                 latency: Latency = 0.0,
+                 completion_tokens: int = 60,
+                 prompt_tokens: Optional[int] = None,
+                 cached_ratio: float = 0.0,
+                 reply_words: int = 40,
+                 stream_chunks: int = 8,
+                 markdown: bool = False):
+        """
+        Args:
+            latency: Seconds before a reply (or a callable drawing them)
+            completion_tokens: Output tokens reported per reply
+            prompt_tokens: Input tokens reported per request (default:
+                estimated from the request size, 4 characters per token)
+            cached_ratio: Share of input tokens reported as cached
+            reply_words: Length of the reply text
+            stream_chunks: Chunks a streamed reply is split into
+            markdown: Wrap replies in a ```json fence like some models do
+        """
+        self.latency = latency if callable(latency) else fixed_latency(latency)
+        self.completion_tokens = completion_tokens
+        self.prompt_tokens = prompt_tokens
+        self.cached_ratio = cached_ratio
+        self.reply_words = reply_words
+        self.stream_chunks = stream_chunks
+        self.markdown = markdown
+        self.requests = 0
+    
+    def _content(self, messages: List[Dict]) -> str:
+        """Reply JSON for a request"""
+        user_message = messages[-1]["content"]
+        reply = {"response": " ".join(["Thanks for the details,"] + ["noted"] * self.reply_words)}
+        if any(word in user_message.lower() for word in GOODBYES):
+            reply["conversation_summary"] = canned_summary(
+                sum(1 for message in messages if message["role"] == "user")
+            )
+        content = json.dumps(reply)
+        return f"```json\n{content}\n```" if self.markdown else content
+    
+    def _usage(self, messages: List[Dict]) -> SimpleNamespace:
+        """Usage block for a request"""
+        prompt_tokens = self.prompt_tokens
+        if prompt_tokens is None:
+            prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=self.completion_tokens,
+            total_tokens=prompt_tokens + self.completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=int(prompt_tokens * self.cached_ratio))
+        )
+    
+    def _response(self, messages: List[Dict]) -> SimpleNamespace:
+        """Non-streamed completion object"""
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self._content(messages)))],
+            usage=self._usage(messages)
+        )
+    
+    def _chunks(self, messages: List[Dict]) -> List[SimpleNamespace]:
+        """Streamed completion chunks, the last carrying only usage"""
+        content = self._content(messages)
+        size = max(1, -(-len(content) // self.stream_chunks))
+        chunks = [
+            SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + size]))],
+                usage=None
+            )
+            for i in range(0, len(content), size)
+        ]
+        chunks.append(SimpleNamespace(choices=[], usage=self._usage(messages)))
+        return chunks
+    
+    def create(self, messages: List[Dict], stream: bool = False, **kwargs) -> Any:
+        """Sleep for the configured latency, then answer"""
+        self.requests += 1
+        time.sleep(self.latency())
+        if stream:
+            return iter(self._chunks(messages))
+        return self._response(messages)
+
+
+class AsyncFakeCompletions(FakeCompletions):
+    """FakeCompletions for AsyncOpenAI (awaits instead of sleeping)"""
+    
+    async def create(self, messages: List[Dict], stream: bool = False, **kwargs) -> Any:
+        """Await the configured latency, then answer"""
+        self.requests += 1
+        await asyncio.sleep(self.latency())
+        if stream:
+            return self._astream(self._chunks(messages))
+        return self._response(messages)
+    
+    @staticmethod
+    async def _astream(chunks: List[SimpleNamespace]):
+        """Async iterator over prepared chunks"""
+        for chunk in chunks:
+            yield chunk
+
+
+class FakeOpenAI:
+    """OpenAI client stand-in: client.chat.completions.create(...)"""
+    
+    completions_class = FakeCompletions
+    
+    def __init__(self, **options):
+        """Options are passed to FakeCompletions"""
+        self.chat = SimpleNamespace(completions=self.completions_class(**options))
+    
+    def close(self):
+        """Nothing to release"""
+
+
+class AsyncFakeOpenAI(FakeOpenAI):
+    """AsyncOpenAI client stand-in"""
+    
+    completions_class = AsyncFakeCompletions
+
+
+# --- MongoDB ---------------------------------------------------------------
+
+MISSING = object()
+
+
+def _get_path(document: Dict, path: str) -> Any:
+    """Value at a dotted path (MISSING if absent)"""
+    value = document
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return MISSING
+        value = value[key]
+    return value
+
+
+COMPARISONS = {
+    "$gt": lambda value, operand: value is not MISSING and value > operand,
+    "$gte": lambda value, operand: value is not MISSING and value >= operand,
+    "$lt": lambda value, operand: value is not MISSING and value < operand,
+    "$lte": lambda value, operand: value is not MISSING and value <= operand,
+    "$ne": lambda value, operand: value != operand,
+    "$in": lambda value, operand: value in operand,
+    "$exists": lambda value, operand: (value is not MISSING) == bool(operand)
+}
+
+
+def matches(document: Dict, query: Optional[Dict]) -> bool:
+    """Whether a document matches a filter (equality, comparisons, $or/$and)"""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and condition and next(iter(condition)).startswith("$"):
+            value = _get_path(document, key)
+            if not all(COMPARISONS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif _get_path(document, key) != condition:
+            # {field: None} also matches a missing field, as on the server
+            if condition is not None or _get_path(document, key) is not MISSING:
+                return False
+    return True
+
+
+def evaluate(document: Dict, expression: Any) -> Any:
+    """Value of an aggregation expression ($field paths, $literal, $ifNull, $concatArrays, $slice, $size)"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get_path(document, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, list):
+        return [evaluate(document, item) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) != 1 or not next(iter(expression)).startswith("$"):
+        return {key: evaluate(document, value) for key, value in expression.items()}
+    
+    op, operand = next(iter(expression.items()))
+    if op == "$literal":
+        return copy.deepcopy(operand)
+    args = evaluate(document, operand)
+    if op == "$ifNull":
+        return next((value for value in args if value is not None), None)
+    if op == "$concatArrays":
+        return [item for array in args for item in array]
+    if op == "$slice":
+        array, *rest = args
+        if len(rest) == 2:
+            return array[rest[0]:rest[0] + rest[1]]
+        return array[:rest[0]] if rest[0] >= 0 else array[rest[0]:]
+    if op == "$size":
+        return len(args)
+    raise NotImplementedError(f"MemoryCollection does not evaluate {op}")
+
+
+def project(document: Dict, projection: Optional[Dict]) -> Dict:
+    """Apply a top-level inclusion or exclusion projection"""
+    if not projection:
+        return document
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if any(fields.values()):
+        projected = {key: document[key] for key in fields if key in document}
+        if projection.get("_id", 1) and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    return {
+        key: value for key, value in document.items()
+        if projection.get(key, 1)
+    }
+
+
+def _copy(document: Dict) -> Dict:
+    """Round-trip through BSON, as the driver encodes and decodes documents"""
+    return bson.decode(bson.encode(document))
+
+
+def _stored(value: Any) -> Any:
+    """A copy of a value as the server stores it (datetimes to the millisecond)"""
+    return bson.decode(bson.encode({"value": value}))["value"]
+
+
+class MemoryCursor:
+    """Cursor over a snapshot of matching documents"""
+    
+    def __init__(self, documents: List[Dict], projection: Optional[Dict], document_class):
+        self._documents = documents
+        self._projection = projection
+        self._document_class = document_class
+        self._limit = 0
+    
+    @staticmethod
+    def _sort_key(key: str) -> Callable[[Dict], tuple]:
+        """Sort key for a field (missing fields sort first, as null does)"""
+        def sort_key(document: Dict) -> tuple:
+            value = _get_path(document, key)
+            return (0, 0) if value is MISSING or value is None else (1, value)
+        return sort_key
+    
+    def sort(self, key_or_list, direction: int = 1) -> "MemoryCursor":
+        """Sort by one field or a list of (field, direction) pairs"""
+        keys = [(key_or_list, direction)] if isinstance(key_or_list, str) else key_or_list
+        for key, order in reversed(keys):
+            self._documents.sort(key=self._sort_key(key), reverse=order < 0)
+        return self
+    
+    def limit(self, count: int) -> "MemoryCursor":
+        """Return at most count documents (0: no limit)"""
+        self._limit = count
+        return self
+    
+    def batch_size(self, size: int) -> "MemoryCursor":
+        """Accepted for API compatibility; everything is in memory"""
+        return self
+    
+    def __iter__(self) -> Iterator[Dict]:
+        documents = self._documents[:self._limit] if self._limit else self._documents
+        for document in documents:
+            projected = project(document, self._projection)
+            if self._document_class is RawBSONDocument:
+                yield RawBSONDocument(bson.encode(projected))
+            else:
+                yield _copy(projected)
+    
+    def __enter__(self) -> "MemoryCursor":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Drop the snapshot"""
+        self._documents = []
+
+
+class MemoryCollection:
+    """
+    In-memory collection with the pymongo calls DatabaseManager makes
+    
+    Supports filters with equality and comparison operators, $set,
+    $setOnInsert, $inc, $unset and $push/$each updates, $set pipelines
+    over the expressions bucketed storage uses (see evaluate), upserts,
+    and unordered bulk_write with duplicate-key errors reported like the
+    server. aggregate is not implemented.
+    """
+    
+    def __init__(self, name: str, documents: Optional[Dict] = None,
+                 lock: Optional[threading.RLock] = None, codec_options=DEFAULT_CODEC_OPTIONS):
+        self.name = name
+        self._documents: Dict[Any, Dict] = {} if documents is None else documents
+        self._lock = lock or threading.RLock()
+        self.codec_options = codec_options
+    
+    def with_options(self, codec_options=None, **kwargs) -> "MemoryCollection":
+        """A view of the same documents (RawBSONDocument results if asked for)"""
+        return MemoryCollection(self.name, self._documents, self._lock,
+                                codec_options or self.codec_options)
+    
+    def create_index(self, keys, **kwargs) -> str:
+        """No-op (lookups by _id are the only indexed path)"""
+        return "_".join(str(part) for key in keys for part in key)
+    
+    def _find(self, query: Optional[Dict]) -> List[Dict]:
+        """Stored documents matching a filter (callers hold the lock)"""
+        if query and set(query) == {"_id"} and not isinstance(query["_id"], dict):
+            document = self._documents.get(query["_id"])
+            return [document] if document is not None else []
+        return [document for document in self._documents.values() if matches(document, query)]
+    
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> MemoryCursor:
+        """Cursor over the matching documents"""
+        with self._lock:
+            documents = self._find(query)
+        return MemoryCursor(documents, projection, self.codec_options.document_class)
+    
+    def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        """First matching document, or None"""
+        return next(iter(self.find(query, projection).limit(1)), None)
+    
+    def count_documents(self, query: Dict) -> int:
+        """Number of matching documents"""
+        with self._lock:
+            return len(self._find(query))
+    
+    def insert_one(self, document: Dict) -> SimpleNamespace:
+        """Store a copy of a document, assigning its _id if missing"""
+        document.setdefault("_id", ObjectId())
+        with self._lock:
+            if document["_id"] in self._documents:
+                raise DuplicateKeyError(f"E11000 duplicate key error: {document['_id']}", 11000)
+            self._documents[document["_id"]] = _copy(document)
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+    
+    @staticmethod
+    def _apply(document: Dict, update: Dict, inserting: bool):
+        """Apply update operators to a stored document in place"""
+        if isinstance(update, list):
+            for stage in update:
+                for op, fields in stage.items():
+                    if op not in ("$set", "$addFields"):
+                        raise NotImplementedError(f"MemoryCollection does not run {op} stages")
+                    for key, expression in fields.items():
+                        document[key] = _stored(evaluate(document, expression))
+            return
+        for op, fields in update.items():
+            if op == "$setOnInsert" and not inserting:
+                continue
+            for key, value in fields.items():
+                if op in ("$set", "$setOnInsert"):
+                    document[key] = _stored(value)
+                elif op == "$inc":
+                    document[key] = document.get(key, 0) + value
+                elif op == "$unset":
+                    document.pop(key, None)
+                elif op == "$push":
+                    items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                    document.setdefault(key, []).extend(_stored(items))
+                else:
+                    raise NotImplementedError(f"MemoryCollection does not support {op}")
+    
+    def _upsert_document(self, query: Dict) -> Dict:
+        """New document seeded from a filter's equality fields"""
+        document = {
+            key: value for key, value in query.items()
+            if not key.startswith("$") and not isinstance(value, dict)
+        }
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error: {document['_id']}", 11000)
+        return document
+    
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> SimpleNamespace:
+        """Update the first matching document, or insert one with upsert"""
+        with self._lock:
+            found = self._find(query)
+            if found:
+                self._apply(found[0], update, inserting=False)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            document = self._upsert_document(query)
+            self._apply(document, update, inserting=True)
+            self._documents[document["_id"]] = document
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document["_id"])
+    
+    def replace_one(self, query: Dict, replacement: Dict, upsert: bool = False) -> SimpleNamespace:
+        """Replace the first matching document, or insert it with upsert"""
+        with self._lock:
+            found = self._find(query)
+            if found:
+                document = dict(_copy(replacement), _id=found[0]["_id"])
+                self._documents[document["_id"]] = document
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            document = dict(self._upsert_document(query), **_copy(replacement))
+            self._documents[document["_id"]] = document
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document["_id"])
+    
+    def delete_one(self, query: Dict) -> SimpleNamespace:
+        """Delete the first matching document"""
+        with self._lock:
+            found = self._find(query)
+            if found:
+                del self._documents[found[0]["_id"]]
+            return SimpleNamespace(deleted_count=len(found[:1]))
+    
+    def bulk_write(self, requests: List, ordered: bool = True) -> SimpleNamespace:
+        """Apply UpdateOne/ReplaceOne requests, raising BulkWriteError like the server"""
+        matched = modified = upserted = 0
+        errors = []
+        for index, request in enumerate(requests):
+            if not isinstance(request, (UpdateOne, ReplaceOne)):
+                raise NotImplementedError(f"MemoryCollection does not support {type(request).__name__}")
+            method = self.update_one if isinstance(request, UpdateOne) else self.replace_one
+            try:
+                result = method(request._filter, request._doc, upsert=request._upsert)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+                continue
+            matched += result.matched_count
+            modified += result.modified_count
+            upserted += result.upserted_id is not None
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "nMatched": matched,
+                "nModified": modified, "nUpserted": upserted
+            })
+        return SimpleNamespace(matched_count=matched, modified_count=modified,
+                               upserted_count=upserted, inserted_count=0)
+    
+    def aggregate(self, pipeline: List[Dict]):
+        """Not implemented: seed the statistics counters by saving conversations"""
+        raise NotImplementedError("MemoryCollection does not run aggregation pipelines")
+
+
+class MemoryDatabase:
+    """Database of MemoryCollections, created on first access"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._lock = threading.Lock()
+    
+    def __getitem__(self, name: str) -> MemoryCollection:
+        """Collection by name"""
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+    
+    def command(self, name: str, *args, **kwargs) -> Dict:
+        """Every command (ping) succeeds"""
+        return {"ok": 1.0}
+
+
+class MemoryMongoClient:
+    """MongoClient stand-in holding every database in process memory"""
+    
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self.admin = MemoryDatabase("admin")
+    
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        """Database by name"""
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+    
+    def close(self):
+        """Nothing to release"""
+
+
+class AsyncMemoryCursor:
+    """Async view of a MemoryCursor"""
+    
+    def __init__(self, cursor: MemoryCursor):
+        self._cursor = cursor
+    
+    def sort(self, *args, **kwargs) -> "AsyncMemoryCursor":
+        """See MemoryCursor.sort"""
+        self._cursor.sort(*args, **kwargs)
+        return self
+    
+    def limit(self, count: int) -> "AsyncMemoryCursor":
+        """See MemoryCursor.limit"""
+        self._cursor.limit(count)
+        return self
+    
+    def batch_size(self, size: int) -> "AsyncMemoryCursor":
+        """Accepted for API compatibility"""
+        return self
+    
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        """Every remaining document"""
+        return list(self._cursor)
+    
+    async def __aiter__(self):
+        for document in self._cursor:
+            yield document
+    
+    async def __aenter__(self) -> "AsyncMemoryCursor":
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def close(self):
+        """Drop the snapshot"""
+        self._cursor.close()
+
+
+class AsyncMemoryCollection:
+    """AsyncMongoClient-style collection over a MemoryCollection"""
+    
+    def __init__(self, collection: MemoryCollection):
+        self._collection = collection
+        self.name = collection.name
+        self.codec_options = collection.codec_options
+    
+    def with_options(self, **kwargs) -> "AsyncMemoryCollection":
+        """See MemoryCollection.with_options"""
+        return AsyncMemoryCollection(self._collection.with_options(**kwargs))
+    
+    def find(self, *args, **kwargs) -> AsyncMemoryCursor:
+        """Cursor over the matching documents"""
+        return AsyncMemoryCursor(self._collection.find(*args, **kwargs))
+    
+    async def create_index(self, keys, **kwargs) -> str:
+        return self._collection.create_index(keys, **kwargs)
+    
+    async def find_one(self, *args, **kwargs) -> Optional[Dict]:
+        return self._collection.find_one(*args, **kwargs)
+    
+    async def count_documents(self, query: Dict) -> int:
+        return self._collection.count_documents(query)
+    
+    async def insert_one(self, document: Dict) -> SimpleNamespace:
+        return self._collection.insert_one(document)
+    
+    async def update_one(self, *args, **kwargs) -> SimpleNamespace:
+        return self._collection.update_one(*args, **kwargs)
+    
+    async def replace_one(self, *args, **kwargs) -> SimpleNamespace:
+        return self._collection.replace_one(*args, **kwargs)
+    
+    async def delete_one(self, query: Dict) -> SimpleNamespace:
+        return self._collection.delete_one(query)
+    
+    async def bulk_write(self, requests: List, ordered: bool = True) -> SimpleNamespace:
+        return self._collection.bulk_write(requests, ordered=ordered)
+    
+    async def aggregate(self, pipeline: List[Dict]):
+        return self._collection.aggregate(pipeline)
+
+
+class AsyncMemoryDatabase:
+    """Async view of a MemoryDatabase"""
+    
+    def __init__(self, database: MemoryDatabase):
+        self._database = database
+        self.name = database.name
+    
+    def __getitem__(self, name: str) -> AsyncMemoryCollection:
+        """Collection by name"""
+        return AsyncMemoryCollection(self._database[name])
+    
+    async def command(self, name: str, *args, **kwargs) -> Dict:
+        """Every command (ping) succeeds"""
+        return self._database.command(name, *args, **kwargs)
+
+
+class AsyncMemoryMongoClient:
+    """
+    AsyncMongoClient stand-in
+    
+    Pass the MemoryMongoClient a sync stand-in uses to share its data.
+    """
+    
+    def __init__(self, client: Optional[MemoryMongoClient] = None):
+        self._client = client or MemoryMongoClient()
+        self.admin = AsyncMemoryDatabase(self._client.admin)
+    
+    def __getitem__(self, name: str) -> AsyncMemoryDatabase:
+        """Database by name"""
+        return AsyncMemoryDatabase(self._client[name])
+    
+    async def close(self):
+        """Nothing to release"""
@@ -0,0 +1,261 @@
+"""
+Concurrent load test for ChatService, fully offline
+
+Simulates N virtual users, each running a scripted multi-turn conversation
+(ending with a goodbye, so the summary is saved) through ChatService on a
+thread per user, or through AsyncChatService on one event loop. The LLM is
+FakeOpenAI with log-normally distributed latency and MongoDB is the
+in-memory stand-in, both installed with ClientRegistry.install, so the
+numbers measure this process: request building, parsing, persistence and
+the write-behind queue.
+
+Reports throughput, p50/p95/p99 turn latency, end-of-conversation
+persistence latency (end_conversation, plus the final write-queue drain)
+and peak RSS.
+    
+    python -m benchmarks.load_test --users 200 --turns 8 --latency 0.4
+    python -m benchmarks.load_test --mode async --users 1000 --output load.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from clients import ClientRegistry
+from database import AsyncDatabaseManager
+from src.services.chat_service import ChatService, AsyncChatService
+from src.services.persistence import get_write_queue
+from .fakes import (
+    AsyncFakeOpenAI, AsyncMemoryMongoClient, FakeOpenAI, MemoryMongoClient, lognormal_latency
+)
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+SCRIPT = [
+    "Hi, my card payment failed this morning.",
+    "I tried twice and it was declined both times.",
+    "The card is valid until next year and has enough balance.",
+    "Can you check whether my account is blocked?",
+    "Okay, I verified the code you sent.",
+    "It went through now, thank you!",
+    "Is there anything else I should update?",
+    "Great, that is really helpful."
+]
+
+
+def make_script(user: int, turns: int) -> List[str]:
+    """
+    turns scripted messages followed by a goodbye
+    
+    The opening names the user, so identical scripts never hit the response
+    cache for each other.
+    """
+    messages = [SCRIPT[i % len(SCRIPT)] for i in range(turns)] + ["Thanks, bye!"]
+    messages[0] = f"This is customer {user}. {messages[0]}"
+    return messages
+
+
+def percentiles(values: List[float]) -> Dict:
+    """p50/p95/p99/max of a sample in milliseconds (nearest rank)"""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+    
+    return {
+        "count": len(ordered),
+        "p50_ms": rank(50),
+        "p95_ms": rank(95),
+        "p99_ms": rank(99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class LoadTest:
+    """Runs the virtual users and collects their timings"""
+    
+    def __init__(self, users: int, turns: int, latency: float, sigma: float,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            users: Concurrent virtual users (one conversation each)
+            turns: Scripted turns per conversation, before the goodbye
+            latency: Median fake LLM latency in seconds
+            sigma: Log-normal spread of the LLM latency
+            seed: Seed for the latency distribution
+        """
+        self.users = users
+        self.turns = turns
+        self.latency = lognormal_latency(latency, sigma, seed)
+        self.turn_latencies: List[float] = []
+        self.persist_latencies: List[float] = []
+        self.errors = 0
+        self.conversations = 0
+        self._lock = threading.Lock()
+    
+    def _record_turn(self, response: Dict, elapsed: float):
+        """Record one turn's latency and outcome"""
+        with self._lock:
+            self.turn_latencies.append(elapsed)
+            if "error" in response:
+                self.errors += 1
+    
+    def _record_end(self, conversation_id: Optional[str], elapsed: float):
+        """Record the persistence latency and outcome of ending a conversation"""
+        with self._lock:
+            self.persist_latencies.append(elapsed)
+            self.conversations += 1
+            if conversation_id is None:
+                self.errors += 1
+    
+    def _user(self, index: int):
+        """One virtual user's conversation through ChatService"""
+        service = ChatService(user_id=f"load-{index}")
+        for message in make_script(index, self.turns):
+            start = time.perf_counter()
+            response = service.send_message(message)
+            self._record_turn(response, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        conversation_id = service.end_conversation()
+        self._record_end(conversation_id, time.perf_counter() - start)
+    
+    def run_sync(self) -> float:
+        """Run every user on its own thread; returns the drain time of the write queue"""
+        ClientRegistry.install(openai=FakeOpenAI(latency=self.latency), mongo=MemoryMongoClient())
+        with ThreadPoolExecutor(max_workers=self.users) as pool:
+            for future in [pool.submit(self._user, index) for index in range(self.users)]:
+                future.result()
+        
+        start = time.perf_counter()
+        write_queue = get_write_queue()
+        if write_queue is not None:
+            write_queue.flush()
+        return time.perf_counter() - start
+    
+    async def _async_user(self, index: int, db: AsyncDatabaseManager):
+        """One virtual user's conversation through AsyncChatService"""
+        service = AsyncChatService(user_id=f"load-{index}", db=db)
+        for message in make_script(index, self.turns):
+            start = time.perf_counter()
+            response = await service.send_message(message)
+            self._record_turn(response, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        conversation_id = await service.end_conversation()
+        self._record_end(conversation_id, time.perf_counter() - start)
+    
+    async def _run_async(self):
+        """Run every user as a task on the current event loop"""
+        db = AsyncDatabaseManager()
+        await asyncio.gather(*(self._async_user(index, db) for index in range(self.users)))
+    
+    def run_async(self) -> float:
+        """Run every user on one event loop (writes are direct, nothing to drain)"""
+        store = MemoryMongoClient()
+        ClientRegistry.install(
+            async_openai=lambda: AsyncFakeOpenAI(latency=self.latency),
+            async_mongo=lambda: AsyncMemoryMongoClient(store)
+        )
+        asyncio.run(self._run_async())
+        return 0.0
+    
+    def run(self, mode: str) -> Dict:
+        """Run the load test and return the report"""
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            drain = self.run_async() if mode == "async" else self.run_sync()
+        duration = time.perf_counter() - start
+        turns = len(self.turn_latencies)
+        return {
+            "mode": mode,
+            "users": self.users,
+            "turns_per_conversation": self.turns + 1,
+            "duration_s": duration,
+            "conversations": self.conversations,
+            "turns": turns,
+            "errors": self.errors,
+            "turns_per_s": turns / duration if duration else 0.0,
+            "conversations_per_s": self.conversations / duration if duration else 0.0,
+            "turn_latency": percentiles(self.turn_latencies),
+            "persist_latency": percentiles(self.persist_latencies),
+            "write_queue_drain_ms": drain * 1000,
+            "peak_rss_mb": peak_rss_mb()
+        }
+
+
+def print_report(report: Dict):
+    """Print a load-test report"""
+    print("=" * 70)
+    print(f"📈 LOAD TEST ({report['mode']}, {report['users']} users)".center(70))
+    print("=" * 70)
+    print(f"Conversations:  {report['conversations']:>10,}  ({report['conversations_per_s']:.1f}/s)")
+    print(f"Turns:          {report['turns']:>10,}  ({report['turns_per_s']:.1f}/s)")
+    print(f"Errors:         {report['errors']:>10,}")
+    print(f"Duration:       {report['duration_s']:>10.2f} s")
+    for label, key in (("Turn latency", "turn_latency"), ("Persistence", "persist_latency")):
+        stats = report[key]
+        if stats["count"]:
+            print(f"{label + ':':<16}p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  "
+                  f"p99 {stats['p99_ms']:.1f} ms  max {stats['max_ms']:.1f} ms")
+    print(f"Queue drain:    {report['write_queue_drain_ms']:>10.1f} ms")
+    if report["peak_rss_mb"] is not None:
+        print(f"Peak RSS:       {report['peak_rss_mb']:>10.1f} MB")
+    print("=" * 70)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Offline concurrent load test for ChatService")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--turns", type=int, default=5, help="turns per conversation before goodbye")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync",
+                        help="ChatService on threads or AsyncChatService on one loop")
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="median fake LLM latency in seconds")
+    parser.add_argument("--sigma", type=float, default=0.5,
+                        help="log-normal spread of the LLM latency")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the latency draws")
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the load test, print the report and optionally save it"""
+    args = parse_args(argv)
+    report = LoadTest(args.users, args.turns, args.latency, args.sigma, args.seed).run(args.mode)
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(dict(report, created_at=datetime.utcnow().isoformat(),
+                           python=platform.python_version(), platform=platform.platform()),
+                      file, indent=2)
+        print(f"💾 Report written to {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
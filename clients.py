@@ -0,0 +1,196 @@
+"""Process-wide pooled API and database clients"""
+
+import asyncio
+import atexit
+import threading
+import time
+import weakref
+from typing import Callable, Optional
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from pymongo import MongoClient, AsyncMongoClient
+from pymongo.errors import ConnectionFailure
+from config import Config
+
+
+class ClientRegistry:
+    """
+    Shared OpenAI and MongoDB clients
+    
+    Clients are built once per process (async clients once per event loop,
+    since their connections are bound to the loop that opened them) and
+    reused by every conversation, so starting a conversation opens no new
+    sockets and repeats no TLS handshakes.
+    """
+    
+    _lock = threading.RLock()
+    _openai: Optional[OpenAI] = None
+    _async_openai = weakref.WeakKeyDictionary()
+    _mongo: Optional[MongoClient] = None
+    _async_mongo = weakref.WeakKeyDictionary()
+    _async_mongo_ready = weakref.WeakKeyDictionary()
+    _mongo_ready = False
+    _mongo_last_attempt = 0.0
+    _async_openai_factory: Optional[Callable] = None
+    _async_mongo_factory: Optional[Callable] = None
+    
+    @staticmethod
+    def _http_limits() -> httpx.Limits:
+        """Connection-pool and keep-alive limits for the LLM HTTP client"""
+        return httpx.Limits(
+            max_connections=Config.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY
+        )
+    
+    @staticmethod
+    def _mongo_options() -> dict:
+        """Pool settings shared by the sync and async Mongo clients"""
+        return {
+            "serverSelectionTimeoutMS": 10000,
+            "maxPoolSize": Config.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": Config.MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": Config.MONGODB_MAX_IDLE_TIME_MS
+        }
+    
+    @classmethod
+    def install(cls,
+                openai=None,
+                mongo=None,
+                async_openai: Optional[Callable] = None,
+                async_mongo: Optional[Callable] = None):
+        """
+        Use the given clients instead of connecting to live services
+        
+        Meant for offline runs (benchmarks, load tests) with stand-in
+        clients. Installed Mongo clients count as ready and are not pinged.
+        
+        Args:
+            openai: Client used in place of the shared OpenAI client
+            mongo: Client used in place of the shared MongoClient
+            async_openai: Factory building the AsyncOpenAI stand-in for
+                each event loop
+            async_mongo: Factory building the AsyncMongoClient stand-in for
+                each event loop
+        """
+        with cls._lock:
+            if openai is not None:
+                cls._openai = openai
+            if mongo is not None:
+                cls._mongo = mongo
+                cls._mongo_ready = True
+            if async_openai is not None:
+                cls._async_openai_factory = async_openai
+                cls._async_openai.clear()
+            if async_mongo is not None:
+                cls._async_mongo_factory = async_mongo
+                cls._async_mongo.clear()
+                cls._async_mongo_ready.clear()
+    
+    @classmethod
+    def get_openai_client(cls) -> OpenAI:
+        """Get the shared synchronous OpenAI client"""
+        if cls._openai is None:
+            with cls._lock:
+                if cls._openai is None:
+                    cls._openai = OpenAI(
+                        api_key=Config.OPENAI_API_KEY,
+                        timeout=Config.OPENAI_TIMEOUT,
+                        http_client=DefaultHttpxClient(limits=cls._http_limits())
+                    )
+        return cls._openai
+    
+    @classmethod
+    def get_async_openai_client(cls) -> AsyncOpenAI:
+        """Get the AsyncOpenAI client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = cls._async_openai.get(loop)
+        if client is None:
+            if cls._async_openai_factory is not None:
+                client = cls._async_openai_factory()
+            else:
+                client = AsyncOpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    timeout=Config.OPENAI_TIMEOUT,
+                    http_client=DefaultAsyncHttpxClient(limits=cls._http_limits())
+                )
+            cls._async_openai[loop] = client
+        return client
+    
+    @classmethod
+    def get_mongo_client(cls) -> MongoClient:
+        """Get the shared pooled MongoClient (connects lazily, no round trip)"""
+        if cls._mongo is None:
+            with cls._lock:
+                if cls._mongo is None:
+                    cls._mongo = MongoClient(Config.MONGODB_URI, **cls._mongo_options())
+        return cls._mongo
+    
+    @classmethod
+    def get_async_mongo_client(cls) -> AsyncMongoClient:
+        """Get the AsyncMongoClient for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = cls._async_mongo.get(loop)
+        if client is None:
+            if cls._async_mongo_factory is not None:
+                client = cls._async_mongo_factory()
+            else:
+                client = AsyncMongoClient(Config.MONGODB_URI, **cls._mongo_options())
+            cls._async_mongo[loop] = client
+        return client
+    
+    @classmethod
+    def ensure_mongo_ready(cls) -> bool:
+        """
+        Verify MongoDB is reachable, once per process
+        
+        After a failure the ping is retried at most every
+        MONGODB_RECONNECT_INTERVAL seconds so callers stay fast while the
+        database is down.
+        
+        Raises:
+            ConnectionFailure: If the server could not be reached
+        """
+        if cls._mongo_ready:
+            return True
+        
+        with cls._lock:
+            if cls._mongo_ready:
+                return True
+            now = time.monotonic()
+            if cls._mongo_last_attempt and now - cls._mongo_last_attempt < Config.MONGODB_RECONNECT_INTERVAL:
+                raise ConnectionFailure("MongoDB unavailable (waiting before reconnect)")
+            cls._mongo_last_attempt = now
+            
+            print(f"🔄 Connecting to MongoDB...")
+            print(f"   URI: {Config.MONGODB_URI[:20]}...")
+            print(f"   Database: {Config.MONGODB_DATABASE}")
+            cls.get_mongo_client().admin.command('ping')
+            cls._mongo_ready = True
+            print(f"✅ Connected to MongoDB Cloud: {Config.MONGODB_DATABASE}")
+            return True
+    
+    @classmethod
+    async def ensure_async_mongo_ready(cls) -> bool:
+        """Verify MongoDB is reachable, once per event loop"""
+        loop = asyncio.get_running_loop()
+        if not cls._async_mongo_ready.get(loop):
+            if cls._async_mongo_factory is None:
+                await cls.get_async_mongo_client().admin.command('ping')
+            cls._async_mongo_ready[loop] = True
+        return True
+    
+    @classmethod
+    def close_all(cls):
+        """Close the shared synchronous clients (called at interpreter exit)"""
+        with cls._lock:
+            if cls._openai is not None:
+                cls._openai.close()
+                cls._openai = None
+            if cls._mongo is not None:
+                cls._mongo.close()
+                cls._mongo = None
+            cls._mongo_ready = False
+
+
+atexit.register(ClientRegistry.close_all)
@@ -15,9 +15,119 @@ class Config:
     MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
     MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "liaplus_chatbot")
     
+    # LLM HTTP client pooling (shared by every conversation in the process)
+    OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+    OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+    
+    # MongoDB connection pooling
+    MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+    MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+    MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+    MONGODB_RECONNECT_INTERVAL = float(os.getenv("MONGODB_RECONNECT_INTERVAL", "30"))
+    
+    # Context window: token budget per request, turns always sent verbatim,
+    # and the size cap for the rolling summary of older turns
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+    CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+    CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "600"))
+    CONTEXT_FOLD_BATCH = int(os.getenv("CONTEXT_FOLD_BATCH", "4"))
+    
+    # Routing hint so requests sharing our system prompt land on the same
+    # prompt cache (empty to disable)
+    PROMPT_CACHE_KEY = os.getenv("PROMPT_CACHE_KEY", "liaplus-chatbot")
+    
+    # Response cache for repeated requests: "none", "memory" (per process) or
+    # "sqlite" (shared by all worker processes on the host)
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "none").lower()
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", ".cache/responses.sqlite3")
+    
+    # Read-through cache for conversation lookups, invalidated on writes
+    CONVERSATION_CACHE_ENABLED = os.getenv("CONVERSATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    CONVERSATION_CACHE_MAX_ENTRIES = int(os.getenv("CONVERSATION_CACHE_MAX_ENTRIES", "512"))
+    CONVERSATION_CACHE_TTL = float(os.getenv("CONVERSATION_CACHE_TTL", "30"))
+    USER_CONVERSATIONS_CACHE_MAX_ENTRIES = int(os.getenv("USER_CONVERSATIONS_CACHE_MAX_ENTRIES", "256"))
+    USER_CONVERSATIONS_CACHE_TTL = float(os.getenv("USER_CONVERSATIONS_CACHE_TTL", "10"))
+    STATISTICS_CACHE_TTL = float(os.getenv("STATISTICS_CACHE_TTL", "5"))
+    
+    # Per-turn persistence: a turn is written immediately unless the previous
+    # write was less than TURN_FLUSH_INTERVAL seconds ago, in which case turns
+    # are batched until TURN_FLUSH_BATCH are pending or the interval passes
+    TURN_FLUSH_INTERVAL = float(os.getenv("TURN_FLUSH_INTERVAL", "1.0"))
+    TURN_FLUSH_BATCH = int(os.getenv("TURN_FLUSH_BATCH", "5"))
+    
+    # Write-behind persistence: conversation writes are queued and flushed by
+    # a background worker in unordered bulk_write batches
+    WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+    WRITE_QUEUE_BATCH_SIZE = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", "100"))
+    WRITE_QUEUE_FLUSH_INTERVAL = float(os.getenv("WRITE_QUEUE_FLUSH_INTERVAL", "0.2"))
+    WRITE_QUEUE_MAX_PENDING = int(os.getenv("WRITE_QUEUE_MAX_PENDING", "10000"))
+    WRITE_QUEUE_PUT_TIMEOUT = float(os.getenv("WRITE_QUEUE_PUT_TIMEOUT", "1.0"))
+    WRITE_QUEUE_MAX_RETRIES = int(os.getenv("WRITE_QUEUE_MAX_RETRIES", "3"))
+    WRITE_QUEUE_SHUTDOWN_TIMEOUT = float(os.getenv("WRITE_QUEUE_SHUTDOWN_TIMEOUT", "10"))
+    WRITE_QUEUE_SPOOL_DEPTH = int(os.getenv("WRITE_QUEUE_SPOOL_DEPTH", "5000"))
+    
+    # Local spool for writes while MongoDB is down or slow, replayed on recovery
+    SPOOL_ENABLED = os.getenv("SPOOL_ENABLED", "true").lower() in ("1", "true", "yes")
+    SPOOL_PATH = os.getenv("SPOOL_PATH", ".spool/conversations.jsonl")
+    SPOOL_FSYNC_EVERY = int(os.getenv("SPOOL_FSYNC_EVERY", "50"))
+    SPOOL_FSYNC_INTERVAL = float(os.getenv("SPOOL_FSYNC_INTERVAL", "1.0"))
+    SPOOL_REPLAY_INTERVAL = float(os.getenv("SPOOL_REPLAY_INTERVAL", "5.0"))
+    # Writes MongoDB rejects permanently (e.g. a gap in the turns or an
+    # oversized document) are moved here instead of blocking later writes
+    SPOOL_DEAD_LETTER_PATH = os.getenv("SPOOL_DEAD_LETTER_PATH", ".spool/dead-letter.jsonl")
+    
+    # Return conversations as LazyConversation views over raw BSON, decoding
+    # fields only when they are read (dict-compatible, read-mostly callers)
+    LAZY_DOCUMENTS = os.getenv("LAZY_DOCUMENTS", "false").lower() in ("1", "true", "yes")
+    
+    # Conversation queries: default page size for keyset-paginated lists and
+    # documents fetched per round trip when streaming a cursor
+    QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "20"))
+    QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "100"))
+    
+    # Transcript storage: "embedded" (messages array in the conversation
+    # document) or "bucketed" (MESSAGE_BUCKET_SIZE turns per document in the
+    # messages collection). Switch modes only with no active conversations.
+    MESSAGE_STORAGE = os.getenv("MESSAGE_STORAGE", "embedded").lower()
+    MESSAGE_BUCKET_SIZE = int(os.getenv("MESSAGE_BUCKET_SIZE", "100"))
+    
+    # Metrics: Prometheus /metrics endpoint (0 disables it) and mirroring of
+    # turn metrics to OpenTelemetry (needs opentelemetry-api; with the SDK and
+    # OTLP exporter installed they are exported to OTEL_EXPORTER_OTLP_ENDPOINT)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    OTEL_METRICS_ENABLED = os.getenv("OTEL_METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+    
+    # Profiling (off by default): PROFILE is "cpu" (cProfile), "memory"
+    # (tracemalloc diffs between captures) or "all". Every PROFILE_EVERY-th
+    # turn is captured, plus turns slower than PROFILE_SLOW_MS (0: no
+    # threshold); reports go to PROFILE_DIR, keeping the newest PROFILE_KEEP files
+    PROFILE = os.getenv("PROFILE", "off").lower()
+    PROFILE_EVERY = int(os.getenv("PROFILE_EVERY", "10"))
+    PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+    
+    # Batch mode (python main.py batch): conversations run concurrently
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+    
+    # Export (python main.py export): documents per cursor batch and rows per
+    # Parquet row group
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+    EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "50000"))
+    
+    # Schema migration (python main.py migrate-schema)
+    MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "100"))
+    
     # Collections
     CONVERSATIONS_COLLECTION = "conversations"
     MESSAGES_COLLECTION = "messages"
+    STATS_COLLECTION = "stats"
+    MIGRATIONS_COLLECTION = "migrations"
     
     @classmethod
     def validate(cls):
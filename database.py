@@ -1,42 +1,588 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import threading
+from pymongo import UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import (
+    BulkWriteError, ConnectionFailure, ExecutionTimeout, PyMongoError, WTimeoutError
+)
+from bson.errors import InvalidId
+from bson.raw_bson import RawBSONDocument
+from bson.objectid import ObjectId
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator, AsyncIterator, Tuple
 from config import Config
+from clients import ClientRegistry
+from schema import (
+    SCHEMA_VERSION, SchemaMigrator, decompress_messages, encode_messages,
+    read_conversation, read_lazy_conversation, summary_fields
+)
+from message_buckets import BUCKET_INDEX, bucket_query, build_bucket_ops, slice_buckets
+from src.utils.constants import API_COSTS
+from src.utils.metrics import get_metrics
+
+# Index creation is idempotent server-side, but still a round trip: only do it
+# once per process.
+_indexes_created = False
+_indexes_lock = threading.Lock()
+
+
+# Transcript storage modes (see message_buckets)
+EMBEDDED = "embedded"
+BUCKETED = "bucketed"
+
+
+def build_conversation_document(user_id: str,
+                                messages: List[Dict],
+                                conversation_summary: Dict,
+                                created_at: datetime,
+                                embed_messages: bool = True) -> Dict:
+    """Build the stored document for a completed conversation"""
+    now = datetime.utcnow()
+    document = {
+        "schema_version": SCHEMA_VERSION,
+        "user_id": user_id,
+        "created_at": created_at,
+        "completed_at": now,
+        "updated_at": now,
+        "status": "completed",
+        "total_messages": len(messages),
+        **summary_fields(conversation_summary)
+    }
+    if embed_messages:
+        document["messages"] = encode_messages(messages)  # Full conversation history
+    else:
+        document["message_storage"] = BUCKETED
+    return document
+
+
+def build_conversation_update(user_id: str,
+                              created_at: datetime,
+                              turns: Optional[List[Dict]] = None,
+                              conversation_summary: Optional[Dict] = None,
+                              status: Optional[str] = None,
+                              embed_messages: bool = True,
+                              write_id: Optional[ObjectId] = None) -> Dict:
+    """
+    Upsert update that appends turns and/or closes a conversation
+    
+    The first write creates the document ($setOnInsert); every later write is
+    a small constant-size $push of new turns, independent of history length.
+    A final write $sets the status and summary fields. With embed_messages
+    off the turns are stored in buckets and only counted here. write_id
+    marks the bulk write that last changed the document (see
+    settle_writes).
+    """
+    now = datetime.utcnow()
+    on_insert = {"schema_version": SCHEMA_VERSION, "user_id": user_id, "created_at": created_at}
+    fields = {"updated_at": now}
+    if write_id is not None:
+        fields["write_id"] = write_id
+    update = {"$setOnInsert": on_insert, "$set": fields}
+    if not embed_messages:
+        on_insert["message_storage"] = BUCKETED
+    
+    if turns:
+        if embed_messages:
+            update["$push"] = {"messages": {"$each": encode_messages(turns)}}
+        update["$inc"] = {"total_messages": len(turns)}
+    else:
+        on_insert["total_messages"] = 0
+    
+    if status:
+        fields["status"] = status
+        if status == "completed":
+            fields["completed_at"] = now
+    else:
+        on_insert["status"] = "active"
+    
+    if conversation_summary:
+        fields.update(summary_fields(conversation_summary))
+    return update
+
+
+def build_write_op(write: Dict, embed_messages: bool = True,
+                   write_id: Optional[ObjectId] = None) -> UpdateOne:
+    """
+    Bulk-write operation for one conversation write record
+    
+    A write record is a plain dict: conversation_id, user_id, created_at,
+    turns (new turns, in order) with start_index (position of the first new
+    turn), and optionally summary and status.
+    
+    Turn appends only match while total_messages == start_index, which makes
+    replaying a record idempotent: if the turns were already applied the
+    filter misses and settle_writes decides what, if anything, is still
+    missing. Only the first append (start_index 0) and records without
+    turns may create the document: an upsert from a later turn would store
+    a conversation with a gap at its start. A first append that misses
+    collides on _id (E11000); a later one simply matches nothing.
+    """
+    query = {"_id": ObjectId(write["conversation_id"])}
+    if write.get("turns") and write.get("start_index") is not None:
+        query["total_messages"] = write["start_index"]
+    
+    return UpdateOne(
+        query,
+        build_conversation_update(
+            write["user_id"],
+            write["created_at"],
+            write.get("turns"),
+            write.get("summary"),
+            write.get("status"),
+            embed_messages,
+            write_id
+        ),
+        upsert=not is_later_append(write)
+    )
+
+
+def is_later_append(write: Dict) -> bool:
+    """Whether a record appends turns after the first (never upserted)"""
+    return bool(write.get("turns")) and bool(write.get("start_index"))
+
+
+def resolve_overlap(write: Dict, stored_total: int) -> Dict:
+    """
+    Trim a write record whose turns are partly or fully stored already
+    
+    Args:
+        write: Record whose conditional append missed
+        stored_total: total_messages currently on the stored document
+    
+    Returns:
+        The record with only the turns that are still missing
+    """
+    start = write["start_index"]
+    if stored_total < start:
+        raise ValueError(
+            f"Conversation {write['conversation_id']} has {stored_total} turns stored, "
+            f"cannot append from turn {start}"
+        )
+    resolved = dict(write)
+    resolved["turns"] = write["turns"][stored_total - start:]
+    resolved["start_index"] = stored_total
+    return resolved
+
+
+DUPLICATE_KEY = 11000
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Whether a failed write may succeed when retried later
+    
+    Connection problems, timeouts and retryable errors are transient. Writes
+    MongoDB rejects outright - a gap in the turns (resolve_overlap), a
+    document over the size limit, a failed validation - fail the same way on
+    every retry.
+    """
+    if isinstance(error, (ConnectionError, ConnectionFailure, ExecutionTimeout, WTimeoutError)):
+        return True
+    if isinstance(error, BulkWriteError):
+        # Only write concern errors (the writes themselves were accepted)
+        return not error.details.get("writeErrors") and bool(error.details.get("writeConcernErrors"))
+    return isinstance(error, PyMongoError) and error.has_error_label("RetryableWriteError")
+
+
+def settle_writes(writes: List[Dict], suspects: List[int], stored: Dict[ObjectId, Dict],
+                  write_id: ObjectId) -> Tuple[List[Dict], List[Dict], List[str]]:
+    """
+    Sort out a bulk_write of conversation records that did not all apply
+    
+    Args:
+        writes: Records, in bulk_write order
+        suspects: Indexes of records that may not have applied (see
+            bulk_outcome)
+        stored: The suspects' stored documents (total_messages and
+            write_id), by _id
+        write_id: write_id the bulk_write set on every document it changed
+    
+    Returns:
+        (records the bulk_write applied, resolved records whose missing
+        turns still need appending, errors of records that would leave a
+        gap or whose conversation is not stored)
+    """
+    suspects = set(suspects)
+    applied, retry, gaps = [], [], []
+    for index, write in enumerate(writes):
+        document = stored.get(ObjectId(write["conversation_id"])) if index in suspects else None
+        if index not in suspects or (document is not None and document.get("write_id") == write_id):
+            applied.append(write)
+            continue
+        if document is None:
+            gaps.append(f"Conversation {write['conversation_id']} is not stored, "
+                        f"cannot append from turn {write['start_index']}")
+            continue
+        try:
+            resolved = resolve_overlap(write, document.get("total_messages", 0))
+        except ValueError as e:
+            gaps.append(str(e))
+            continue
+        if resolved["turns"]:
+            retry.append(resolved)
+    return applied, retry, gaps
+
+
+# Materialized statistics: one counters document, $inc'd on every save
+STATS_ID = "conversations"
+
+# Single pass over the collection, used only to (re)build the counters
+STATISTICS_PIPELINE = [
+    {"$group": {
+        "_id": None,
+        "total_conversations": {"$sum": 1},
+        "total_messages": {"$sum": "$total_messages"},
+        "sentiment_sum": {"$sum": "$overall_sentiment.average_sentiment_score"},
+        "sentiment_count": {"$sum": {
+            "$cond": [{"$isNumber": "$overall_sentiment.average_sentiment_score"}, 1, 0]
+        }}
+    }}
+]
+
+
+def summary_sentiment(conversation_summary: Optional[Dict]) -> Optional[float]:
+    """Overall sentiment score from a conversation summary, if present"""
+    sentiment = (conversation_summary or {}).get("full_conversation_sentiment") or {}
+    score = sentiment.get("average_sentiment_score")
+    return score if isinstance(score, (int, float)) else None
+
+
+def build_stats_increment(writes: List[Dict], new_conversations: int) -> Dict:
+    """
+    $inc for the counters document after write records were applied
+    
+    Args:
+        writes: Records that were applied (turns already de-duplicated)
+        new_conversations: Documents the writes created
+    
+    Returns:
+        Non-zero counter increments (empty if nothing changed)
+    """
+    inc = {
+        "total_conversations": new_conversations,
+        "total_messages": sum(len(write.get("turns") or []) for write in writes),
+        "sentiment_sum": 0.0,
+        "sentiment_count": 0
+    }
+    for write in writes:
+        score = summary_sentiment(write.get("summary"))
+        if score is not None:
+            inc["sentiment_sum"] += score
+            inc["sentiment_count"] += 1
+    return {field: value for field, value in inc.items() if value}
+
+
+def build_stats_document(pipeline_result: List[Dict]) -> Dict:
+    """Counters document from a STATISTICS_PIPELINE result"""
+    totals = pipeline_result[0] if pipeline_result else {}
+    return {
+        "total_conversations": totals.get("total_conversations", 0),
+        "total_messages": totals.get("total_messages", 0),
+        "sentiment_sum": totals.get("sentiment_sum", 0.0),
+        "sentiment_count": totals.get("sentiment_count", 0),
+        "rebuilt_at": datetime.utcnow()
+    }
+
+
+def format_statistics(counters: Optional[Dict]) -> Dict:
+    """Shape the counters document"""
+    counters = counters or {}
+    sentiment_count = counters.get("sentiment_count", 0)
+    avg_sentiment = counters.get("sentiment_sum", 0) / sentiment_count if sentiment_count else 0
+    
+    return {
+        "total_conversations": counters.get("total_conversations", 0),
+        "total_messages": counters.get("total_messages", 0),
+        "average_sentiment": round(avg_sentiment, 3) if avg_sentiment else 0
+    }
+
+
+# Usage reports: per-turn telemetry (model, usage, latency_ms) grouped
+# server-side; $percentile needs MongoDB 7.0+
+USAGE_GROUPS = {
+    "user": "$user_id",
+    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": {"$toDate": "$turn.timestamp"}}},
+    "model": "$turn.model",
+    "conversation": "$conversation_id"
+}
+USAGE_PERCENTILES = [0.5, 0.95, 0.99]
+
+
+def _turn_cost_expression() -> Dict:
+    """Aggregation expression for the API cost of one turn (API_COSTS rates)"""
+    prompt = {"$ifNull": ["$turn.usage.prompt_tokens", 0]}
+    cached = {"$ifNull": ["$turn.usage.cached_tokens", 0]}
+    completion = {"$ifNull": ["$turn.usage.completion_tokens", 0]}
+    return {"$divide": [
+        {"$add": [
+            {"$multiply": [{"$subtract": [prompt, cached]}, API_COSTS["input"]]},
+            {"$multiply": [cached, API_COSTS["cached_input"]]},
+            {"$multiply": [completion, API_COSTS["output"]]}
+        ]},
+        1_000_000
+    ]}
+
+
+def build_usage_report_pipeline(group_by: str,
+                                 since: Optional[datetime] = None,
+                                 messages_collection: Optional[str] = None) -> List[Dict]:
+    """
+    Aggregation over stored turns: latency percentiles, tokens and cost per group
+    
+    Turns are read from the embedded transcripts and, with
+    messages_collection, unioned with the bucketed ones (user_id looked up
+    from the conversation). Compressed (archived) transcripts and turns
+    saved without telemetry are not counted.
+    
+    Args:
+        group_by: "user", "day", "model" or "conversation"
+        since: Only turns at or after this time
+        messages_collection: Name of the bucket collection to include
+            (bucketed storage only)
+    
+    Returns:
+        Pipeline for the conversations collection
+    """
+    if group_by not in USAGE_GROUPS:
+        raise ValueError(f"Unknown usage grouping: {group_by!r} (use {', '.join(USAGE_GROUPS)})")
+    
+    pipeline = []
+    if since is not None:
+        pipeline.append({"$match": {"$or": [
+            {"updated_at": {"$gte": since}}, {"completed_at": {"$gte": since}}
+        ]}})
+    pipeline += [
+        {"$unwind": "$messages"},
+        {"$project": {"_id": 0, "conversation_id": "$_id", "user_id": 1, "turn": "$messages"}}
+    ]
+    
+    if messages_collection:
+        buckets = [{"$match": {"updated_at": {"$gte": since}}}] if since is not None else []
+        buckets += [
+            {"$unwind": "$messages"},
+            {"$lookup": {
+                "from": Config.CONVERSATIONS_COLLECTION,
+                "localField": "conversation_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"user_id": 1}}],
+                "as": "conversation"
+            }},
+            {"$project": {
+                "_id": 0,
+                "conversation_id": 1,
+                "user_id": {"$first": "$conversation.user_id"},
+                "turn": "$messages"
+            }}
+        ]
+        pipeline.append({"$unionWith": {"coll": messages_collection, "pipeline": buckets}})
+    
+    turn_filter = {"turn.latency_ms": {"$type": "number"}}
+    if since is not None:
+        turn_filter["turn.timestamp"] = {"$gte": since}
+    pipeline += [
+        {"$match": turn_filter},
+        {"$group": {
+            "_id": USAGE_GROUPS[group_by],
+            "turns": {"$sum": 1},
+            "latency": {"$percentile": {
+                "input": "$turn.latency_ms", "p": USAGE_PERCENTILES, "method": "approximate"
+            }},
+            "prompt_tokens": {"$sum": "$turn.usage.prompt_tokens"},
+            "max_prompt_tokens": {"$max": "$turn.usage.prompt_tokens"},
+            "completion_tokens": {"$sum": "$turn.usage.completion_tokens"},
+            "cached_tokens": {"$sum": "$turn.usage.cached_tokens"},
+            "cost": {"$sum": _turn_cost_expression()}
+        }},
+        {"$project": {
+            "_id": 0,
+            "group": "$_id",
+            "turns": 1,
+            "p50_ms": {"$arrayElemAt": ["$latency", 0]},
+            "p95_ms": {"$arrayElemAt": ["$latency", 1]},
+            "p99_ms": {"$arrayElemAt": ["$latency", 2]},
+            "prompt_tokens": 1,
+            "max_prompt_tokens": 1,
+            "completion_tokens": 1,
+            "cached_tokens": 1,
+            "cost": 1
+        }},
+        # Conversations are ranked by their largest context; other groups sorted by key
+        {"$sort": {"max_prompt_tokens": -1} if group_by == "conversation" else {"group": 1}}
+    ]
+    return pipeline
+
+
+def message_page_projection(start: int, limit: int) -> Dict:
+    """Projection fetching one page of an embedded transcript"""
+    return {
+        "message_storage": 1,
+        "messages_z": 1,
+        "schema_version": 1,
+        "messages": {"$slice": [start, limit]}
+    }
+
+
+def embedded_page(document: Dict, start: int, limit: int) -> List[Dict]:
+    """Messages of a message_page_projection result (compressed or not)"""
+    if document.get("messages_z") is not None:
+        return decompress_messages(document["messages_z"])[start:start + limit]
+    return encode_messages(document.get("messages") or [])
+
+
+def bulk_outcome(writes: List[Dict], result=None, error: Optional[BulkWriteError] = None
+                 ) -> Tuple[List[int], int]:
+    """
+    (indexes of records that may not have applied, documents created) of a
+    conversation bulk_write
+    
+    First appends that missed fail with E11000. A later append that missed
+    (replayed, or its document is missing) matches nothing, and an
+    unordered bulk_write does not say which one, so when any operation
+    matched nothing every later append is a suspect.
+    
+    Raises:
+        BulkWriteError: error, if it holds anything but duplicate keys
+    """
+    if error is None:
+        failed, matched, upserted = [], result.matched_count, result.upserted_count
+    else:
+        failed = error.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in failed):
+            raise error
+        matched, upserted = error.details.get("nMatched", 0), error.details.get("nUpserted", 0)
+    
+    suspects = {err["index"] for err in failed}
+    if matched + upserted + len(failed) < len(writes):
+        suspects.update(index for index, write in enumerate(writes) if is_later_append(write))
+    return sorted(suspects), upserted
+
+
+# Field projections for conversation queries: list views skip the transcript
+# and v1's duplicated full_summary; full reads fetch everything so
+# read_conversation can fold a v1 full_summary into the v2 shape
+CONVERSATION_VIEWS = {
+    "summary": {"messages": 0, "messages_z": 0, "full_summary": 0},
+    "full": None
+}
+
+# Newest first; _id breaks ties so keyset pagination never skips or repeats
+PAGE_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+# Compound indexes backing PAGE_SORT for each filter the query API supports,
+# and the export sort
+CONVERSATION_INDEXES = [
+    [("created_at", DESCENDING), ("_id", DESCENDING)],
+    [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+    [("overall_sentiment.overall_emotional_direction", ASCENDING),
+     ("created_at", DESCENDING), ("_id", DESCENDING)],
+    # Incremental export (src.services.export.EXPORT_SORT), with and
+    # without a status filter
+    [("updated_at", ASCENDING), ("_id", ASCENDING)],
+    [("status", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)]
+]
+
+
+def view_projection(view: str) -> Optional[Dict]:
+    """Projection for a conversation view ("summary" or "full")"""
+    try:
+        return CONVERSATION_VIEWS[view]
+    except KeyError:
+        raise ValueError(f"Unknown conversation view: {view!r} (use 'summary' or 'full')")
+
+
+def encode_page_cursor(document: Dict) -> str:
+    """Opaque keyset cursor pointing just past a document in PAGE_SORT order"""
+    return f"{document['created_at'].isoformat()}|{document['_id']}"
+
+
+def build_query_filter(user_id: Optional[str] = None,
+                       direction: Optional[str] = None,
+                       after: Optional[str] = None) -> Dict:
+    """
+    Filter for a conversation query
+    
+    Args:
+        user_id: Only this user's conversations
+        direction: Only this overall emotional direction
+        after: Cursor from a previous page; only conversations after it
+    
+    Returns:
+        MongoDB filter matching one of CONVERSATION_INDEXES
+    """
+    query = {}
+    if user_id is not None:
+        query["user_id"] = user_id
+    if direction is not None:
+        query["overall_sentiment.overall_emotional_direction"] = direction
+    if after:
+        created_at, _, oid = after.partition("|")
+        try:
+            created_at = datetime.fromisoformat(created_at)
+            oid = ObjectId(oid)
+        except (ValueError, InvalidId):
+            raise ValueError(f"Invalid page cursor: {after!r}")
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": oid}}
+        ]
+    return query
+
+
+def raw_collection(collection):
+    """The same collection returning undecoded RawBSONDocuments"""
+    return collection.with_options(
+        codec_options=collection.codec_options.with_options(document_class=RawBSONDocument)
+    )
+
+
+def build_page(documents: List[Dict], limit: int, read=read_conversation) -> Dict:
+    """Shape up to limit + 1 fetched documents into a page with a next cursor"""
+    conversations = [read(document) for document in documents[:limit]]
+    has_more = len(documents) > limit
+    return {
+        "conversations": conversations,
+        "next_cursor": encode_page_cursor(conversations[-1]) if has_more else None
+    }
 
 class DatabaseManager:
-    """Manages MongoDB connections and operations"""
+    """
+    Manages MongoDB connections and operations
     
-    def __init__(self):
-        
-        self.client = None
+    All managers share the process-wide pooled MongoClient from
+    ClientRegistry; constructing one after the first costs no round trips.
+    """
+    
+    def __init__(self, client=None):
+        """
+        Args:
+            client: MongoClient-compatible client to use instead of the
+                shared one (not pinged)
+        """
+        self.client = client
+        self.shared_client = client is None
         self.db = None
         self.conversations = None
+        self.counters = None
+        self.messages = None
+        self.raw_conversations = None
+        self.embed_messages = Config.MESSAGE_STORAGE != BUCKETED
         self.connect()
     
     def connect(self):
-        """Establish connection to MongoDB"""
+        """Attach to the shared MongoDB client (pings until it is reached once)"""
         try:
-            print(f"🔄 Connecting to MongoDB...")
-            print(f"   URI: {Config.MONGODB_URI[:20]}...")
-            print(f"   Database: {Config.MONGODB_DATABASE}")
-            
-            self.client = MongoClient(
-                Config.MONGODB_URI,
-                serverSelectionTimeoutMS=10000
-            )
-            # Test connection
-            self.client.admin.command('ping')
+            if self.shared_client:
+                self.client = ClientRegistry.get_mongo_client()
+                ClientRegistry.ensure_mongo_ready()
             
             self.db = self.client[Config.MONGODB_DATABASE]
             self.conversations = self.db[Config.CONVERSATIONS_COLLECTION]
+            self.counters = self.db[Config.STATS_COLLECTION]
+            self.messages = self.db[Config.MESSAGES_COLLECTION]
+            self.raw_conversations = raw_collection(self.conversations)
             
             # Create indexes for better performance
             self._create_indexes()
-            
-            print(f"✅ Connected to MongoDB Cloud: {Config.MONGODB_DATABASE}")
             return True
-            
+        
         except ConnectionFailure as e:
             print(f"❌ Failed to connect to MongoDB: {e}")
             print("💡 Please check your MongoDB Atlas connection string and network access")
@@ -49,10 +595,19 @@ class DatabaseManager:
             return False
     
     def _create_indexes(self):
-        """Create indexes for efficient querying"""
-        # Index on created_at for time-based queries
-        self.conversations.create_index("created_at")
-        self.conversations.create_index("user_id")
+        """Create indexes for efficient querying (once per process)"""
+        global _indexes_created
+        if _indexes_created:
+            return
+        with _indexes_lock:
+            if _indexes_created:
+                return
+            for keys in CONVERSATION_INDEXES:
+                self.conversations.create_index(keys)
+            if not self.embed_messages:
+                # The messages collection only exists in bucketed mode
+                self.messages.create_index(BUCKET_INDEX, unique=True)
+            _indexes_created = True
     
     def save_complete_conversation(self,
                                    user_id: str,
@@ -74,75 +629,648 @@ class DatabaseManager:
         if self.conversations is None:
             raise ConnectionError("Not connected to MongoDB. Please check your connection.")
         
-        conversation = {
-            "user_id": user_id,
-            "created_at": created_at,
-            "completed_at": datetime.utcnow(),
-            "total_messages": len(messages),
-            "messages": messages,  # Full conversation history
-            "overall_sentiment": conversation_summary.get("full_conversation_sentiment", {}),
-            "sentiment_journey": conversation_summary.get("sentiment_journey", {}),
-            "key_emotional_moments": conversation_summary.get("key_emotional_moments", []),
-            "insights": conversation_summary.get("insights", []),
-            "full_summary": conversation_summary  # Complete summary
-        }
+        conversation = build_conversation_document(
+            user_id, messages, conversation_summary, created_at, self.embed_messages
+        )
         
         result = self.conversations.insert_one(conversation)
+        if not self.embed_messages and messages:
+            self.messages.bulk_write(build_bucket_ops({
+                "conversation_id": str(result.inserted_id),
+                "turns": messages,
+                "start_index": 0
+            }, Config.MESSAGE_BUCKET_SIZE), ordered=False)
+        self._increment_stats({
+            "total_conversations": 1,
+            "total_messages": len(messages),
+            **build_stats_increment([{"summary": conversation_summary}], 0)
+        })
         print(f"💾 Complete conversation saved to MongoDB (ID: {result.inserted_id})")
         return str(result.inserted_id)
     
-    def get_conversation(self, conversation_id: str) -> Optional[Dict]:
-        """Get a conversation by ID"""
-        from bson.objectid import ObjectId
-        return self.conversations.find_one({"_id": ObjectId(conversation_id)})
+    @staticmethod
+    def new_conversation_id() -> str:
+        """Allocate a conversation ID client-side (no round trip)"""
+        return str(ObjectId())
     
-    def get_recent_conversations(self, limit: int = 10) -> List[Dict]:
-        """Get recent conversations"""
-        return list(self.conversations.find().sort("created_at", -1).limit(limit))
+    def append_turns(self,
+                     conversation_id: str,
+                     user_id: str,
+                     created_at: datetime,
+                     turns: List[Dict],
+                     start_index: Optional[int] = None):
+        """
+        Atomically append turns to a conversation, creating it if needed
+        
+        Args:
+            conversation_id: ID from new_conversation_id()
+            user_id: User identifier
+            created_at: When conversation started
+            turns: New message exchanges, in order
+            start_index: Position of the first new turn (makes retries idempotent)
+        """
+        self.apply_conversation_writes([{
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "turns": turns,
+            "start_index": start_index
+        }])
     
-    def get_statistics(self) -> Dict:
-        """Get database statistics"""
-        total_conversations = self.conversations.count_documents({})
-        
-        # Calculate total messages across all conversations
-        pipeline = [
-            {"$group": {
-                "_id": None,
-                "total_messages": {"$sum": "$total_messages"}
-            }}
-        ]
-        msg_result = list(self.conversations.aggregate(pipeline))
-        total_messages = msg_result[0]["total_messages"] if msg_result else 0
-        
-        # Average sentiment from overall_sentiment.average_sentiment_score
-        pipeline = [
-            {"$group": {
-                "_id": None,
-                "avg_sentiment": {"$avg": "$overall_sentiment.average_sentiment_score"}
-            }}
-        ]
-        avg_result = list(self.conversations.aggregate(pipeline))
-        avg_sentiment = avg_result[0]["avg_sentiment"] if avg_result else 0
+    def finalize_conversation(self,
+                              conversation_id: str,
+                              user_id: str,
+                              created_at: datetime,
+                              conversation_summary: Optional[Dict],
+                              status: str = "completed"):
+        """
+        Mark a conversation finished and $set its summary
+        
+        Args:
+            conversation_id: ID from new_conversation_id()
+            user_id: User identifier
+            created_at: When conversation started
+            conversation_summary: Overall sentiment and summary (None if abandoned)
+            status: "completed" or "abandoned"
+        """
+        self.apply_conversation_writes([{
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "summary": conversation_summary,
+            "status": status
+        }])
+        print(f"💾 Conversation finalized in MongoDB (ID: {conversation_id})")
+    
+    def apply_conversation_writes(self, writes: List[Dict]):
+        """
+        Apply conversation write records in one unordered bulk_write
+        
+        Records for the same conversation must already be coalesced into one
+        (see src.services.persistence.coalesce_writes) because unordered
+        batches do not guarantee execution order.
+        
+        In bucketed mode the turns are written to their buckets first; those
+        writes are idempotent, so a failure before the conversation update
+        is simply repaired by the replay.
+        
+        Raises:
+            ValueError: A record's conversation is not stored or the record
+                would leave a gap; the rest of the batch is still applied
+        """
+        if self.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        if not writes:
+            return None
         
-        return {
-            "total_conversations": total_conversations,
-            "total_messages": total_messages,
-            "average_sentiment": round(avg_sentiment, 3) if avg_sentiment else 0
+        if not self.embed_messages:
+            bucket_ops = [
+                op for write in writes
+                for op in build_bucket_ops(write, Config.MESSAGE_BUCKET_SIZE)
+            ]
+            if bucket_ops:
+                self.messages.bulk_write(bucket_ops, ordered=False)
+        
+        write_id = ObjectId()
+        result = None
+        try:
+            with get_metrics().span("db_write"):
+                result = self.conversations.bulk_write(
+                    [build_write_op(write, self.embed_messages, write_id) for write in writes],
+                    ordered=False
+                )
+            suspects, upserted = bulk_outcome(writes, result)
+        except BulkWriteError as e:
+            suspects, upserted = bulk_outcome(writes, error=e)
+        if not suspects:
+            self._increment_stats(build_stats_increment(writes, upserted))
+            return result
+        
+        ids = list({ObjectId(writes[index]["conversation_id"]) for index in suspects})
+        stored = {
+            document["_id"]: document
+            for document in self.conversations.find({"_id": {"$in": ids}}, {"total_messages": 1, "write_id": 1})
         }
+        applied, retry, gaps = settle_writes(writes, suspects, stored, write_id)
+        for write in retry:
+            self.conversations.bulk_write([build_write_op(write, self.embed_messages, write_id)])
+        self._increment_stats(build_stats_increment(applied + retry, upserted))
+        if gaps:
+            raise ValueError("; ".join(gaps))
+        return None
+    
+    def _increment_stats(self, inc: Dict):
+        """
+        Apply counter increments to the statistics document
+        
+        Not transactional with the conversation write: if this fails the
+        counters drift until rebuild_statistics() is run.
+        """
+        if not inc:
+            return
+        try:
+            self.counters.update_one({"_id": STATS_ID}, {"$inc": inc}, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Statistics counters not updated (run rebuild-stats): {e}")
+    
+    def _reader(self, lazy: Optional[bool]):
+        """
+        Collection and reader for a query
+        
+        Lazy reads fetch raw BSON and wrap it in a LazyConversation, which
+        decodes fields only as they are accessed (default LAZY_DOCUMENTS).
+        """
+        if Config.LAZY_DOCUMENTS if lazy is None else lazy:
+            return self.raw_conversations, read_lazy_conversation
+        return self.conversations, read_conversation
+    
+    def get_conversation(self, conversation_id: str,
+                         include_messages: bool = True,
+                         lazy: Optional[bool] = None) -> Optional[Dict]:
+        """
+        Get a conversation by ID
+        
+        Args:
+            conversation_id: Conversation to read
+            include_messages: Load a bucketed transcript too; pass False and
+                page it with get_messages for long conversations
+            lazy: Decode fields on access (default LAZY_DOCUMENTS)
+        """
+        collection, read = self._reader(lazy)
+        document = read(collection.find_one({"_id": ObjectId(conversation_id)}))
+        if document is not None and include_messages and document.get("message_storage") == BUCKETED:
+            document["messages"] = list(self.iter_bucket_messages(conversation_id))
+        return document
+    
+    def get_messages(self, conversation_id: str, start: int = 0,
+                     limit: Optional[int] = None) -> List[Dict]:
+        """
+        One page of a conversation's transcript, whichever way it is stored
+        
+        Args:
+            conversation_id: Conversation to read
+            start: Index of the first turn
+            limit: Turns to return (default MESSAGE_BUCKET_SIZE)
+        """
+        limit = limit or Config.MESSAGE_BUCKET_SIZE
+        document = self.conversations.find_one(
+            {"_id": ObjectId(conversation_id)}, message_page_projection(start, limit)
+        )
+        if document is None:
+            return []
+        if document.get("message_storage") != BUCKETED:
+            return embedded_page(document, start, limit)
+        
+        buckets = self.messages.find(
+            bucket_query(conversation_id, start, limit, Config.MESSAGE_BUCKET_SIZE)
+        ).sort("bucket", ASCENDING)
+        return slice_buckets(list(buckets), start, limit)
+    
+    def iter_bucket_messages(self, conversation_id: str) -> Iterator[Dict]:
+        """Stream a bucketed transcript one bucket at a time"""
+        cursor = self.messages.find(
+            {"conversation_id": ObjectId(conversation_id)}
+        ).sort("bucket", ASCENDING).batch_size(1)
+        with cursor:
+            for bucket in cursor:
+                yield from bucket["messages"]
+    
+    def get_recent_conversations(self, limit: int = 10, view: str = "full",
+                                 lazy: Optional[bool] = None) -> List[Dict]:
+        """Get recent conversations ("summary" view omits the transcript)"""
+        return self.find_conversations(view=view, limit=limit, lazy=lazy)["conversations"]
+    
+    def find_conversations(self,
+                           user_id: Optional[str] = None,
+                           direction: Optional[str] = None,
+                           view: str = "summary",
+                           limit: Optional[int] = None,
+                           after: Optional[str] = None,
+                           lazy: Optional[bool] = None) -> Dict:
+        """
+        One page of conversations, newest first
+        
+        Args:
+            user_id: Only this user's conversations
+            direction: Only this overall emotional direction
+            view: "summary" (no transcript) or "full"
+            limit: Page size (default QUERY_PAGE_SIZE)
+            after: next_cursor of the previous page
+            lazy: Decode fields on access (default LAZY_DOCUMENTS)
+        
+        Returns:
+            {"conversations": [...], "next_cursor": str or None}
+        """
+        limit = limit or Config.QUERY_PAGE_SIZE
+        collection, read = self._reader(lazy)
+        cursor = collection.find(
+            build_query_filter(user_id, direction, after), view_projection(view)
+        ).sort(PAGE_SORT).limit(limit + 1)
+        return build_page(list(cursor), limit, read)
     
-    def search_by_sentiment_direction(self, direction: str) -> List[Dict]:
+    def iter_conversations(self,
+                           user_id: Optional[str] = None,
+                           direction: Optional[str] = None,
+                           view: str = "summary",
+                           after: Optional[str] = None,
+                           lazy: Optional[bool] = None) -> Iterator[Dict]:
         """
-        Search conversations by overall emotional direction
+        Stream matching conversations, newest first, without materializing them
+        
+        Documents are fetched QUERY_BATCH_SIZE at a time; the server cursor
+        is closed when the iterator is exhausted or discarded.
+        """
+        collection, read = self._reader(lazy)
+        cursor = collection.find(
+            build_query_filter(user_id, direction, after), view_projection(view)
+        ).sort(PAGE_SORT).batch_size(Config.QUERY_BATCH_SIZE)
+        with cursor:
+            for document in cursor:
+                yield read(document)
+    
+    def get_statistics(self) -> Dict:
+        """Get database statistics from the counters document (built on first use)"""
+        counters = self.counters.find_one({"_id": STATS_ID})
+        if counters is None:
+            counters = self.rebuild_statistics()
+        return format_statistics(counters)
+    
+    def rebuild_statistics(self) -> Dict:
+        """
+        Recompute the counters document with one pass over all conversations
+        
+        Increments from writes that land while the aggregation runs may be
+        lost; run it when traffic is low.
+        
+        Returns:
+            The new counters document
+        """
+        counters = build_stats_document(list(self.conversations.aggregate(STATISTICS_PIPELINE)))
+        self.counters.replace_one({"_id": STATS_ID}, counters, upsert=True)
+        return counters
+    
+    def usage_report(self, group_by: str = "user",
+                     since: Optional[datetime] = None,
+                     limit: Optional[int] = None) -> List[Dict]:
+        """
+        Per-turn latency percentiles, tokens and cost, grouped server-side
+        
+        Args:
+            group_by: "user", "day", "model" or "conversation" (ranked by
+                largest prompt)
+            since: Only turns at or after this time
+            limit: Maximum rows
+        
+        Returns:
+            One row per group (see build_usage_report_pipeline)
+        """
+        if self.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        
+        # The messages collection only exists in bucketed mode
+        buckets = None if self.embed_messages else Config.MESSAGES_COLLECTION
+        pipeline = build_usage_report_pipeline(group_by, since, buckets)
+        if limit:
+            pipeline.append({"$limit": limit})
+        return list(self.conversations.aggregate(pipeline, allowDiskUse=True))
+    
+    def migrate_schema(self,
+                       batch_size: Optional[int] = None,
+                       compress_after_days: Optional[float] = None,
+                       restart: bool = False) -> Dict:
+        """
+        Rewrite stored conversations in the current schema (resumable)
+        
+        Args:
+            batch_size: Documents per batch (default MIGRATION_BATCH_SIZE)
+            compress_after_days: Also compress transcripts of conversations
+                completed at least this many days ago
+            restart: Ignore the saved checkpoint
+        
+        Returns:
+            Counts of migrated and skipped documents
+        """
+        if self.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        
+        migrator = SchemaMigrator(
+            self.conversations,
+            self.db[Config.MIGRATIONS_COLLECTION],
+            batch_size or Config.MIGRATION_BATCH_SIZE,
+            compress_after_days
+        )
+        return migrator.run(restart=restart)
+    
+    def search_by_sentiment_direction(self, direction: str,
+                                      limit: Optional[int] = None,
+                                      view: str = "full") -> List[Dict]:
+        """
+        Search conversations by overall emotional direction (newest first)
         
         Args:
             direction: e.g., "evolved_positive", "predominantly_negative", etc.
+            limit: Maximum results (default all of them); page with
+                find_conversations or stream with iter_conversations instead
+                of loading a large result set at once
+            view: "summary" (no transcript) or "full"
         """
-        return list(self.conversations.find({
-            "overall_sentiment.overall_emotional_direction": direction
-        }))
+        if limit is None:
+            return list(self.iter_conversations(direction=direction, view=view))
+        return self.find_conversations(direction=direction, view=view, limit=limit)["conversations"]
     
     def close(self):
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close()
-            print("✅ MongoDB connection closed")
\ No newline at end of file
+        """Release this manager; the pooled client stays open for reuse"""
+        self.client = None
+        self.db = None
+        self.conversations = None
+        self.counters = None
+        self.messages = None
+        self.raw_conversations = None
+
+
+class AsyncDatabaseManager:
+    """Asyncio MongoDB manager built on pymongo's AsyncMongoClient"""
+    
+    def __init__(self, client=None):
+        """
+        Args:
+            client: AsyncMongoClient-compatible client to use instead of the
+                loop's shared one (not pinged)
+        """
+        self.client = client
+        self.shared_client = client is None
+        self.db = None
+        self.conversations = None
+        self.counters = None
+        self.messages = None
+        self.raw_conversations = None
+        self.embed_messages = Config.MESSAGE_STORAGE != BUCKETED
+    
+    @classmethod
+    async def create(cls, client=None) -> "AsyncDatabaseManager":
+        """Construct and connect a manager"""
+        manager = cls(client)
+        await manager.connect()
+        return manager
+    
+    async def connect(self) -> bool:
+        """Attach to the event loop's shared AsyncMongoClient"""
+        try:
+            if self.shared_client:
+                self.client = ClientRegistry.get_async_mongo_client()
+                await ClientRegistry.ensure_async_mongo_ready()
+            
+            self.db = self.client[Config.MONGODB_DATABASE]
+            self.conversations = self.db[Config.CONVERSATIONS_COLLECTION]
+            self.counters = self.db[Config.STATS_COLLECTION]
+            self.messages = self.db[Config.MESSAGES_COLLECTION]
+            self.raw_conversations = raw_collection(self.conversations)
+            await self._create_indexes()
+            return True
+        
+        except Exception as e:
+            print(f"❌ Failed to connect to MongoDB (async): {e}")
+            self.conversations = None
+            return False
+    
+    async def _create_indexes(self):
+        """Create indexes for efficient querying (once per process)"""
+        global _indexes_created
+        if _indexes_created:
+            return
+        for keys in CONVERSATION_INDEXES:
+            await self.conversations.create_index(keys)
+        if not self.embed_messages:
+            await self.messages.create_index(BUCKET_INDEX, unique=True)
+        _indexes_created = True
+    
+    async def save_complete_conversation(self,
+                                         user_id: str,
+                                         messages: List[Dict],
+                                         conversation_summary: Dict,
+                                         created_at: datetime) -> str:
+        """Save complete conversation (see DatabaseManager.save_complete_conversation)"""
+        if self.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        
+        conversation = build_conversation_document(
+            user_id, messages, conversation_summary, created_at, self.embed_messages
+        )
+        
+        result = await self.conversations.insert_one(conversation)
+        if not self.embed_messages and messages:
+            await self.messages.bulk_write(build_bucket_ops({
+                "conversation_id": str(result.inserted_id),
+                "turns": messages,
+                "start_index": 0
+            }, Config.MESSAGE_BUCKET_SIZE), ordered=False)
+        await self._increment_stats({
+            "total_conversations": 1,
+            "total_messages": len(messages),
+            **build_stats_increment([{"summary": conversation_summary}], 0)
+        })
+        print(f"💾 Complete conversation saved to MongoDB (ID: {result.inserted_id})")
+        return str(result.inserted_id)
+    
+    async def append_turns(self,
+                           conversation_id: str,
+                           user_id: str,
+                           created_at: datetime,
+                           turns: List[Dict],
+                           start_index: Optional[int] = None):
+        """Atomically append turns (see DatabaseManager.append_turns)"""
+        await self.apply_conversation_writes([{
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "turns": turns,
+            "start_index": start_index
+        }])
+    
+    async def finalize_conversation(self,
+                                    conversation_id: str,
+                                    user_id: str,
+                                    created_at: datetime,
+                                    conversation_summary: Optional[Dict],
+                                    status: str = "completed"):
+        """Mark a conversation finished (see DatabaseManager.finalize_conversation)"""
+        await self.apply_conversation_writes([{
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "summary": conversation_summary,
+            "status": status
+        }])
+    
+    async def apply_conversation_writes(self, writes: List[Dict]):
+        """Apply coalesced conversation write records in one unordered bulk_write"""
+        if self.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        if not writes:
+            return None
+        
+        if not self.embed_messages:
+            bucket_ops = [
+                op for write in writes
+                for op in build_bucket_ops(write, Config.MESSAGE_BUCKET_SIZE)
+            ]
+            if bucket_ops:
+                await self.messages.bulk_write(bucket_ops, ordered=False)
+        
+        write_id = ObjectId()
+        result = None
+        try:
+            with get_metrics().span("db_write"):
+                result = await self.conversations.bulk_write(
+                    [build_write_op(write, self.embed_messages, write_id) for write in writes],
+                    ordered=False
+                )
+            suspects, upserted = bulk_outcome(writes, result)
+        except BulkWriteError as e:
+            suspects, upserted = bulk_outcome(writes, error=e)
+        if not suspects:
+            await self._increment_stats(build_stats_increment(writes, upserted))
+            return result
+        
+        ids = list({ObjectId(writes[index]["conversation_id"]) for index in suspects})
+        cursor = self.conversations.find({"_id": {"$in": ids}}, {"total_messages": 1, "write_id": 1})
+        stored = {document["_id"]: document for document in await cursor.to_list()}
+        applied, retry, gaps = settle_writes(writes, suspects, stored, write_id)
+        for write in retry:
+            await self.conversations.bulk_write([build_write_op(write, self.embed_messages, write_id)])
+        await self._increment_stats(build_stats_increment(applied + retry, upserted))
+        if gaps:
+            raise ValueError("; ".join(gaps))
+        return None
+    
+    async def _increment_stats(self, inc: Dict):
+        """Apply counter increments (see DatabaseManager._increment_stats)"""
+        if not inc:
+            return
+        try:
+            await self.counters.update_one({"_id": STATS_ID}, {"$inc": inc}, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Statistics counters not updated (run rebuild-stats): {e}")
+    
+    def _reader(self, lazy: Optional[bool]):
+        """Collection and reader for a query (see DatabaseManager._reader)"""
+        if Config.LAZY_DOCUMENTS if lazy is None else lazy:
+            return self.raw_conversations, read_lazy_conversation
+        return self.conversations, read_conversation
+    
+    async def get_conversation(self, conversation_id: str,
+                               include_messages: bool = True,
+                               lazy: Optional[bool] = None) -> Optional[Dict]:
+        """Get a conversation by ID (see DatabaseManager.get_conversation)"""
+        collection, read = self._reader(lazy)
+        document = read(await collection.find_one({"_id": ObjectId(conversation_id)}))
+        if document is not None and include_messages and document.get("message_storage") == BUCKETED:
+            cursor = self.messages.find(
+                {"conversation_id": ObjectId(conversation_id)}
+            ).sort("bucket", ASCENDING)
+            document["messages"] = [
+                message for bucket in await cursor.to_list() for message in bucket["messages"]
+            ]
+        return document
+    
+    async def get_messages(self, conversation_id: str, start: int = 0,
+                           limit: Optional[int] = None) -> List[Dict]:
+        """One page of a conversation's transcript (see DatabaseManager.get_messages)"""
+        limit = limit or Config.MESSAGE_BUCKET_SIZE
+        document = await self.conversations.find_one(
+            {"_id": ObjectId(conversation_id)}, message_page_projection(start, limit)
+        )
+        if document is None:
+            return []
+        if document.get("message_storage") != BUCKETED:
+            return embedded_page(document, start, limit)
+        
+        cursor = self.messages.find(
+            bucket_query(conversation_id, start, limit, Config.MESSAGE_BUCKET_SIZE)
+        ).sort("bucket", ASCENDING)
+        return slice_buckets(await cursor.to_list(), start, limit)
+    
+    async def get_recent_conversations(self, limit: int = 10, view: str = "full",
+                                       lazy: Optional[bool] = None) -> List[Dict]:
+        """Get recent conversations ("summary" view omits the transcript)"""
+        page = await self.find_conversations(view=view, limit=limit, lazy=lazy)
+        return page["conversations"]
+    
+    async def find_conversations(self,
+                                 user_id: Optional[str] = None,
+                                 direction: Optional[str] = None,
+                                 view: str = "summary",
+                                 limit: Optional[int] = None,
+                                 after: Optional[str] = None,
+                                 lazy: Optional[bool] = None) -> Dict:
+        """One page of conversations (see DatabaseManager.find_conversations)"""
+        limit = limit or Config.QUERY_PAGE_SIZE
+        collection, read = self._reader(lazy)
+        cursor = collection.find(
+            build_query_filter(user_id, direction, after), view_projection(view)
+        ).sort(PAGE_SORT).limit(limit + 1)
+        return build_page(await cursor.to_list(), limit, read)
+    
+    async def iter_conversations(self,
+                                 user_id: Optional[str] = None,
+                                 direction: Optional[str] = None,
+                                 view: str = "summary",
+                                 after: Optional[str] = None,
+                                 lazy: Optional[bool] = None) -> AsyncIterator[Dict]:
+        """Stream matching conversations (see DatabaseManager.iter_conversations)"""
+        collection, read = self._reader(lazy)
+        cursor = collection.find(
+            build_query_filter(user_id, direction, after), view_projection(view)
+        ).sort(PAGE_SORT).batch_size(Config.QUERY_BATCH_SIZE)
+        try:
+            async for document in cursor:
+                yield read(document)
+        finally:
+            await cursor.close()
+    
+    async def get_statistics(self) -> Dict:
+        """Get database statistics from the counters document (built on first use)"""
+        counters = await self.counters.find_one({"_id": STATS_ID})
+        if counters is None:
+            counters = await self.rebuild_statistics()
+        return format_statistics(counters)
+    
+    async def rebuild_statistics(self) -> Dict:
+        """Recompute the counters document (see DatabaseManager.rebuild_statistics)"""
+        cursor = await self.conversations.aggregate(STATISTICS_PIPELINE)
+        counters = build_stats_document(await cursor.to_list())
+        await self.counters.replace_one({"_id": STATS_ID}, counters, upsert=True)
+        return counters
+    
+    async def usage_report(self, group_by: str = "user",
+                           since: Optional[datetime] = None,
+                           limit: Optional[int] = None) -> List[Dict]:
+        """Per-turn latency percentiles, tokens and cost (see DatabaseManager.usage_report)"""
+        if self.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        
+        # The messages collection only exists in bucketed mode
+        buckets = None if self.embed_messages else Config.MESSAGES_COLLECTION
+        pipeline = build_usage_report_pipeline(group_by, since, buckets)
+        if limit:
+            pipeline.append({"$limit": limit})
+        cursor = await self.conversations.aggregate(pipeline, allowDiskUse=True)
+        return await cursor.to_list()
+    
+    async def search_by_sentiment_direction(self, direction: str,
+                                            limit: Optional[int] = None,
+                                            view: str = "full") -> List[Dict]:
+        """Search conversations by overall emotional direction (all of them unless limit is given)"""
+        if limit is None:
+            return [document async for document in self.iter_conversations(direction=direction, view=view)]
+        page = await self.find_conversations(direction=direction, view=view, limit=limit)
+        return page["conversations"]
+    
+    async def close(self):
+        """Release this manager; the pooled client stays open for reuse"""
+        self.client = None
+        self.db = None
+        self.conversations = None
+        self.counters = None
+        self.messages = None
+        self.raw_conversations = None
@@ -1,15 +1,21 @@
+import argparse
+from datetime import datetime
 from src.services import ChatService
+from src.services.batch import BatchRunner, read_scripts
+from src.services.export import ConversationExporter, read_watermark, write_watermark
 from src.ui.display import ConsoleDisplay
+from src.utils.metrics import start_metrics_server
+from src.utils.profiling import PROFILE_MODES
 from src.core.conversation import ConversationManager
 from config import Config
-from database import DatabaseManager
+from database import DatabaseManager, USAGE_GROUPS
 
 def display_welcome():
     """Show welcome message"""
     ConsoleDisplay.display_header("🎓 LIAPLUS ASSIGNMENT: MODULAR CHATBOT")
     print(f"✅ Using OpenAI {Config.OPENAI_MODEL}")
     print("\n💬 Type your messages below")
-    print("🚪 Type 'quit' to exit without saving")
+    print("🚪 Type 'quit' to exit without a summary (messages are saved as you chat)")
     print("👋 Type 'bye' or 'goodbye' to end and save conversation")
     print("📊 Type 'stats' to see database statistics\n")
 
@@ -18,15 +24,158 @@ def get_user_id() -> str:
     user_id = input("Enter your user ID (or press Enter for 'anonymous'): ").strip()
     return user_id if user_id else "anonymous"
 
+_stats_manager = None
+
+def get_stats_manager() -> ConversationManager:
+    """Shared manager for stats lookups (reads go through its cache), reconnected if MongoDB was down"""
+    global _stats_manager
+    if _stats_manager is None:
+        _stats_manager = ConversationManager()
+    elif _stats_manager.db.conversations is None:
+        # MongoDB was unreachable last time; try again
+        _stats_manager.db.connect()
+    return _stats_manager
+
 def handle_stats():
     """Display database statistics"""
     try:
-        db = DatabaseManager()
-        stats = db.get_statistics()
+        manager = get_stats_manager()
+        if manager.db.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        stats = manager.get_statistics()
         ConsoleDisplay.display_statistics(stats)
     except Exception as e:
         print(f"❌ Error retrieving statistics: {e}")
 
+def handle_rebuild_stats():
+    """Recompute the statistics counters from every stored conversation"""
+    db = DatabaseManager()
+    if db.conversations is None:
+        raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+    
+    print("🔄 Rebuilding statistics counters...")
+    db.rebuild_statistics()
+    ConsoleDisplay.display_statistics(db.get_statistics())
+
+def handle_migrate_schema(args: argparse.Namespace):
+    """Rewrite stored conversations in the current schema"""
+    db = DatabaseManager()
+    if db.conversations is None:
+        raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+    
+    result = db.migrate_schema(
+        batch_size=args.batch_size,
+        compress_after_days=args.compress_after_days,
+        restart=args.restart
+    )
+    print(f"✅ Migration finished: {result['migrated']} migrated, {result['skipped']} skipped "
+          f"(changed during migration, rerun with --restart)")
+
+def handle_export(args: argparse.Namespace):
+    """Stream stored conversations to a JSONL or Parquet file"""
+    since = {"updated_at": datetime.fromisoformat(args.since)} if args.since else None
+    if since is None and args.watermark_file:
+        since = read_watermark(args.watermark_file)
+    
+    exporter = ConversationExporter(per_turn=args.per_turn, status=args.status)
+    watermark = exporter.export(args.output, args.format, since)
+    if args.watermark_file:
+        write_watermark(args.watermark_file, watermark)
+
+def handle_usage_report(args: argparse.Namespace):
+    """Latency percentiles, tokens and cost of stored turns, per group"""
+    db = DatabaseManager()
+    if db.conversations is None:
+        raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+    
+    since = datetime.fromisoformat(args.since) if args.since else None
+    rows = db.usage_report(group_by=args.by, since=since, limit=args.limit)
+    ConsoleDisplay.display_usage_report(rows, args.by)
+
+def handle_batch(args: argparse.Namespace):
+    """Run scripted conversations from a JSONL file without prompting"""
+    runner = BatchRunner(workers=args.workers, persist=args.persist, goodbye=args.goodbye)
+    with open(args.input, encoding="utf-8") as scripts, \
+            open(args.output, "w", encoding="utf-8") as output:
+        result = runner.run(read_scripts(scripts), output)
+    print(f"✅ Batch finished: {result['completed']} completed, {result['failed']} failed "
+          f"(results in {args.output})")
+
+def report_saved(chat_service: ChatService, conversation_id: str):
+    """Wait for queued writes, then report whether the conversation reached MongoDB"""
+    write_queue = chat_service.conversation_manager.write_queue
+    if write_queue is None:
+        print(f"💾 Conversation saved with ID: {conversation_id}")
+        return
+    
+    failed_before = write_queue.failed
+    write_queue.flush()
+    spool = write_queue.stats()["spool"]
+    if write_queue.failed > failed_before:
+        print(f"❌ Conversation {conversation_id} could not be saved")
+    elif spool and spool["pending"]:
+        print(f"💾 Conversation {conversation_id} queued locally; "
+              f"it is saved once MongoDB is reachable")
+    else:
+        print(f"💾 Conversation saved with ID: {conversation_id}")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments (no command starts the chat)"""
+    parser = argparse.ArgumentParser(description="LiaPlus sentiment chatbot")
+    parser.add_argument("--profile", choices=list(PROFILE_MODES), default=None,
+                        help="profile turns: cProfile, tracemalloc diffs or both (default PROFILE)")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser(
+        "rebuild-stats",
+        help="recompute the statistics counters from all conversations"
+    )
+    migrate = commands.add_parser(
+        "migrate-schema",
+        help="rewrite stored conversations in the current schema (resumable)"
+    )
+    migrate.add_argument("--batch-size", type=int, default=None,
+                         help="documents per batch (default MIGRATION_BATCH_SIZE)")
+    migrate.add_argument("--compress-after-days", type=float, default=None,
+                         help="compress transcripts of conversations completed this many days ago")
+    migrate.add_argument("--restart", action="store_true",
+                         help="ignore the checkpoint and scan every conversation again")
+    batch = commands.add_parser(
+        "batch",
+        help="run scripted conversations from JSONL concurrently"
+    )
+    batch.add_argument("input", help="JSONL file: one list of user messages (or object) per line")
+    batch.add_argument("output", help="JSONL file for responses, summaries, usage and latencies")
+    batch.add_argument("--workers", type=int, default=None,
+                       help="conversations run at once (default BATCH_WORKERS)")
+    batch.add_argument("--persist", action="store_true",
+                       help="save the conversations to MongoDB")
+    batch.add_argument("--goodbye", default=None,
+                       help="message sent after each script to get a conversation summary")
+    usage = commands.add_parser(
+        "usage-report",
+        help="p50/p95/p99 turn latency, tokens and cost per user, day, model or conversation"
+    )
+    usage.add_argument("--by", choices=list(USAGE_GROUPS), default="user",
+                       help="grouping (conversation ranks by largest prompt)")
+    usage.add_argument("--since", default=None,
+                       help="only turns at or after this ISO timestamp")
+    usage.add_argument("--limit", type=int, default=None, help="maximum rows")
+    export = commands.add_parser(
+        "export",
+        help="stream stored conversations to JSONL or Parquet"
+    )
+    export.add_argument("output", help="output file")
+    export.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    export.add_argument("--per-turn", action="store_true",
+                        help="one row per message exchange instead of per conversation")
+    export.add_argument("--status", default=None,
+                        help="only conversations with this status (e.g. completed)")
+    export.add_argument("--since", default=None,
+                        help="only conversations created or updated after this ISO timestamp")
+    export.add_argument("--watermark-file", default=None,
+                        help="read --since from this file and store the new watermark in it")
+    return parser.parse_args(argv)
+
 def main():
     """Run the CLI chatbot"""
     display_welcome()
@@ -39,13 +188,15 @@ def main():
             user_input = input("\nYou: ").strip()
         except (EOFError, KeyboardInterrupt):
             print("\n👋 Exiting...")
+            chat_service.close()
             break
         
         if not user_input:
             continue
         
         if user_input.lower() == 'quit':
-            print("\n👋 Exiting without saving conversation...")
+            print("\n👋 Exiting without a conversation summary...")
+            chat_service.close()
             cost = chat_service.chatbot.get_cost_estimate()
             ConsoleDisplay.display_cost(cost)
             break
@@ -54,19 +205,21 @@ def main():
             handle_stats()
             continue
         
-        # Send message
-        print("\n⏳ Processing...")
-        response_data = chat_service.send_message(user_input)
-        
-        # Display response
-        ConsoleDisplay.display_response(response_data)
+        # Send message and display response as it streams in
+        print()
+        ConsoleDisplay.display_stream(chat_service.stream_message(user_input))
+        response_data = chat_service.last_response or {}
+        last_message = chat_service.chatbot.get_last_message()
+        if last_message and last_message['user_message'] == user_input:
+            ConsoleDisplay.display_sentiment(last_message.get('sentiment'))
+        ConsoleDisplay.display_response_footer(response_data)
         
         # Check if chat ended
         if not chat_service.chatbot.chat_active:
             print("\n✅ Conversation completed!")
             conversation_id = chat_service.end_conversation()
             if conversation_id:
-                print(f"💾 Conversation saved with ID: {conversation_id}")
+                report_saved(chat_service, conversation_id)
             
             cost = chat_service.chatbot.get_cost_estimate()
             ConsoleDisplay.display_cost(cost)
@@ -79,8 +232,25 @@ def main():
 
 if __name__ == "__main__":
     try:
-        Config.validate()
-        main()
+        args = parse_args()
+        if args.profile:
+            Config.PROFILE = args.profile
+        if Config.METRICS_PORT:
+            start_metrics_server()
+        if args.command == "rebuild-stats":
+            handle_rebuild_stats()
+        elif args.command == "migrate-schema":
+            handle_migrate_schema(args)
+        elif args.command == "export":
+            handle_export(args)
+        elif args.command == "usage-report":
+            handle_usage_report(args)
+        elif args.command == "batch":
+            Config.validate()
+            handle_batch(args)
+        else:
+            Config.validate()
+            main()
     except Exception as e:
         print(f"\n❌ Error: {e}")
     finally:
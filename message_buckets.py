@@ -0,0 +1,101 @@
+"""
+Bucketed transcript storage
+
+In "bucketed" MESSAGE_STORAGE mode turns are not embedded in the
+conversation document. They are stored in fixed-size buckets in the messages
+collection, one document per MESSAGE_BUCKET_SIZE turns:
+
+    {conversation_id, bucket, start_index, count, messages: [...]}
+
+Turn i of a conversation lives at position i % size of bucket i // size, so
+a write is an idempotent overwrite of known slots and replaying it is
+harmless. Transcripts are read a bucket at a time.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Tuple
+from bson.objectid import ObjectId
+from pymongo import UpdateOne, ASCENDING
+from schema import encode_messages
+
+BUCKET_INDEX = [("conversation_id", ASCENDING), ("bucket", ASCENDING)]
+
+
+def bucket_span(start_index: int, count: int, size: int) -> List[Tuple[int, int, int]]:
+    """
+    Split a run of turns across buckets
+    
+    Args:
+        start_index: Position of the first turn in the conversation
+        count: Number of turns
+        size: Turns per bucket
+    
+    Returns:
+        (bucket, offset in bucket, offset in the run) for each bucket touched
+    """
+    spans = []
+    position = start_index
+    while position < start_index + count:
+        bucket, offset = divmod(position, size)
+        spans.append((bucket, offset, position - start_index))
+        position = (bucket + 1) * size
+    return spans
+
+
+def build_bucket_ops(write: Dict, size: int) -> List[UpdateOne]:
+    """
+    Upserts storing a write record's turns in their buckets
+    
+    Each update rewrites only the slots the turns occupy (existing turns
+    before and after them are kept), using an update pipeline so a new
+    bucket starts as an array. Turns are wrapped in $literal because user
+    text may begin with "$".
+    """
+    turns = encode_messages(write.get("turns") or [])
+    if not turns:
+        return []
+    if write.get("start_index") is None:
+        raise ValueError("Bucketed message storage needs the start_index of appended turns")
+    
+    conversation_id = ObjectId(write["conversation_id"])
+    now = datetime.utcnow()
+    operations = []
+    for bucket, offset, first in bucket_span(write["start_index"], len(turns), size):
+        chunk = turns[first:first + size - offset]
+        existing = {"$ifNull": ["$messages", []]}
+        operations.append(UpdateOne(
+            {"conversation_id": conversation_id, "bucket": bucket},
+            [
+                {"$set": {
+                    "start_index": bucket * size,
+                    "updated_at": now,
+                    "messages": {"$concatArrays": [
+                        {"$slice": [existing, offset]},
+                        {"$literal": chunk},
+                        {"$slice": [existing, offset + len(chunk), size]}
+                    ]}
+                }},
+                {"$set": {"count": {"$size": "$messages"}}}
+            ],
+            upsert=True
+        ))
+    return operations
+
+
+def bucket_query(conversation_id: str, start: int, limit: int, size: int) -> Dict:
+    """Filter for the buckets holding turns [start, start + limit)"""
+    return {
+        "conversation_id": ObjectId(conversation_id),
+        "bucket": {"$gte": start // size, "$lte": (start + limit - 1) // size}
+    }
+
+
+def slice_buckets(buckets: List[Dict], start: int, limit: int) -> List[Dict]:
+    """Turns [start, start + limit) from buckets sorted by bucket number"""
+    messages = []
+    for bucket in buckets:
+        first = max(start - bucket["start_index"], 0)
+        messages.extend(bucket["messages"][first:first + limit - len(messages)])
+        if len(messages) >= limit:
+            break
+    return messages
@@ -0,0 +1,329 @@
+"""
+Conversation document schema versions
+
+v1: summary stored twice (top-level fields and full_summary), message
+    timestamps as ISO strings, messages always embedded as an array.
+v2: summary stored once (fields not promoted to the top level are kept in
+    summary_extra), native datetime timestamps, and archived conversations
+    may hold their messages zlib-compressed in messages_z.
+
+Readers go through read_conversation, which returns the v2 shape with
+messages decompressed whatever version is stored, or LazyConversation, which
+presents the same shape over raw BSON and decodes fields as they are read.
+"""
+
+import zlib
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+import bson
+from bson.binary import Binary
+from bson.raw_bson import RawBSONDocument
+from pymongo import ReplaceOne
+
+SCHEMA_VERSION = 2
+
+# Summary keys promoted to top-level document fields (stored key -> summary key)
+SUMMARY_FIELDS = {
+    "overall_sentiment": "full_conversation_sentiment",
+    "sentiment_journey": "sentiment_journey",
+    "key_emotional_moments": "key_emotional_moments",
+    "insights": "insights"
+}
+
+MIGRATION_ID = "schema_v2"
+
+
+def summary_fields(conversation_summary: Dict) -> Dict:
+    """Top-level document fields derived from a conversation summary (v2)"""
+    fields = {
+        "overall_sentiment": conversation_summary.get("full_conversation_sentiment", {}),
+        "sentiment_journey": conversation_summary.get("sentiment_journey", {}),
+        "key_emotional_moments": conversation_summary.get("key_emotional_moments", []),
+        "insights": conversation_summary.get("insights", [])
+    }
+    extra = {
+        key: value for key, value in conversation_summary.items()
+        if key not in SUMMARY_FIELDS.values()
+    }
+    if extra:
+        fields["summary_extra"] = extra
+    return fields
+
+
+def conversation_summary(document: Dict) -> Optional[Dict]:
+    """Rebuild the model's conversation summary from a stored document (v1 or v2)"""
+    if "full_summary" in document:
+        return document["full_summary"]
+    if "overall_sentiment" not in document:
+        return None
+    summary = dict(document.get("summary_extra") or {})
+    for field, key in SUMMARY_FIELDS.items():
+        summary[key] = document.get(field)
+    return summary
+
+
+def parse_timestamp(value):
+    """Native datetime for a stored timestamp (v1 ISO strings are parsed)"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def encode_messages(messages: List[Dict]) -> List[Dict]:
+    """Message exchanges as stored in v2 (native datetime timestamps)"""
+    encoded = []
+    for message in messages:
+        if isinstance(message.get("timestamp"), str):
+            message = dict(message, timestamp=parse_timestamp(message["timestamp"]))
+        encoded.append(message)
+    return encoded
+
+
+def compress_messages(messages: List[Dict]) -> Binary:
+    """zlib-compressed BSON of a message array"""
+    return Binary(zlib.compress(bson.encode({"messages": messages})))
+
+
+def decompress_messages(data: bytes) -> List[Dict]:
+    """Inverse of compress_messages"""
+    return bson.decode(zlib.decompress(data))["messages"]
+
+
+def upgrade_document(document: Dict, compress: bool = False) -> Dict:
+    """
+    Rewrite a stored document in the current schema
+    
+    Args:
+        document: Stored conversation (any version)
+        compress: Store the messages compressed in messages_z
+    
+    Returns:
+        A new v2 document with the same _id
+    """
+    upgraded = {
+        key: value for key, value in document.items()
+        if key not in ("full_summary", "messages", "messages_z")
+    }
+    summary = document.get("full_summary")
+    if summary:
+        upgraded.update(summary_fields(summary))
+    
+    messages = read_messages(document)
+    if messages is not None:
+        messages = encode_messages(messages)
+        if compress:
+            upgraded["messages_z"] = compress_messages(messages)
+        else:
+            upgraded["messages"] = messages
+    if "updated_at" not in upgraded:
+        # Incremental exports select on updated_at
+        upgraded["updated_at"] = parse_timestamp(document.get("completed_at") or document.get("created_at"))
+    upgraded["schema_version"] = SCHEMA_VERSION
+    return upgraded
+
+
+def read_messages(document: Dict) -> Optional[List[Dict]]:
+    """Message array of a stored document, decompressed if needed"""
+    if document.get("messages_z") is not None:
+        return decompress_messages(document["messages_z"])
+    return document.get("messages")
+
+
+def read_conversation(document: Optional[Dict]) -> Optional[Dict]:
+    """
+    Normalize a stored document (v1 or v2) to the v2 read shape
+    
+    Messages are returned uncompressed with datetime timestamps; fields the
+    query projected out stay absent.
+    """
+    if document is None:
+        return None
+    if document.get("schema_version", 1) < SCHEMA_VERSION:
+        return upgrade_document(document)
+    if document.get("messages_z") is not None:
+        document = dict(document)
+        document["messages"] = decompress_messages(document.pop("messages_z"))
+    return document
+
+
+class LazyConversation(MutableMapping):
+    """
+    Conversation in the v2 read shape, backed by a RawBSONDocument
+    
+    Nothing is decoded up front. Reading a field decodes it (nested
+    documents stay raw until they are read in turn), a compressed transcript
+    is only decompressed when "messages" is read, and v1 documents are
+    upgraded field by field. Assigned fields are kept in an overlay, so
+    callers can use it like the dict read_conversation returns.
+    """
+    
+    HIDDEN = ("full_summary", "messages_z")
+    
+    def __init__(self, raw: RawBSONDocument):
+        self._raw = raw
+        self._fields: Dict[str, Any] = {}
+        self._deleted = set()
+        self._legacy = raw.get("schema_version", 1) < SCHEMA_VERSION
+    
+    def _summary_field(self, key: str) -> Any:
+        """Promoted summary field of a v1 document, derived from full_summary"""
+        return summary_fields(self._raw["full_summary"])[key]
+    
+    def _decode(self, key: str) -> Any:
+        """Value of a field in the v2 read shape (KeyError if absent)"""
+        raw = self._raw
+        if key in self.HIDDEN:
+            raise KeyError(key)
+        if key == "messages":
+            if raw.get("messages_z") is not None:
+                return decompress_messages(raw["messages_z"])
+            return encode_messages(raw["messages"]) if self._legacy else raw["messages"]
+        if key == "schema_version":
+            return SCHEMA_VERSION
+        if key == "updated_at" and self._legacy and "updated_at" not in raw:
+            return parse_timestamp(raw.get("completed_at") or raw.get("created_at"))
+        if self._legacy and "full_summary" in raw and (key in SUMMARY_FIELDS or key == "summary_extra"):
+            return self._summary_field(key)
+        return raw[key]
+    
+    def _raw_keys(self) -> List[str]:
+        """Field names of the v2 read shape present in the raw document"""
+        keys = [key for key in self._raw if key not in self.HIDDEN]
+        if self._raw.get("messages_z") is not None:
+            keys.append("messages")
+        if self._legacy:
+            keys.extend(["schema_version", "updated_at"])
+            if "full_summary" in self._raw:
+                keys.extend(summary_fields(self._raw["full_summary"]))
+        return list(dict.fromkeys(keys))
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self._deleted:
+            raise KeyError(key)
+        if key not in self._fields:
+            self._fields[key] = self._decode(key)
+        return self._fields[key]
+    
+    def __setitem__(self, key: str, value: Any):
+        self._fields[key] = value
+        self._deleted.discard(key)
+    
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        self._fields.pop(key, None)
+        self._deleted.add(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        keys = self._raw_keys()
+        keys.extend(key for key in self._fields if key not in keys)
+        return (key for key in keys if key not in self._deleted)
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __repr__(self) -> str:
+        return f"LazyConversation(_id={self._raw.get('_id')!r})"
+    
+    def to_dict(self) -> Dict:
+        """Fully decoded copy (same as read_conversation's result)"""
+        return bson.decode(bson.encode(dict(self)))
+
+
+def read_lazy_conversation(document: Optional[RawBSONDocument]) -> Optional[LazyConversation]:
+    """Wrap a raw stored document (v1 or v2) without decoding it"""
+    return LazyConversation(document) if document is not None else None
+
+
+class SchemaMigrator:
+    """
+    Rewrites stored conversations in the current schema, in batches
+    
+    Documents are visited in _id order and the last _id of every finished
+    batch is checkpointed, so an interrupted run resumes where it stopped.
+    Each replace is conditional on the document's total_messages and
+    schema_version being unchanged; a conversation written to meanwhile is
+    skipped and picked up by the next run with restart=True.
+    """
+    
+    def __init__(self, conversations, checkpoints, batch_size: int = 100,
+                 compress_after_days: Optional[float] = None):
+        """
+        Args:
+            conversations: Conversations collection
+            checkpoints: Collection holding the migration checkpoint
+            batch_size: Documents rewritten per bulk_write
+            compress_after_days: Compress messages of conversations completed
+                at least this many days ago (None: never compress)
+        """
+        self.conversations = conversations
+        self.checkpoints = checkpoints
+        self.batch_size = batch_size
+        self.compress_after_days = compress_after_days
+        self.migrated = 0
+        self.skipped = 0
+    
+    def _should_compress(self, document: Dict) -> bool:
+        """Whether a document counts as archived"""
+        if self.compress_after_days is None or document.get("status") != "completed":
+            return False
+        completed_at = document.get("completed_at")
+        cutoff = datetime.utcnow() - timedelta(days=self.compress_after_days)
+        return isinstance(completed_at, datetime) and completed_at <= cutoff
+    
+    def _needs_rewrite(self, document: Dict) -> bool:
+        """Whether a document is behind the current schema or due for compression"""
+        if document.get("schema_version", 1) < SCHEMA_VERSION:
+            return True
+        return document.get("messages_z") is None and self._should_compress(document)
+    
+    def run(self, restart: bool = False) -> Dict:
+        """
+        Migrate every document after the checkpoint
+        
+        Args:
+            restart: Ignore the checkpoint and scan from the beginning
+        
+        Returns:
+            Counts of migrated and skipped documents
+        """
+        if restart:
+            self.checkpoints.delete_one({"_id": MIGRATION_ID})
+        checkpoint = self.checkpoints.find_one({"_id": MIGRATION_ID}) or {}
+        last_id = checkpoint.get("last_id")
+        
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            batch = list(self.conversations.find(query).sort("_id", 1).limit(self.batch_size))
+            if not batch:
+                break
+            
+            operations = [
+                ReplaceOne(
+                    {
+                        "_id": document["_id"],
+                        "total_messages": document.get("total_messages"),
+                        "schema_version": document.get("schema_version")
+                    },
+                    upgrade_document(document, compress=self._should_compress(document))
+                )
+                for document in batch if self._needs_rewrite(document)
+            ]
+            if operations:
+                result = self.conversations.bulk_write(operations, ordered=False)
+                self.migrated += result.modified_count
+                self.skipped += len(operations) - result.matched_count
+            
+            last_id = batch[-1]["_id"]
+            self.checkpoints.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {"last_id": last_id, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            print(f"🔄 Migrated {self.migrated} conversations (checkpoint {last_id})")
+        
+        return {"migrated": self.migrated, "skipped": self.skipped}
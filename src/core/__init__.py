@@ -1,5 +1,12 @@
 """Core business logic modules"""
-from .chatbot import SentimentChatbot
-from .conversation import ConversationManager
+from .chatbot import SentimentChatbot, AsyncSentimentChatbot
+from .conversation import ConversationManager, AsyncConversationManager
+from .sentiment import SentimentScorer
 
-__all__ = ["SentimentChatbot", "ConversationManager"]
+__all__ = [
+    "SentimentChatbot",
+    "AsyncSentimentChatbot",
+    "ConversationManager",
+    "AsyncConversationManager",
+    "SentimentScorer"
+]
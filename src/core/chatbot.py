@@ -1,15 +1,25 @@
 """Chatbot core logic - handles OpenAI API calls"""
 
 import json
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Iterator, AsyncIterator, Tuple
 from datetime import datetime
-from openai import OpenAI
 from config import Config
+from clients import ClientRegistry
+from src.utils.helpers import StreamingFieldParser
+from src.utils.constants import API_COSTS
+from src.utils.metrics import get_metrics
 from .prompts import Prompts
+from .context import ContextWindow
+from .response_cache import ResponseCache, get_response_cache
+from .sentiment import get_sentiment_scorer
 
 
-class SentimentChatbot:
-    """Main chatbot class for handling conversations"""
+class BaseChatbot:
+    """
+    Conversation state and request/response handling shared by the sync and
+    async chatbots. Subclasses only add the client and the API round trip.
+    """
     
     def __init__(self, user_id: str = "anonymous"):
         self.user_id = user_id
@@ -17,11 +27,18 @@ class SentimentChatbot:
         self.chat_active = True
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self.total_cached_tokens = 0
         self.conversation_start = datetime.utcnow()
         self.conversation_summary: Optional[Dict] = None
-        
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.last_response: Optional[Dict] = None
         self.model = Config.OPENAI_MODEL
+        self.context = ContextWindow()
+        self.response_cache = get_response_cache()
+        self.sentiment_scorer = get_sentiment_scorer()
+        self.metrics = get_metrics()
+        self.turn_timings: Dict[str, float] = {}  # stage -> ms, for the last turn
+        self._turn_start = time.perf_counter()
+        self._turn_usage = self._empty_usage()
         
         print(f"💬 Starting new conversation for user: {user_id}")
     
@@ -41,91 +58,392 @@ class SentimentChatbot:
     
     def _build_messages(self) -> List[Dict]:
         """Build OpenAI messages format from conversation history"""
-        messages = [{"role": "system", "content": Prompts.get_system_prompt()}]
+        return self.context.build_messages(Prompts.get_system_prompt(), self.conversation_history)
+    
+    def preview_input_tokens(self, user_message: str) -> int:
+        """Estimate the input tokens the next request would use (no API call)"""
+        return self.context.preview_tokens(
+            Prompts.get_system_prompt(), self.conversation_history, user_message
+        )
+    
+    def _build_request(self, user_message: str, stream: bool = False) -> Dict:
+        """Build chat.completions.create keyword arguments for a turn"""
+        with self.metrics.span("history_build", self.turn_timings):
+            messages = self._build_messages()
+        messages.append({"role": "user", "content": user_message})
         
-        for msg in self.conversation_history:
-            messages.append({"role": "user", "content": msg['user_message']})
-            messages.append({"role": "assistant", "content": json.dumps({
-                "response": msg['bot_response']
-            })})
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "response_format": {"type": "json_object"}
+        }
+        if Config.PROMPT_CACHE_KEY:
+            request["prompt_cache_key"] = Config.PROMPT_CACHE_KEY
+        if stream:
+            request["stream"] = True
+            request["stream_options"] = {"include_usage": True}
+        return request
+    
+    def _lookup_cache(self, user_message: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """Return (cache key, cached response) for a turn; (None, None) if caching is off"""
+        if self.response_cache is None:
+            return None, None
         
-        return messages
+        key = ResponseCache.make_key(
+            self.model,
+            self.context.payload_bytes(Prompts.get_system_prompt(), self.conversation_history),
+            user_message
+        )
+        return key, self.response_cache.get(key)
     
-    def send_message(self, user_message: str) -> Dict:
+    def _store_cache(self, key: Optional[str], parsed_response: Dict):
         """
-        Send a message and get response from OpenAI
+        Cache a fresh response under the key from _lookup_cache
         
-        Args:
-            user_message: User's input message
-            
-        Returns:
-            Response dictionary with bot response and metadata
+        Call only after _record_response accepted it, so a reply that fails
+        validation is never served again from the cache.
         """
-        try:
-            messages = self._build_messages()
-            messages.append({"role": "user", "content": user_message})
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
-            
-            # Track token usage
-            self.total_input_tokens += response.usage.prompt_tokens
-            self.total_output_tokens += response.usage.completion_tokens
-            
-            response_text = response.choices[0].message.content
+        if key is not None:
+            self.response_cache.set(key, parsed_response)
+    
+    def _track_usage(self, usage):
+        """Add an API usage block to the running token totals"""
+        self.total_input_tokens += usage.prompt_tokens
+        self.total_output_tokens += usage.completion_tokens
+        
+        # Input tokens served from the provider's prompt cache
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        self.total_cached_tokens += cached_tokens
+        self.metrics.count_tokens(usage.prompt_tokens, cached_tokens, usage.completion_tokens)
+        self._turn_usage = {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": cached_tokens
+        }
+    
+    def _parse_completion(self, response_text: str) -> Dict:
+        """Clean and parse a complete JSON completion"""
+        with self.metrics.span("parse", self.turn_timings):
             cleaned_response = self._clean_json_response(response_text)
-            parsed_response = json.loads(cleaned_response)
-            
-            # Store in conversation history
-            self.conversation_history.append({
-                'user_message': user_message,
-                'bot_response': parsed_response['response'],
-                'timestamp': datetime.utcnow().isoformat()
-            })
-            
-            # Check if conversation is ending
-            if 'conversation_summary' in parsed_response:
-                self.chat_active = False
-                self.conversation_summary = parsed_response['conversation_summary']
-            
-            return parsed_response
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON Parse Error: {e}")
-            return {
-                "response": "I apologize, but I encountered an error. Could you please rephrase?",
-                "error": str(e)
-            }
-        except Exception as e:
-            print(f"❌ Error: {e}")
-            return {
-                "response": "I apologize, but I encountered an unexpected error.",
-                "error": str(e)
-            }
+            return json.loads(cleaned_response)
+    
+    def _feed_stream_chunk(self, parser: StreamingFieldParser, chunk) -> str:
+        """Consume one streamed chunk, returning any new reply text"""
+        # Usage arrives on the final chunk, which has no choices
+        if chunk.usage:
+            self._track_usage(chunk.usage)
+        if not chunk.choices:
+            return ""
+        
+        delta = chunk.choices[0].delta.content
+        return parser.feed(delta) if delta else ""
+    
+    @staticmethod
+    def _empty_usage() -> Dict[str, int]:
+        """Token usage of a turn that made no API call"""
+        return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    
+    def _start_turn(self):
+        """Reset the per-turn stage timings, usage and latency clock"""
+        self.turn_timings = {}
+        self._turn_start = time.perf_counter()
+        self._turn_usage = self._empty_usage()
+    
+    def _finish_stream(self, parser: StreamingFieldParser, upstream: float) -> Dict:
+        """
+        Record the streamed request duration and parse the complete reply
+        
+        Args:
+            parser: Parser fed with every chunk
+            upstream: Seconds spent waiting on the API (the create call and
+                each chunk), excluding time the consumer held the stream
+        """
+        self.metrics.observe_stage("llm_request", upstream, self.turn_timings)
+        with self.metrics.span("parse", self.turn_timings):
+            return parser.finish()
+    
+    def _observe_first_chunk(self, request_start: float):
+        """Record time to the first streamed chunk"""
+        self.metrics.observe_stage("llm_ttfb", time.perf_counter() - request_start, self.turn_timings)
+    
+    def _record_response(self, user_message: str, parsed_response: Dict,
+                         outcome: str = "ok") -> Dict:
+        """
+        Store a parsed model response in history and handle conversation end
+        
+        The turn carries its telemetry: the model, token usage of its API
+        call (zero when served from the response cache) and its latency.
+        """
+        self.conversation_history.append({
+            'user_message': user_message,
+            'bot_response': parsed_response['response'],
+            'timestamp': datetime.utcnow().isoformat(),
+            'sentiment': self.sentiment_scorer.score(user_message).to_dict(),
+            'model': self.model,
+            'usage': self._turn_usage,
+            'latency_ms': round((time.perf_counter() - self._turn_start) * 1000, 2)
+        })
+        
+        # Check if conversation is ending
+        if 'conversation_summary' in parsed_response:
+            self.chat_active = False
+            self.conversation_summary = parsed_response['conversation_summary']
+        
+        self.last_response = parsed_response
+        self.metrics.count_turn(outcome)
+        return parsed_response
+    
+    def _error_response(self, error: Exception) -> Dict:
+        """Build the fallback response returned when a turn fails"""
+        if isinstance(error, json.JSONDecodeError):
+            print(f"❌ JSON Parse Error: {error}")
+            message = "I apologize, but I encountered an error. Could you please rephrase?"
+        else:
+            print(f"❌ Error: {error}")
+            message = "I apologize, but I encountered an unexpected error."
+        
+        self.last_response = {"response": message, "error": str(error)}
+        self.metrics.count_turn("error")
+        return self.last_response
     
     def get_cost_estimate(self) -> Dict:
-        """Calculate token costs"""
-        input_cost = (self.total_input_tokens / 1_000_000) * 0.15
-        output_cost = (self.total_output_tokens / 1_000_000) * 0.60
+        """Calculate token costs, pricing cached input tokens separately"""
+        uncached_tokens = self.total_input_tokens - self.total_cached_tokens
+        uncached_input_cost = (uncached_tokens / 1_000_000) * API_COSTS["input"]
+        cached_input_cost = (self.total_cached_tokens / 1_000_000) * API_COSTS["cached_input"]
+        input_cost = uncached_input_cost + cached_input_cost
+        output_cost = (self.total_output_tokens / 1_000_000) * API_COSTS["output"]
         total_cost = input_cost + output_cost
         
         return {
             "input_tokens": self.total_input_tokens,
+            "cached_input_tokens": self.total_cached_tokens,
+            "uncached_input_tokens": uncached_tokens,
             "output_tokens": self.total_output_tokens,
             "total_tokens": self.total_input_tokens + self.total_output_tokens,
+            "cached_input_cost": cached_input_cost,
+            "uncached_input_cost": uncached_input_cost,
             "input_cost": input_cost,
             "output_cost": output_cost,
-            "total_cost": total_cost
+            "total_cost": total_cost,
+            "cache_hit_rate": self.get_cache_hit_rate(),
+            "compaction_saved_tokens": self.context.tokens_saved
         }
     
+    def get_cache_hit_rate(self) -> float:
+        """Share of input tokens served from the prompt cache"""
+        if not self.total_input_tokens:
+            return 0.0
+        return self.total_cached_tokens / self.total_input_tokens
+    
     def get_message_count(self) -> int:
         """Get total number of messages in conversation"""
         return len(self.conversation_history)
     
+    def get_sentiment_history(self) -> List[Dict]:
+        """Per-turn sentiment points for charting (score and classification)"""
+        return [
+            {'score': msg['sentiment']['score'], 'sentiment': msg['sentiment']['classification']}
+            for msg in self.conversation_history if 'sentiment' in msg
+        ]
+    
     def get_last_message(self) -> Optional[Dict]:
         """Get the last message in conversation"""
         return self.conversation_history[-1] if self.conversation_history else None
+
+
+class SentimentChatbot(BaseChatbot):
+    """Main chatbot class for handling conversations"""
+    
+    def __init__(self, user_id: str = "anonymous", client=None):
+        """
+        Args:
+            user_id: User identifier
+            client: OpenAI-compatible client (default: the shared client)
+        """
+        super().__init__(user_id)
+        self.client = client or ClientRegistry.get_openai_client()
+    
+    def send_message(self, user_message: str) -> Dict:
+        """
+        Send a message and get response from OpenAI
+        
+        Args:
+            user_message: User's input message
+        
+        Returns:
+            Response dictionary with bot response and metadata
+        """
+        self._start_turn()
+        try:
+            cache_key, cached = self._lookup_cache(user_message)
+            if cached is not None:
+                return self._record_response(user_message, dict(cached), "cached")
+            
+            request = self._build_request(user_message)
+            with self.metrics.span("llm_request", self.turn_timings):
+                response = self.client.chat.completions.create(**request)
+            
+            # Track token usage
+            self._track_usage(response.usage)
+            
+            parsed_response = self._parse_completion(response.choices[0].message.content)
+            self._record_response(user_message, parsed_response)
+            self._store_cache(cache_key, parsed_response)
+            return parsed_response
+        
+        except Exception as e:
+            return self._error_response(e)
+    
+    def send_message_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Send a message and yield the reply text as it is generated
+        
+        The ``response`` field is decoded incrementally from the streamed JSON.
+        Once the stream completes the full object (including any
+        ``conversation_summary``) is parsed and stored like ``send_message``;
+        it is available afterwards as ``last_response``.
+        
+        Args:
+            user_message: User's input message
+        
+        Yields:
+            Chunks of the bot's reply text
+        """
+        parser = StreamingFieldParser("response")
+        streamed = False
+        self._start_turn()
+        try:
+            cache_key, cached = self._lookup_cache(user_message)
+            if cached is not None:
+                yield str(self._record_response(user_message, dict(cached), "cached")['response'])
+                return
+            
+            request = self._build_request(user_message, stream=True)
+            request_start = time.perf_counter()
+            stream = self.client.chat.completions.create(**request)
+            
+            # Only the waits for upstream chunks count as llm_request: the
+            # time the consumer spends on each yielded chunk is excluded
+            upstream, wait_start = 0.0, request_start
+            first_chunk = True
+            for chunk in stream:
+                upstream += time.perf_counter() - wait_start
+                if first_chunk:
+                    self._observe_first_chunk(request_start)
+                    first_chunk = False
+                text = self._feed_stream_chunk(parser, chunk)
+                if text:
+                    streamed = True
+                    yield text
+                wait_start = time.perf_counter()
+            upstream += time.perf_counter() - wait_start
+            
+            parsed_response = self._finish_stream(parser, upstream)
+            self._record_response(user_message, parsed_response)
+            self._store_cache(cache_key, parsed_response)
+            if not streamed:
+                yield str(parsed_response['response'])
+        
+        except Exception as e:
+            error_response = self._error_response(e)
+            yield ("\n\n" if streamed else "") + error_response['response']
+
+
+class AsyncSentimentChatbot(BaseChatbot):
+    """
+    Asyncio chatbot - same behaviour as SentimentChatbot on AsyncOpenAI
+    
+    Must be constructed inside a running event loop; it uses that loop's
+    shared client.
+    """
+    
+    def __init__(self, user_id: str = "anonymous", client=None):
+        """
+        Args:
+            user_id: User identifier
+            client: AsyncOpenAI-compatible client (default: the loop's shared client)
+        """
+        super().__init__(user_id)
+        self.client = client or ClientRegistry.get_async_openai_client()
+    
+    async def send_message(self, user_message: str) -> Dict:
+        """
+        Send a message and await the response from OpenAI
+        
+        Args:
+            user_message: User's input message
+        
+        Returns:
+            Response dictionary with bot response and metadata
+        """
+        self._start_turn()
+        try:
+            cache_key, cached = self._lookup_cache(user_message)
+            if cached is not None:
+                return self._record_response(user_message, dict(cached), "cached")
+            
+            request = self._build_request(user_message)
+            with self.metrics.span("llm_request", self.turn_timings):
+                response = await self.client.chat.completions.create(**request)
+            
+            self._track_usage(response.usage)
+            
+            parsed_response = self._parse_completion(response.choices[0].message.content)
+            self._record_response(user_message, parsed_response)
+            self._store_cache(cache_key, parsed_response)
+            return parsed_response
+        
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def send_message_stream(self, user_message: str) -> AsyncIterator[str]:
+        """
+        Send a message and yield the reply text as it is generated
+        
+        See ``SentimentChatbot.send_message_stream``.
+        
+        Args:
+            user_message: User's input message
+        
+        Yields:
+            Chunks of the bot's reply text
+        """
+        parser = StreamingFieldParser("response")
+        streamed = False
+        self._start_turn()
+        try:
+            cache_key, cached = self._lookup_cache(user_message)
+            if cached is not None:
+                yield str(self._record_response(user_message, dict(cached), "cached")['response'])
+                return
+            
+            request = self._build_request(user_message, stream=True)
+            request_start = time.perf_counter()
+            stream = await self.client.chat.completions.create(**request)
+            
+            upstream, wait_start = 0.0, request_start
+            first_chunk = True
+            async for chunk in stream:
+                upstream += time.perf_counter() - wait_start
+                if first_chunk:
+                    self._observe_first_chunk(request_start)
+                    first_chunk = False
+                text = self._feed_stream_chunk(parser, chunk)
+                if text:
+                    streamed = True
+                    yield text
+                wait_start = time.perf_counter()
+            upstream += time.perf_counter() - wait_start
+            
+            parsed_response = self._finish_stream(parser, upstream)
+            self._record_response(user_message, parsed_response)
+            self._store_cache(cache_key, parsed_response)
+            if not streamed:
+                yield str(parsed_response['response'])
+        
+        except Exception as e:
+            error_response = self._error_response(e)
+            yield ("\n\n" if streamed else "") + error_response['response']
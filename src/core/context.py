@@ -0,0 +1,191 @@
+"""Token-budgeted context window with rolling summary compaction"""
+
+from collections import deque
+from typing import Deque, List, Dict, Optional
+from config import Config
+from .tokens import TokenEstimator, get_token_estimator
+from .state import ConversationState
+
+
+class ContextWindow:
+    """
+    Builds the message list sent with each turn within a token budget
+    
+    The most recent turns are always sent verbatim. When the request would
+    exceed the budget, the oldest verbatim turns are folded, one at a time,
+    into a compact rolling summary that is appended to rather than
+    regenerated, so each fold costs O(turn) and no extra API calls. The
+    summary's token count is kept per line and updated incrementally, so
+    neither folds nor trims re-tokenize the whole summary.
+    
+    Requests always start with a byte-stable prefix - system prompt, rolling
+    summary, then frozen history turns - so provider-side prompt caching can
+    reuse it. Only a fold changes the prefix, so turns are folded in batches
+    of CONTEXT_FOLD_BATCH to make those cache resets rare.
+    
+    History turns are prepared once in a ConversationState (messages,
+    serialized bytes and token counts), so both request building and token
+    accounting are O(new text) per turn.
+    """
+    
+    SUMMARY_HEADER = "Summary of earlier conversation turns (compacted):"
+    
+    def __init__(self,
+                 token_budget: int = None,
+                 keep_last_turns: int = None,
+                 summary_max_tokens: int = None,
+                 fold_batch: int = None,
+                 snippet_chars: int = 160,
+                 estimator: Optional[TokenEstimator] = None):
+        self.token_budget = token_budget or Config.CONTEXT_TOKEN_BUDGET
+        self.keep_last_turns = keep_last_turns if keep_last_turns is not None else Config.CONTEXT_KEEP_TURNS
+        self.summary_max_tokens = summary_max_tokens or Config.CONTEXT_SUMMARY_MAX_TOKENS
+        self.fold_batch = max(fold_batch or Config.CONTEXT_FOLD_BATCH, 1)
+        self.snippet_chars = snippet_chars
+        self.estimator = estimator or get_token_estimator()
+        
+        self.state = ConversationState(self.estimator)
+        self._system_prompt: Optional[str] = None
+        self._system_tokens = 0
+        self._system_payload = b""
+        
+        self.folded_turns = 0
+        self.summary_lines: Deque[str] = deque()
+        self._line_tokens: Deque[int] = deque()
+        self._lines_tokens = 0
+        self._header_tokens = self.estimator.count(self.SUMMARY_HEADER)
+        self.omitted_turns = 0
+        self.folded_tokens = 0
+        self.summary_tokens = 0
+        self.tokens_saved = 0
+        self.prefix_resets = 0
+    
+    def _sync(self, system_prompt: str, history: List[Dict]):
+        """Count any turns (and system prompt) not seen before"""
+        if system_prompt is not self._system_prompt:
+            self._system_prompt = system_prompt
+            system_message = {"role": "system", "content": system_prompt}
+            self._system_tokens = self.estimator.count_message(system_message)
+            self._system_payload = ConversationState.serialize(system_message)
+        
+        self.state.sync(history)
+    
+    def _snippet(self, text: str) -> str:
+        """First sentence of a message, trimmed to snippet_chars"""
+        text = " ".join(str(text).split())
+        for end in (". ", "? ", "! "):
+            idx = text.find(end)
+            if 0 < idx < self.snippet_chars:
+                text = text[:idx + 1]
+                break
+        if len(text) > self.snippet_chars:
+            text = text[:self.snippet_chars - 1].rstrip() + "…"
+        return text
+    
+    def get_summary(self) -> str:
+        """Render the rolling summary ('' if nothing has been folded)"""
+        if not self.summary_lines and not self.omitted_turns:
+            return ""
+        lines = [self.SUMMARY_HEADER]
+        if self.omitted_turns:
+            lines.append(self._omitted_line())
+        lines.extend(self.summary_lines)
+        return "\n".join(lines)
+    
+    def _omitted_line(self) -> str:
+        """Summary line standing in for lines dropped to bound its size"""
+        return f"- ({self.omitted_turns} earlier turns omitted)"
+    
+    def _count_summary(self) -> int:
+        """
+        Estimated tokens of the rendered summary, from the cached per-line
+        counts (only the short omitted-turns line is counted afresh)
+        """
+        if not self.summary_lines and not self.omitted_turns:
+            return 0
+        omitted = self.estimator.count(self._omitted_line()) if self.omitted_turns else 0
+        return self.estimator.MESSAGE_OVERHEAD + self._header_tokens + omitted + self._lines_tokens
+    
+    def _fold(self, turn: Dict):
+        """Fold the oldest verbatim turn into the rolling summary"""
+        self.folded_tokens += self.state.turns[self.folded_turns].tokens
+        self.folded_turns += 1
+        line = (
+            f"- Message #{self.folded_turns}: user said \"{self._snippet(turn['user_message'])}\"; "
+            f"you replied \"{self._snippet(turn['bot_response'])}\""
+        )
+        line_tokens = self.estimator.count(line)
+        self.summary_lines.append(line)
+        self._line_tokens.append(line_tokens)
+        self._lines_tokens += line_tokens
+        self.summary_tokens = self._count_summary()
+        
+        # Keep the summary itself bounded by dropping its oldest lines
+        while len(self.summary_lines) > 1 and self.summary_tokens > self.summary_max_tokens:
+            self.summary_lines.popleft()
+            self._lines_tokens -= self._line_tokens.popleft()
+            self.omitted_turns += 1
+            self.summary_tokens = self._count_summary()
+    
+    @property
+    def context_tokens(self) -> int:
+        """Estimated tokens of the context currently sent with each request"""
+        verbatim = self.state.total_tokens - self.folded_tokens
+        return self._system_tokens + self.summary_tokens + verbatim
+    
+    def _compact(self, system_prompt: str, history: List[Dict]):
+        """Fold old turns until the context fits the budget"""
+        self._sync(system_prompt, history)
+        if self.context_tokens <= self.token_budget:
+            return
+        
+        folded_before = self.folded_turns
+        while (len(history) - self.folded_turns > self.keep_last_turns
+               and (self.context_tokens > self.token_budget
+                    or self.folded_turns - folded_before < self.fold_batch)):
+            self._fold(history[self.folded_turns])
+        if self.folded_turns != folded_before:
+            self.prefix_resets += 1
+    
+    def build_messages(self, system_prompt: str, history: List[Dict]) -> List[Dict]:
+        """
+        Build the messages for the next request
+        
+        Args:
+            system_prompt: Main system prompt
+            history: Full conversation history (user_message/bot_response dicts)
+        
+        Returns:
+            OpenAI messages list (without the new user message)
+        """
+        self._compact(system_prompt, history)
+        
+        messages = [{"role": "system", "content": system_prompt}]
+        summary = self.get_summary()
+        if summary:
+            messages.append({"role": "system", "content": summary})
+            self.tokens_saved += max(self.folded_tokens - self.summary_tokens, 0)
+        
+        messages.extend(self.state.messages_from(self.folded_turns))
+        return messages
+    
+    def payload_bytes(self, system_prompt: str, history: List[Dict]) -> bytes:
+        """
+        Serialized JSON array of the context messages, assembled from the
+        per-turn bytes prepared when each turn was appended
+        """
+        self._compact(system_prompt, history)
+        parts = [self._system_payload]
+        summary = self.get_summary()
+        if summary:
+            parts.append(ConversationState.serialize({"role": "system", "content": summary}))
+        history_payload = self.state.payload_from(self.folded_turns)
+        if history_payload:
+            parts.append(history_payload)
+        return b"[" + b",".join(parts) + b"]"
+    
+    def preview_tokens(self, system_prompt: str, history: List[Dict], user_message: str) -> int:
+        """Estimate input tokens of the next request without sending it"""
+        self._compact(system_prompt, history)
+        new_message = self.estimator.count_message({"content": user_message})
+        return self.context_tokens + new_message + self.estimator.REPLY_PRIMING
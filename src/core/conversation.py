@@ -1,15 +1,39 @@
 """Conversation management and tracking"""
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, AsyncIterator
 from datetime import datetime
-from database import DatabaseManager
+from database import DatabaseManager, AsyncDatabaseManager
+from src.utils.cache import LRUCache
+from .conversation_cache import ConversationCache, get_conversation_cache
 
 
 class ConversationManager:
-    """Manages conversation persistence and retrieval"""
+    """
+    Manages conversation persistence and retrieval
     
-    def __init__(self, db: Optional[DatabaseManager] = None):
+    With a write queue, append_turns/finalize_conversation return as soon as
+    the write is queued; the queue's worker performs the database round trip.
+    
+    Reads go through the shared ConversationCache (if enabled); every write
+    invalidates the entries it affects.
+    """
+    
+    def __init__(self, db: Optional[DatabaseManager] = None, write_queue=None,
+                 cache: Optional[ConversationCache] = None):
         self.db = db or DatabaseManager()
+        self.write_queue = write_queue
+        self.cache = cache or get_conversation_cache()
+    
+    def _write(self, write: Dict):
+        """Queue a conversation write record, or apply it directly"""
+        if self.cache is not None:
+            self.cache.invalidate_conversation(write["conversation_id"], write["user_id"])
+        if self.write_queue is not None:
+            self.write_queue.submit(write)
+            return
+        if self.db.conversations is None:
+            raise ConnectionError("Database not connected")
+        self.db.apply_conversation_writes([write])
     
     def save_conversation(self, user_id: str, messages: List[Dict], 
                          summary: Dict, created_at: datetime) -> str:
@@ -21,37 +45,236 @@ class ConversationManager:
             messages: List of message exchanges
             summary: Conversation summary with sentiment
             created_at: When conversation started
-            
+        
         Returns:
             conversation_id: ID of saved conversation
         """
         if self.db.conversations is None:
             raise ConnectionError("Database not connected")
         
-        return self.db.save_complete_conversation(
+        conversation_id = self.db.save_complete_conversation(
             user_id=user_id,
             messages=messages,
             conversation_summary=summary,
             created_at=created_at
         )
+        if self.cache is not None:
+            self.cache.invalidate_user(user_id)
+        return conversation_id
+    
+    def append_turns(self, conversation_id: str, user_id: str,
+                     created_at: datetime, turns: List[Dict],
+                     start_index: Optional[int] = None):
+        """Append new turns to a conversation (created on first call)"""
+        self._write({
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "turns": turns,
+            "start_index": start_index
+        })
+    
+    def finalize_conversation(self, conversation_id: str, user_id: str,
+                              created_at: datetime, summary: Optional[Dict],
+                              status: str = "completed"):
+        """Close a conversation, storing its summary"""
+        self._write({
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "summary": summary,
+            "status": status
+        })
     
     def get_conversation(self, conversation_id: str) -> Optional[Dict]:
         """Retrieve a conversation by ID"""
-        return self.db.get_conversation(conversation_id)
+        if self.cache is None:
+            return self.db.get_conversation(conversation_id)
+        return ConversationCache.read_through(
+            self.cache.conversations, conversation_id,
+            lambda: self.db.get_conversation(conversation_id)
+        )
     
-    def get_user_conversations(self, user_id: str, limit: int = 10) -> List[Dict]:
-        """Get recent conversations for a user"""
+    def get_messages(self, conversation_id: str, start: int = 0,
+                     limit: Optional[int] = None) -> List[Dict]:
+        """One page of a conversation's transcript (see DatabaseManager.get_messages)"""
+        return self.db.get_messages(conversation_id, start, limit)
+    
+    def get_user_conversations(self, user_id: str, limit: int = 10,
+                               view: str = "full") -> List[Dict]:
+        """Get recent conversations for a user ("summary" view omits the transcript)"""
         if self.db.conversations is None:
             return []
         
-        return list(self.db.conversations.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1).limit(limit))
+        def load() -> List[Dict]:
+            return self.db.find_conversations(user_id=user_id, view=view, limit=limit)["conversations"]
+        
+        if self.cache is None:
+            return load()
+        return ConversationCache.read_through(
+            self.cache.user_conversations, (user_id, limit, view), load
+        )
+    
+    def find_conversations(self, user_id: Optional[str] = None,
+                           direction: Optional[str] = None,
+                           view: str = "summary",
+                           limit: Optional[int] = None,
+                           after: Optional[str] = None) -> Dict:
+        """One keyset page of conversations (see DatabaseManager.find_conversations)"""
+        if self.db.conversations is None:
+            return {"conversations": [], "next_cursor": None}
+        return self.db.find_conversations(user_id, direction, view, limit, after)
+    
+    def iter_user_conversations(self, user_id: str, view: str = "summary") -> Iterator[Dict]:
+        """Stream a user's whole history, newest first, in constant memory"""
+        if self.db.conversations is None:
+            return iter(())
+        return self.db.iter_conversations(user_id=user_id, view=view)
     
     def get_statistics(self) -> Dict:
         """Get database statistics"""
-        return self.db.get_statistics()
+        if self.cache is None:
+            return self.db.get_statistics()
+        return ConversationCache.read_through(
+            self.cache.statistics, "statistics", self.db.get_statistics
+        )
+    
+    def cache_stats(self) -> Optional[Dict]:
+        """Read cache hit/miss/eviction counters (None if caching is off)"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def search_by_sentiment(self, direction: str, limit: Optional[int] = None,
+                            view: str = "full") -> List[Dict]:
+        """Search conversations by emotional direction"""
+        return self.db.search_by_sentiment_direction(direction, limit, view)
+
+
+class AsyncConversationManager:
+    """Asyncio counterpart of ConversationManager"""
+    
+    def __init__(self, db: Optional[AsyncDatabaseManager] = None,
+                 cache: Optional[ConversationCache] = None):
+        self.db = db or AsyncDatabaseManager()
+        self.cache = cache or get_conversation_cache()
+    
+    async def ensure_connected(self) -> bool:
+        """Connect the underlying manager on first use"""
+        if self.db.conversations is None:
+            return await self.db.connect()
+        return True
+    
+    async def save_conversation(self, user_id: str, messages: List[Dict],
+                                summary: Dict, created_at: datetime) -> str:
+        """Save complete conversation to database"""
+        if not await self.ensure_connected():
+            raise ConnectionError("Database not connected")
+        
+        conversation_id = await self.db.save_complete_conversation(
+            user_id=user_id,
+            messages=messages,
+            conversation_summary=summary,
+            created_at=created_at
+        )
+        if self.cache is not None:
+            self.cache.invalidate_user(user_id)
+        return conversation_id
+    
+    async def append_turns(self, conversation_id: str, user_id: str,
+                           created_at: datetime, turns: List[Dict],
+                           start_index: Optional[int] = None):
+        """Append new turns to a conversation (created on first call)"""
+        if not await self.ensure_connected():
+            raise ConnectionError("Database not connected")
+        
+        if self.cache is not None:
+            self.cache.invalidate_conversation(conversation_id, user_id)
+        await self.db.append_turns(conversation_id, user_id, created_at, turns, start_index)
+    
+    async def finalize_conversation(self, conversation_id: str, user_id: str,
+                                    created_at: datetime, summary: Optional[Dict],
+                                    status: str = "completed"):
+        """Close a conversation, storing its summary"""
+        if not await self.ensure_connected():
+            raise ConnectionError("Database not connected")
+        
+        if self.cache is not None:
+            self.cache.invalidate_conversation(conversation_id, user_id)
+        await self.db.finalize_conversation(conversation_id, user_id, created_at, summary, status)
+    
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        """Retrieve a conversation by ID"""
+        if self.cache is not None:
+            cached = self.cache.conversations.get(conversation_id)
+            if cached is not LRUCache.MISSING:
+                return cached
+        
+        await self.ensure_connected()
+        conversation = await self.db.get_conversation(conversation_id)
+        if self.cache is not None and conversation is not None:
+            self.cache.conversations.set(conversation_id, conversation)
+        return conversation
+    
+    async def get_messages(self, conversation_id: str, start: int = 0,
+                           limit: Optional[int] = None) -> List[Dict]:
+        """One page of a conversation's transcript (see DatabaseManager.get_messages)"""
+        await self.ensure_connected()
+        return await self.db.get_messages(conversation_id, start, limit)
+    
+    async def get_user_conversations(self, user_id: str, limit: int = 10,
+                                     view: str = "full") -> List[Dict]:
+        """Get recent conversations for a user ("summary" view omits the transcript)"""
+        key = (user_id, limit, view)
+        if self.cache is not None:
+            cached = self.cache.user_conversations.get(key)
+            if cached is not LRUCache.MISSING:
+                return cached
+        
+        if not await self.ensure_connected():
+            return []
+        
+        page = await self.db.find_conversations(user_id=user_id, view=view, limit=limit)
+        conversations = page["conversations"]
+        if self.cache is not None:
+            self.cache.user_conversations.set(key, conversations)
+        return conversations
+    
+    async def find_conversations(self, user_id: Optional[str] = None,
+                                 direction: Optional[str] = None,
+                                 view: str = "summary",
+                                 limit: Optional[int] = None,
+                                 after: Optional[str] = None) -> Dict:
+        """One keyset page of conversations (see DatabaseManager.find_conversations)"""
+        if not await self.ensure_connected():
+            return {"conversations": [], "next_cursor": None}
+        return await self.db.find_conversations(user_id, direction, view, limit, after)
+    
+    async def iter_user_conversations(self, user_id: str,
+                                      view: str = "summary") -> AsyncIterator[Dict]:
+        """Stream a user's whole history, newest first, in constant memory"""
+        if not await self.ensure_connected():
+            return
+        async for conversation in self.db.iter_conversations(user_id=user_id, view=view):
+            yield conversation
+    
+    async def get_statistics(self) -> Dict:
+        """Get database statistics"""
+        if self.cache is not None:
+            cached = self.cache.statistics.get("statistics")
+            if cached is not LRUCache.MISSING:
+                return cached
+        
+        await self.ensure_connected()
+        statistics = await self.db.get_statistics()
+        if self.cache is not None:
+            self.cache.statistics.set("statistics", statistics)
+        return statistics
+    
+    def cache_stats(self) -> Optional[Dict]:
+        """Read cache hit/miss/eviction counters (None if caching is off)"""
+        return self.cache.stats() if self.cache is not None else None
     
-    def search_by_sentiment(self, direction: str) -> List[Dict]:
+    async def search_by_sentiment(self, direction: str, limit: Optional[int] = None,
+                                  view: str = "full") -> List[Dict]:
         """Search conversations by emotional direction"""
-        return self.db.search_by_sentiment_direction(direction)
+        await self.ensure_connected()
+        return await self.db.search_by_sentiment_direction(direction, limit, view)
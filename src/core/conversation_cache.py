@@ -0,0 +1,84 @@
+"""Read-through cache for conversation lookups"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+from config import Config
+from src.utils.cache import LRUCache
+
+
+class ConversationCache:
+    """
+    Per-method LRU + TTL caches for ConversationManager reads
+    
+    - conversations: full documents keyed by conversation ID
+    - user_conversations: recent-conversation lists keyed by (user_id, limit, view)
+    - statistics: the single statistics result
+    
+    Cached documents are shared between callers and must be treated as
+    read-only. Writes invalidate the affected entries when they are issued;
+    with the write-behind queue a read in the short window before the write
+    lands can re-cache the previous state, which the TTL then bounds.
+    """
+    
+    def __init__(self):
+        self.conversations = LRUCache(
+            Config.CONVERSATION_CACHE_MAX_ENTRIES, Config.CONVERSATION_CACHE_TTL
+        )
+        self.user_conversations = LRUCache(
+            Config.USER_CONVERSATIONS_CACHE_MAX_ENTRIES, Config.USER_CONVERSATIONS_CACHE_TTL
+        )
+        self.statistics = LRUCache(1, Config.STATISTICS_CACHE_TTL)
+    
+    @staticmethod
+    def read_through(cache: LRUCache, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Return the cached value for key, loading and caching it on a miss"""
+        value = cache.get(key)
+        if value is LRUCache.MISSING:
+            value = load()
+            if value is not None:
+                cache.set(key, value)
+        return value
+    
+    def invalidate_user(self, user_id: str):
+        """Drop cached lists for a user and the statistics after a save"""
+        self.user_conversations.invalidate(lambda key: key[0] == user_id)
+        self.statistics.clear()
+    
+    def invalidate_conversation(self, conversation_id: str, user_id: str):
+        """Drop a conversation and everything derived from it after a write"""
+        self.conversations.delete(conversation_id)
+        self.invalidate_user(user_id)
+    
+    def clear(self):
+        """Drop every cached read"""
+        self.conversations.clear()
+        self.user_conversations.clear()
+        self.statistics.clear()
+    
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters per cached method"""
+        return {
+            "get_conversation": self.conversations.stats(),
+            "get_user_conversations": self.user_conversations.stats(),
+            "get_statistics": self.statistics.stats()
+        }
+
+
+_conversation_cache: Optional[ConversationCache] = None
+_conversation_cache_lock = threading.Lock()
+
+
+def get_conversation_cache() -> Optional[ConversationCache]:
+    """
+    Get the process-wide conversation read cache, shared by every
+    ConversationManager so writes through one invalidate reads through all;
+    None when CONVERSATION_CACHE_ENABLED is off
+    """
+    global _conversation_cache
+    if not Config.CONVERSATION_CACHE_ENABLED:
+        return None
+    if _conversation_cache is None:
+        with _conversation_cache_lock:
+            if _conversation_cache is None:
+                _conversation_cache = ConversationCache()
+    return _conversation_cache
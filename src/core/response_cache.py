@@ -0,0 +1,215 @@
+"""Response cache for repeated requests (e.g. common conversation openers)"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from config import Config
+from src.utils.cache import LRUCache
+
+
+class MemoryCacheBackend:
+    """
+    Per-process LRU/TTL backend
+    
+    Responses are stored as JSON, like the SQLite backend, so every hit is
+    a fresh copy and callers changing a returned response cannot alter the
+    cached entry.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.cache = LRUCache(max_entries=max_entries, ttl=ttl)
+    
+    @property
+    def evictions(self) -> int:
+        """Entries evicted to stay within max_entries"""
+        return self.cache.evictions
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a cached response or None"""
+        value = self.cache.get(key)
+        return None if value is LRUCache.MISSING else json.loads(value)
+    
+    def set(self, key: str, value: Dict):
+        """Store a response"""
+        self.cache.set(key, json.dumps(value))
+    
+    def clear(self):
+        """Remove all entries"""
+        self.cache.clear()
+
+
+class SQLiteCacheBackend:
+    """
+    LRU/TTL backend in a local SQLite file, shared by every worker process
+    on the host (WAL mode lets readers and a writer proceed concurrently)
+    """
+    
+    EVICT_EVERY = 64  # check the size bound every N writes
+    
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._writes = 0
+        self._local = threading.local()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Get an unexpired cached response or None, refreshing its LRU position"""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: Dict):
+        """Store a response, periodically enforcing the size bound"""
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now)
+            )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(now)
+    
+    def _evict(self, now: float):
+        """Drop expired rows, then least recently used rows beyond the bound"""
+        conn = self._connection()
+        with conn:
+            expired = conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+            overflow = conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        self.evictions += expired + overflow
+    
+    def clear(self):
+        """Remove all entries"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+class ResponseCache:
+    """
+    Cache of parsed model responses keyed on the request's message list
+    
+    Keys hash the model, the serialized context (system prompt and prior
+    turns, already prepared by ConversationState) and the new user message
+    normalized for case, whitespace and trailing punctuation, so "Hello!"
+    and "hello" share an entry. Only plain replies are cached - never a
+    response carrying a conversation_summary.
+    """
+    
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize a user message for cache keying"""
+        return re.sub(r"\s+", " ", text).strip().lower().rstrip(".!?")
+    
+    @classmethod
+    def make_key(cls, model: str, context_payload: bytes, user_message: str) -> str:
+        """Hash a request into a cache key"""
+        digest = hashlib.sha256()
+        digest.update(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(context_payload)
+        digest.update(b"\0")
+        digest.update(cls.normalize(user_message).encode("utf-8"))
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up a cached response"""
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    def set(self, key: str, response: Dict):
+        """Cache a response if it is safe to replay"""
+        if 'conversation_summary' in response or 'error' in response:
+            return
+        self.backend.set(key, response)
+    
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.backend.evictions
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide response cache configured by RESPONSE_CACHE_BACKEND
+    ("memory", "sqlite" or "none"); None when caching is disabled
+    """
+    global _response_cache
+    backend_name = Config.RESPONSE_CACHE_BACKEND
+    if backend_name == "none":
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                if backend_name == "sqlite":
+                    backend = SQLiteCacheBackend(
+                        Config.RESPONSE_CACHE_PATH,
+                        Config.RESPONSE_CACHE_MAX_ENTRIES,
+                        Config.RESPONSE_CACHE_TTL
+                    )
+                else:
+                    backend = MemoryCacheBackend(
+                        Config.RESPONSE_CACHE_MAX_ENTRIES,
+                        Config.RESPONSE_CACHE_TTL
+                    )
+                _response_cache = ResponseCache(backend)
+    return _response_cache
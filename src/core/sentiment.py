@@ -0,0 +1,180 @@
+"""Local rule-based sentiment scoring for individual user messages"""
+
+import math
+import re
+from typing import Dict, List, Optional
+from models import SentimentData
+from src.utils.helpers import SentimentUtils
+
+
+class SentimentScorer:
+    """
+    Lexicon/rule-based sentiment scorer (VADER-style), CPU only
+    
+    Scores a message in a few microseconds with no API call: word valences
+    from a support-domain lexicon, adjusted for negation ("not happy"),
+    intensifiers ("very", "extremely"), contrast ("..., but ..."), ALL-CAPS
+    and exclamation emphasis, then normalized to [-1, 1].
+    """
+    
+    LEXICON: Dict[str, float] = {
+        # positive
+        "good": 1.9, "great": 3.1, "excellent": 3.2, "amazing": 3.1, "awesome": 3.1,
+        "fantastic": 3.3, "wonderful": 3.1, "perfect": 3.0, "love": 3.2, "loved": 2.9,
+        "like": 1.3, "happy": 2.7, "glad": 2.0, "pleased": 2.2, "satisfied": 2.0,
+        "thanks": 1.9, "thank": 1.5, "thankful": 2.3, "grateful": 2.6, "appreciate": 2.2,
+        "appreciated": 2.2, "helpful": 2.1, "nice": 1.8, "easy": 1.6, "fast": 1.2,
+        "quick": 1.2, "smooth": 1.5, "resolved": 1.8, "fixed": 1.6, "works": 1.2,
+        "working": 1.0, "recommend": 1.8, "best": 3.0, "cool": 1.3, "fine": 0.8,
+        "ok": 0.6, "okay": 0.6, "yes": 0.5, "impressed": 2.4, "impressive": 2.4,
+        "reliable": 1.8, "friendly": 2.0, "polite": 1.6, "efficient": 1.9,
+        "excited": 2.6, "exciting": 2.4, "delighted": 3.0, "relieved": 1.8,
+        "brilliant": 2.8, "superb": 3.1, "enjoy": 2.1, "enjoyed": 2.1, "wow": 2.0,
+        "solved": 1.8, "success": 2.2, "successful": 2.2, "welcome": 1.5,
+        # negative
+        "bad": -2.5, "terrible": -3.4, "horrible": -3.3, "awful": -3.1, "worst": -3.4,
+        "hate": -3.2, "hated": -3.0, "angry": -2.9, "furious": -3.4, "mad": -2.4,
+        "annoyed": -2.1, "annoying": -2.2, "frustrated": -2.5, "frustrating": -2.5,
+        "disappointed": -2.4, "disappointing": -2.4, "upset": -2.4, "sad": -2.1,
+        "unhappy": -2.3, "poor": -2.1, "slow": -1.5, "broken": -2.1, "broke": -1.8,
+        "fail": -2.2, "failed": -2.2, "failing": -2.2, "failure": -2.4, "error": -1.5,
+        "errors": -1.5, "bug": -1.5, "bugs": -1.5, "crash": -2.0, "crashed": -2.1,
+        "problem": -1.7, "problems": -1.7, "issue": -1.2, "issues": -1.2,
+        "wrong": -2.0, "useless": -2.7, "waste": -2.3, "wasted": -2.3, "confusing": -1.7,
+        "confused": -1.5, "difficult": -1.5, "hard": -0.9, "stuck": -1.6,
+        "unacceptable": -3.0, "ridiculous": -2.5, "scam": -3.2, "refund": -1.0,
+        "cancel": -1.2, "complaint": -1.9, "complain": -1.8, "worried": -1.8,
+        "worry": -1.6, "disappointment": -2.5, "rude": -2.5, "never": -0.6,
+        "lost": -1.5, "missing": -1.3, "late": -1.1, "delay": -1.3, "delayed": -1.5,
+        "unfortunately": -1.4, "sorry": -0.6, "no": -0.8, "ugh": -1.9, "damn": -2.0,
+        "pathetic": -2.8, "incompetent": -2.9, "charged": -0.8, "overcharged": -2.4,
+    }
+    
+    EMOJI: Dict[str, float] = {
+        ":)": 2.0, ":-)": 2.0, ":d": 2.6, ":(": -2.0, ":-(": -2.0, ":'(": -2.4,
+        "😊": 2.4, "🙂": 1.5, "😀": 2.4, "😃": 2.4, "😍": 3.0, "👍": 1.8, "🎉": 2.5,
+        "❤": 2.8, "🙏": 1.6, "😐": 0.0, "😕": -1.4, "😞": -2.2, "😔": -2.0,
+        "😢": -2.4, "😭": -2.7, "😠": -2.8, "😡": -3.2, "👎": -2.0, "🤬": -3.4,
+    }
+    
+    NEGATIONS = {
+        "not", "no", "never", "none", "nothing", "neither", "nor", "without",
+        "cannot", "cant", "can't", "dont", "don't", "doesnt", "doesn't", "didnt",
+        "didn't", "isnt", "isn't", "wasnt", "wasn't", "arent", "aren't", "wont",
+        "won't", "wouldnt", "wouldn't", "shouldnt", "shouldn't", "havent", "haven't",
+        "hasnt", "hasn't", "aint", "ain't",
+    }
+    
+    BOOSTERS: Dict[str, float] = {
+        "very": 0.3, "really": 0.3, "extremely": 0.45, "so": 0.25, "super": 0.35,
+        "incredibly": 0.45, "absolutely": 0.4, "totally": 0.35, "completely": 0.35,
+        "highly": 0.3, "truly": 0.3, "too": 0.2, "most": 0.3,
+        "slightly": -0.3, "somewhat": -0.25, "barely": -0.4, "kinda": -0.25,
+        "little": -0.2, "bit": -0.2,
+    }
+    
+    NEGATION_FACTOR = -0.74
+    CAPS_BOOST = 0.73
+    EXCLAMATION_BOOST = 0.29
+    ALPHA = 15  # normalization constant
+    
+    _TOKEN = re.compile(r":'\(|:-?[()dD]|[\w']+|[^\w\s]", re.UNICODE)
+    
+    # Emoji presentation selector: "❤️" is "❤" followed by it
+    VARIATION_SELECTOR = "\ufe0f"
+    
+    def score(self, text: str) -> SentimentData:
+        """
+        Score a single message
+        
+        Args:
+            text: User message
+        
+        Returns:
+            SentimentData with score in [-1, 1]
+        """
+        tokens = self._TOKEN.findall((text or "").replace(self.VARIATION_SELECTOR, ""))
+        words = [t.lower() for t in tokens]
+        mixed_case = any(t.isupper() for t in tokens) and any(t.islower() for t in tokens)
+        
+        valences: List[float] = []
+        indicators: List[str] = []
+        negated = False
+        for i, (raw, word) in enumerate(zip(tokens, words)):
+            valence = self.LEXICON.get(word, self.EMOJI.get(word))
+            if valence is None:
+                continue
+            
+            # Intensifiers and negations in the three preceding words
+            for distance, prev in enumerate(reversed(words[max(0, i - 3):i]), start=1):
+                boost = self.BOOSTERS.get(prev)
+                if boost:
+                    scale = 1.0 if distance == 1 else 0.95 if distance == 2 else 0.9
+                    # Away from zero for intensifiers, towards it for dampeners
+                    valence += math.copysign(1.0, valence) * boost * scale
+                if prev in self.NEGATIONS:
+                    valence *= self.NEGATION_FACTOR
+                    negated = True
+                    break
+            
+            if mixed_case and raw.isupper() and len(raw) > 1:
+                valence += math.copysign(self.CAPS_BOOST, valence)
+            
+            valences.append(valence)
+            indicators.append(raw)
+        
+        # Contrast: what follows "but" outweighs what precedes it
+        if "but" in words and valences:
+            pivot = words.index("but")
+            positions = [i for i, w in enumerate(words) if w in self.LEXICON or w in self.EMOJI]
+            for n, pos in enumerate(positions):
+                valences[n] *= 0.5 if pos < pivot else 1.5
+        
+        total = sum(valences)
+        if total:
+            total += math.copysign(min(text.count("!"), 4) * self.EXCLAMATION_BOOST, total)
+        score = total / math.sqrt(total * total + self.ALPHA) if total else 0.0
+        score = round(max(-1.0, min(1.0, score)), 3)
+        
+        classification = SentimentUtils.classify_direction(score)
+        return SentimentData(
+            classification=classification,
+            score=score,
+            confidence=self._confidence(len(indicators), score),
+            key_indicators=indicators[:5],
+            brief_reasoning=self._reasoning(classification, indicators, negated)
+        )
+    
+    def score_batch(self, texts: List[str]) -> List[SentimentData]:
+        """Score many messages"""
+        return [self.score(text) for text in texts]
+    
+    @staticmethod
+    def _confidence(indicator_count: int, score: float) -> str:
+        """Confidence from how much evidence there was and how strong it is"""
+        if indicator_count >= 3 or abs(score) >= 0.7:
+            return "high"
+        if indicator_count >= 1:
+            return "medium"
+        return "low"
+    
+    @staticmethod
+    def _reasoning(classification: str, indicators: List[str], negated: bool) -> str:
+        """One-line explanation of the score"""
+        if not indicators:
+            return "No sentiment-bearing words found"
+        reasoning = f"{classification.title()} cues: {', '.join(indicators[:3])}"
+        if negated:
+            reasoning += " (with negation)"
+        return reasoning
+
+
+_default_scorer: Optional[SentimentScorer] = None
+
+
+def get_sentiment_scorer() -> SentimentScorer:
+    """Get the shared scorer (stateless, safe to share across threads)"""
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = SentimentScorer()
+    return _default_scorer
@@ -0,0 +1,70 @@
+"""Append-only prepared conversation state for request building"""
+
+import json
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+from .tokens import TokenEstimator, get_token_estimator
+
+
+@dataclass
+class PreparedTurn:
+    """One history turn, prepared once for every request that includes it"""
+    user_message: Dict
+    assistant_message: Dict
+    payload: bytes  # serialized user and assistant messages, comma-separated
+    tokens: int
+
+
+class ConversationState:
+    """
+    Request-ready view of the conversation history
+    
+    Each turn's OpenAI messages, serialized JSON bytes and token count are
+    produced once when the turn is appended. Building the next request then
+    only slices the existing list, so per-turn cost does not grow with the
+    length of the history.
+    """
+    
+    def __init__(self, estimator: Optional[TokenEstimator] = None):
+        self.estimator = estimator or get_token_estimator()
+        self.turns: List[PreparedTurn] = []
+        self.messages: List[Dict] = []  # flat user/assistant messages, append-only
+        self.total_tokens = 0
+    
+    @staticmethod
+    def serialize(message: Dict) -> bytes:
+        """Serialize one message the same way every time (byte-stable)"""
+        return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    
+    def append_turn(self, user_message: str, bot_response: str) -> PreparedTurn:
+        """Prepare and append a completed turn"""
+        user = {"role": "user", "content": user_message}
+        assistant = {"role": "assistant", "content": json.dumps({"response": bot_response})}
+        turn = PreparedTurn(
+            user_message=user,
+            assistant_message=assistant,
+            payload=self.serialize(user) + b"," + self.serialize(assistant),
+            tokens=self.estimator.count_message(user) + self.estimator.count_message(assistant)
+        )
+        
+        self.turns.append(turn)
+        self.messages.append(user)
+        self.messages.append(assistant)
+        self.total_tokens += turn.tokens
+        return turn
+    
+    def sync(self, history: List[Dict]):
+        """Append any history entries that have not been prepared yet"""
+        for entry in history[len(self.turns):]:
+            self.append_turn(entry['user_message'], entry['bot_response'])
+    
+    def messages_from(self, turn_index: int) -> List[Dict]:
+        """Prepared messages for turns[turn_index:]"""
+        return self.messages[2 * turn_index:]
+    
+    def payload_from(self, turn_index: int) -> bytes:
+        """Serialized messages for turns[turn_index:], comma-separated"""
+        return b",".join(turn.payload for turn in self.turns[turn_index:])
+    
+    def __len__(self) -> int:
+        return len(self.turns)
@@ -0,0 +1,62 @@
+"""Offline token estimation for requests and conversation history"""
+
+import re
+from typing import Dict, List, Optional
+from config import Config
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a heuristic estimate
+    tiktoken = None
+
+
+class TokenEstimator:
+    """
+    Counts tokens locally, without an API round trip
+    
+    Uses the model's tiktoken encoding when tiktoken is installed, otherwise
+    a word/punctuation heuristic that tracks BPE counts closely for English
+    text. Message overheads follow OpenAI's chat format accounting.
+    """
+    
+    MESSAGE_OVERHEAD = 3  # role and separators per message
+    REPLY_PRIMING = 3  # every reply is primed with <|start|>assistant<|message|>
+    
+    _PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+    
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or Config.OPENAI_MODEL
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+    
+    def count(self, text: str) -> int:
+        """Count tokens in a piece of text"""
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        # Short words are one token; long words split roughly every 4 characters
+        return sum(1 + (len(piece) - 1) // 4 for piece in self._PIECES.findall(text))
+    
+    def count_message(self, message: Dict) -> int:
+        """Count tokens for one chat message including format overhead"""
+        return self.MESSAGE_OVERHEAD + self.count(message.get("content") or "")
+    
+    def count_messages(self, messages: List[Dict]) -> int:
+        """Count tokens for a full request's messages"""
+        return sum(self.count_message(m) for m in messages) + self.REPLY_PRIMING
+
+
+_default_estimator: Optional[TokenEstimator] = None
+
+
+def get_token_estimator() -> TokenEstimator:
+    """Get the shared estimator (loading an encoding is slow; do it once)"""
+    global _default_estimator
+    if _default_estimator is None:
+        _default_estimator = TokenEstimator()
+    return _default_estimator
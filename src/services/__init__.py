@@ -1,4 +1,4 @@
 """Services initialization"""
-from .chat_service import ChatService
+from .chat_service import ChatService, AsyncChatService
 
-__all__ = ["ChatService"]
+__all__ = ["ChatService", "AsyncChatService"]
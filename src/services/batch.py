@@ -0,0 +1,168 @@
+"""Batch (non-interactive) runs of scripted conversations"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Optional, TextIO
+from config import Config
+from .chat_service import ChatService
+from .persistence import get_write_queue
+
+
+def read_scripts(lines: Iterator[str]) -> Iterator[Dict]:
+    """
+    Parse scripted conversations from JSONL
+    
+    Each line is either a list of user messages or an object with
+    "messages" and optional "id" and "user_id". Blank lines are skipped; a
+    malformed line yields {"id", "user_id", "error"} instead of a script, so
+    one bad line does not stop the batch.
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            script = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"id": line_number, "user_id": None, "error": f"Line {line_number}: invalid JSON ({e})"}
+            continue
+        if isinstance(script, list):
+            script = {"messages": script}
+        if not isinstance(script, dict) or not isinstance(script.get("messages"), list):
+            yield {"id": line_number, "user_id": None,
+                   "error": f"Line {line_number}: expected a list of messages"}
+            continue
+        script.pop("error", None)
+        script.setdefault("id", line_number)
+        script.setdefault("user_id", f"batch-{script['id']}")
+        yield script
+
+
+class BatchRunner:
+    """
+    Runs scripted conversations through ChatService on a bounded thread pool
+    
+    At most `workers` conversations run at once and at most twice that many
+    scripts are read ahead, so memory stays flat for any input size. Each
+    conversation's turns run in order on one worker; results are written as
+    JSON lines in completion order (each carries the script's id).
+    """
+    
+    def __init__(self, workers: Optional[int] = None, persist: bool = False,
+                 goodbye: Optional[str] = None):
+        """
+        Args:
+            workers: Conversations run concurrently (default BATCH_WORKERS)
+            persist: Save conversations to MongoDB as they run
+            goodbye: Message sent after the script (if the chat is still
+                open) so the model produces a conversation summary
+        """
+        self.workers = workers or Config.BATCH_WORKERS
+        self.persist = persist
+        self.goodbye = goodbye
+        self.processed = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def run_script(self, script: Dict) -> Dict:
+        """Run one scripted conversation and return its result record"""
+        start = time.perf_counter()
+        service = ChatService(user_id=script["user_id"], persist=self.persist)
+        messages: List[str] = list(script["messages"])
+        if self.goodbye:
+            messages.append(self.goodbye)
+        
+        turns = []
+        for message in messages:
+            if not service.chatbot.chat_active:
+                break
+            turn_start = time.perf_counter()
+            response = service.send_message(message)
+            last_message = service.chatbot.get_last_message() or {}
+            turns.append({
+                "user_message": message,
+                "response": response.get("response"),
+                "latency_ms": round((time.perf_counter() - turn_start) * 1000, 2),
+                "sentiment": last_message.get("sentiment") if "error" not in response else None,
+                "error": response.get("error")
+            })
+        
+        if service.chatbot.conversation_summary:
+            conversation_id = service.end_conversation()
+        else:
+            conversation_id = service.close()
+        
+        cost = service.chatbot.get_cost_estimate()
+        return {
+            "id": script["id"],
+            "user_id": script["user_id"],
+            "conversation_id": conversation_id,
+            "turns": turns,
+            "summary": service.chatbot.conversation_summary,
+            "usage": {
+                "input_tokens": cost["input_tokens"],
+                "cached_input_tokens": cost["cached_input_tokens"],
+                "output_tokens": cost["output_tokens"],
+                "total_cost": cost["total_cost"]
+            },
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "errors": sum(1 for turn in turns if turn["error"])
+        }
+    
+    def _result(self, future, script: Dict) -> Dict:
+        """Result record of a finished future (an error record if it raised)"""
+        self.processed += 1
+        try:
+            result = future.result()
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Script {script['id']} failed: {e}")
+            return {"id": script["id"], "user_id": script["user_id"], "error": str(e)}
+        if result["errors"]:
+            self.failed += 1
+        else:
+            self.completed += 1
+        return result
+    
+    def _invalid(self, script: Dict) -> Dict:
+        """Error record of a malformed input line"""
+        self.processed += 1
+        self.failed += 1
+        print(f"❌ {script['error']}")
+        return script
+    
+    def run(self, scripts: Iterator[Dict], output: TextIO) -> Dict:
+        """
+        Run every script, writing one JSON line per conversation to output
+        
+        Returns:
+            Counts of completed conversations and of failed ones (malformed
+            input line, raised, or had a turn that returned an error)
+        """
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for script in scripts:
+                if "error" in script:
+                    self._write(output, self._invalid(script))
+                    continue
+                if len(pending) >= self.workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._write(output, self._result(future, pending.pop(future)))
+                pending[pool.submit(self.run_script, script)] = script
+            
+            for future in as_completed(list(pending)):
+                self._write(output, self._result(future, pending.pop(future)))
+        
+        write_queue = get_write_queue() if self.persist else None
+        if write_queue is not None:
+            write_queue.flush()
+        return {"completed": self.completed, "failed": self.failed}
+    
+    def _write(self, output: TextIO, record: Dict):
+        """Write one result line"""
+        output.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+        output.flush()
+        if self.processed % 100 == 0:
+            print(f"📦 {self.processed} conversations processed")
@@ -1,45 +1,352 @@
 """Services layer for business logic orchestration"""
 
-from typing import Dict, Optional
+import time
+from typing import Dict, List, Optional, Iterator, AsyncIterator, Tuple
 from datetime import datetime
-from src.core.chatbot import SentimentChatbot
-from src.core.conversation import ConversationManager
-from database import DatabaseManager
+from config import Config
+from src.core.chatbot import BaseChatbot, SentimentChatbot, AsyncSentimentChatbot
+from src.core.conversation import ConversationManager, AsyncConversationManager
+from src.utils.constants import API_COSTS
+from src.utils.metrics import get_metrics
+from src.utils.profiling import get_profiler
+from database import DatabaseManager, AsyncDatabaseManager
+from .persistence import get_write_queue
+
+
+def _conversation_metrics(chatbot: BaseChatbot) -> Dict:
+    """Current conversation metrics for a sync or async chatbot"""
+    cost = chatbot.get_cost_estimate()
+    return {
+        "message_count": chatbot.get_message_count(),
+        "tokens": chatbot.total_input_tokens + chatbot.total_output_tokens,
+        "cost": cost['total_cost'],
+        "cached_input_tokens": cost['cached_input_tokens'],
+        "uncached_input_tokens": cost['uncached_input_tokens'],
+        "cached_input_cost": cost['cached_input_cost'],
+        "uncached_input_cost": cost['uncached_input_cost'],
+        "cache_hit_rate": cost['cache_hit_rate'],
+        "prefix_resets": chatbot.context.prefix_resets,
+        "response_cache": chatbot.response_cache.stats() if chatbot.response_cache else None,
+        "duration": (datetime.utcnow() - chatbot.conversation_start).total_seconds(),
+        "context_tokens": chatbot.context.context_tokens,
+        "last_turn_ms": dict(chatbot.turn_timings),
+        "stages": get_metrics().stage_summary()
+    }
+
+
+def _profile_details(chatbot: BaseChatbot) -> Dict:
+    """Conversation context written into profiling reports"""
+    return {
+        "user_id": chatbot.user_id,
+        "history_turns": len(chatbot.conversation_history),
+        "context_tokens": chatbot.context.context_tokens
+    }
+
+
+def _preview_cost(chatbot: BaseChatbot, message: str) -> Dict:
+    """Pre-flight input token and cost estimate for sending a message"""
+    input_tokens = chatbot.preview_input_tokens(message)
+    return {
+        "input_tokens": input_tokens,
+        "context_tokens": chatbot.context.context_tokens,
+        "input_cost": (input_tokens / 1_000_000) * API_COSTS["input"]
+    }
+
+
+class TurnBuffer:
+    """
+    Tracks which history turns are not yet persisted and when to write them
+    
+    A new turn is written at once unless the previous write was less than
+    TURN_FLUSH_INTERVAL seconds ago; quick bursts of turns are batched into
+    one $push of up to TURN_FLUSH_BATCH turns.
+    """
+    
+    def __init__(self, batch_size: int = None, interval: float = None):
+        self.batch_size = batch_size or Config.TURN_FLUSH_BATCH
+        self.interval = Config.TURN_FLUSH_INTERVAL if interval is None else interval
+        self.persisted = 0
+        self.last_flush = 0.0
+    
+    def due(self, history: List[Dict]) -> bool:
+        """Whether pending turns should be written now"""
+        pending = len(history) - self.persisted
+        if pending <= 0:
+            return False
+        return pending >= self.batch_size or time.monotonic() - self.last_flush >= self.interval
+    
+    def pending(self, history: List[Dict]) -> Tuple[int, List[Dict]]:
+        """(index of first pending turn, pending turns)"""
+        return self.persisted, [dict(turn) for turn in history[self.persisted:]]
+    
+    def mark_flushed(self, count: int):
+        """Record that count pending turns were written"""
+        self.persisted += count
+        self.last_flush = time.monotonic()
 
 
 class ChatService:
-    """High-level chat service combining chatbot and persistence"""
+    """
+    High-level chat service combining chatbot and persistence
     
-    def __init__(self, user_id: str = "anonymous"):
+    With persist=False nothing is written (and no database connection is
+    made); conversation_manager is None. profile selects a profiling mode
+    ("cpu", "memory", "all" or "off"; default PROFILE), see
+    src.utils.profiling.
+    """
+    
+    def __init__(self, user_id: str = "anonymous", persist: bool = True,
+                 profile: Optional[str] = None):
         self.chatbot = SentimentChatbot(user_id=user_id)
-        self.conversation_manager = ConversationManager(DatabaseManager())
+        self.profiler = get_profiler(profile)
+        self.conversation_manager = ConversationManager(
+            DatabaseManager(), write_queue=get_write_queue()
+        ) if persist else None
         self.user_id = user_id
+        self.conversation_id: Optional[str] = None
+        self.turn_buffer = TurnBuffer()
     
     def send_message(self, message: str) -> Dict:
         """Send message through chatbot"""
-        return self.chatbot.send_message(message)
+        if self.profiler is None:
+            return self._send_message(message)
+        with self.profiler.turn(lambda: _profile_details(self.chatbot)):
+            return self._send_message(message)
+    
+    def _send_message(self, message: str) -> Dict:
+        """One turn: chatbot reply, then persistence if due"""
+        response = self.chatbot.send_message(message)
+        self._after_turn()
+        return response
+    
+    def stream_message(self, message: str) -> Iterator[str]:
+        """Send message through chatbot, yielding reply text as it arrives"""
+        if self.profiler is None:
+            yield from self._stream_message(message)
+            return
+        with self.profiler.turn(lambda: _profile_details(self.chatbot)):
+            yield from self._stream_message(message)
+    
+    def _stream_message(self, message: str) -> Iterator[str]:
+        """One streamed turn: chatbot reply, then persistence if due"""
+        yield from self.chatbot.send_message_stream(message)
+        self._after_turn()
+    
+    @property
+    def last_response(self) -> Optional[Dict]:
+        """Full parsed response of the most recent turn"""
+        return self.chatbot.last_response
+    
+    def _after_turn(self):
+        """Persist new turns if a write is due"""
+        if self.turn_buffer.due(self.chatbot.conversation_history):
+            self.flush()
+    
+    def flush(self) -> bool:
+        """Write all pending turns now; returns False if the write failed"""
+        if self.conversation_manager is None:
+            return True
+        start_index, turns = self.turn_buffer.pending(self.chatbot.conversation_history)
+        if not turns:
+            return True
+        if self.conversation_id is None:
+            self.conversation_id = DatabaseManager.new_conversation_id()
+        
+        try:
+            with self.chatbot.metrics.span("persistence", self.chatbot.turn_timings):
+                self.conversation_manager.append_turns(
+                    self.conversation_id,
+                    self.user_id,
+                    self.chatbot.conversation_start,
+                    turns,
+                    start_index
+                )
+            self.turn_buffer.mark_flushed(len(turns))
+            return True
+        except Exception as e:
+            # Turns stay pending and are retried with the next write
+            print(f"❌ Error saving conversation turns: {e}")
+            return False
     
     def end_conversation(self) -> Optional[str]:
-        """Save and end conversation"""
-        if self.chatbot.conversation_summary:
+        """Persist remaining turns and $set the summary"""
+        if self.chatbot.conversation_summary and self.conversation_manager is not None:
             try:
-                conversation_id = self.conversation_manager.save_conversation(
-                    user_id=self.user_id,
-                    messages=self.chatbot.conversation_history,
-                    summary=self.chatbot.conversation_summary,
-                    created_at=self.chatbot.conversation_start
+                if not self.flush():
+                    return None
+                with self.chatbot.metrics.span("persistence", self.chatbot.turn_timings):
+                    self.conversation_manager.finalize_conversation(
+                        self.conversation_id,
+                        self.user_id,
+                        self.chatbot.conversation_start,
+                        self.chatbot.conversation_summary
+                    )
+                return self.conversation_id
+            except Exception as e:
+                print(f"❌ Error saving conversation: {e}")
+                return None
+        return None
+    
+    def close(self) -> Optional[str]:
+        """Persist remaining turns of a conversation left without a summary"""
+        if (self.conversation_manager is None or self.chatbot.conversation_summary
+                or not self.chatbot.conversation_history):
+            return self.conversation_id
+        try:
+            if self.flush():
+                self.conversation_manager.finalize_conversation(
+                    self.conversation_id,
+                    self.user_id,
+                    self.chatbot.conversation_start,
+                    None,
+                    status="abandoned"
                 )
-                return conversation_id
+        except Exception as e:
+            print(f"❌ Error saving conversation: {e}")
+        return self.conversation_id
+    
+    def preview_cost(self, message: str) -> Dict:
+        """Estimate input tokens and cost of sending a message, before sending"""
+        return _preview_cost(self.chatbot, message)
+    
+    def get_metrics(self) -> Dict:
+        """Get current conversation metrics"""
+        metrics = _conversation_metrics(self.chatbot)
+        if self.conversation_manager is not None:
+            write_queue = self.conversation_manager.write_queue
+            metrics["write_queue"] = write_queue.stats() if write_queue else None
+            metrics["read_cache"] = self.conversation_manager.cache_stats()
+        if self.profiler is not None:
+            metrics["profiling"] = self.profiler.stats()
+        return metrics
+
+
+class AsyncChatService:
+    """
+    Asyncio chat service with the same surface as ChatService
+    
+    Pass a shared AsyncDatabaseManager to serve many conversations from one
+    event loop over a single connection pool; it connects lazily on first save.
+    profile selects a profiling mode as for ChatService; a CPU profile of a
+    turn also covers other tasks that ran on the loop meanwhile.
+    """
+    
+    def __init__(self, user_id: str = "anonymous",
+                 db: Optional[AsyncDatabaseManager] = None,
+                 profile: Optional[str] = None):
+        self.chatbot = AsyncSentimentChatbot(user_id=user_id)
+        self.profiler = get_profiler(profile)
+        self.conversation_manager = AsyncConversationManager(db)
+        self.user_id = user_id
+        self.conversation_id: Optional[str] = None
+        self.turn_buffer = TurnBuffer()
+    
+    async def send_message(self, message: str) -> Dict:
+        """Send message through chatbot"""
+        if self.profiler is None:
+            return await self._send_message(message)
+        with self.profiler.turn(lambda: _profile_details(self.chatbot)):
+            return await self._send_message(message)
+    
+    async def _send_message(self, message: str) -> Dict:
+        """One turn: chatbot reply, then persistence if due"""
+        response = await self.chatbot.send_message(message)
+        await self._after_turn()
+        return response
+    
+    async def stream_message(self, message: str) -> AsyncIterator[str]:
+        """Send message through chatbot, yielding reply text as it arrives"""
+        if self.profiler is None:
+            async for chunk in self._stream_message(message):
+                yield chunk
+            return
+        with self.profiler.turn(lambda: _profile_details(self.chatbot)):
+            async for chunk in self._stream_message(message):
+                yield chunk
+    
+    async def _stream_message(self, message: str) -> AsyncIterator[str]:
+        """One streamed turn: chatbot reply, then persistence if due"""
+        async for chunk in self.chatbot.send_message_stream(message):
+            yield chunk
+        await self._after_turn()
+    
+    @property
+    def last_response(self) -> Optional[Dict]:
+        """Full parsed response of the most recent turn"""
+        return self.chatbot.last_response
+    
+    async def _after_turn(self):
+        """Persist new turns if a write is due"""
+        if self.turn_buffer.due(self.chatbot.conversation_history):
+            await self.flush()
+    
+    async def flush(self) -> bool:
+        """Write all pending turns now; returns False if the write failed"""
+        start_index, turns = self.turn_buffer.pending(self.chatbot.conversation_history)
+        if not turns:
+            return True
+        if self.conversation_id is None:
+            self.conversation_id = DatabaseManager.new_conversation_id()
+        
+        try:
+            with self.chatbot.metrics.span("persistence", self.chatbot.turn_timings):
+                await self.conversation_manager.append_turns(
+                    self.conversation_id,
+                    self.user_id,
+                    self.chatbot.conversation_start,
+                    turns,
+                    start_index
+                )
+            self.turn_buffer.mark_flushed(len(turns))
+            return True
+        except Exception as e:
+            print(f"❌ Error saving conversation turns: {e}")
+            return False
+    
+    async def end_conversation(self) -> Optional[str]:
+        """Persist remaining turns and $set the summary"""
+        if self.chatbot.conversation_summary:
+            try:
+                if not await self.flush():
+                    return None
+                with self.chatbot.metrics.span("persistence", self.chatbot.turn_timings):
+                    await self.conversation_manager.finalize_conversation(
+                        self.conversation_id,
+                        self.user_id,
+                        self.chatbot.conversation_start,
+                        self.chatbot.conversation_summary
+                    )
+                return self.conversation_id
             except Exception as e:
                 print(f"❌ Error saving conversation: {e}")
                 return None
         return None
     
+    async def close(self) -> Optional[str]:
+        """Persist remaining turns of a conversation left without a summary"""
+        if self.chatbot.conversation_summary or not self.chatbot.conversation_history:
+            return self.conversation_id
+        try:
+            if await self.flush():
+                await self.conversation_manager.finalize_conversation(
+                    self.conversation_id,
+                    self.user_id,
+                    self.chatbot.conversation_start,
+                    None,
+                    status="abandoned"
+                )
+        except Exception as e:
+            print(f"❌ Error saving conversation: {e}")
+        return self.conversation_id
+    
+    def preview_cost(self, message: str) -> Dict:
+        """Estimate input tokens and cost of sending a message, before sending"""
+        return _preview_cost(self.chatbot, message)
+    
     def get_metrics(self) -> Dict:
         """Get current conversation metrics"""
-        return {
-            "message_count": self.chatbot.get_message_count(),
-            "tokens": self.chatbot.total_input_tokens + self.chatbot.total_output_tokens,
-            "cost": self.chatbot.get_cost_estimate()['total_cost'],
-            "duration": (datetime.utcnow() - self.chatbot.conversation_start).total_seconds()
-        }
+        metrics = _conversation_metrics(self.chatbot)
+        metrics["read_cache"] = self.conversation_manager.cache_stats()
+        if self.profiler is not None:
+            metrics["profiling"] = self.profiler.stats()
+        return metrics
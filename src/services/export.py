@@ -0,0 +1,337 @@
+"""Streaming export of stored conversations to JSONL or Parquet"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from bson.objectid import ObjectId
+from config import Config
+from database import DatabaseManager, BUCKETED, view_projection
+from schema import read_conversation
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for --format parquet
+    pa = None
+    pq = None
+
+# Every write sets updated_at, so sorting on it (with _id breaking ties)
+# lets the watermark only move forward yet catch conversations that changed
+# after they were first exported (served by the (updated_at, _id) indexes)
+EXPORT_SORT = [("updated_at", 1), ("_id", 1)]
+
+CONVERSATION_COLUMNS = {
+    "conversation_id": "string",
+    "user_id": "string",
+    "created_at": "timestamp",
+    "completed_at": "timestamp",
+    "updated_at": "timestamp",
+    "status": "string",
+    "total_messages": "int64",
+    "overall_direction": "string",
+    "average_sentiment_score": "float64",
+    "opening_sentiment": "string",
+    "opening_score": "float64",
+    "middle_sentiment": "string",
+    "middle_score": "float64",
+    "closing_sentiment": "string",
+    "closing_score": "float64",
+    "key_moments": "int64",
+    "insights": "string"
+}
+
+TURN_COLUMNS = {
+    "conversation_id": "string",
+    "user_id": "string",
+    "created_at": "timestamp",
+    "turn_index": "int64",
+    "timestamp": "timestamp",
+    "user_message": "string",
+    "bot_response": "string",
+    "sentiment": "string",
+    "sentiment_score": "float64",
+    "sentiment_confidence": "string",
+    "model": "string",
+    "latency_ms": "float64",
+    "prompt_tokens": "int64",
+    "completion_tokens": "int64",
+    "cached_tokens": "int64"
+}
+
+
+def _number(value) -> Optional[float]:
+    """A float, or None for missing/non-numeric values"""
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _timestamp(value) -> Optional[datetime]:
+    """A datetime, or None (v1 ISO strings are parsed)"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, datetime) else None
+
+
+def conversation_row(conversation: Dict) -> Dict:
+    """Flatten a conversation's metadata and summary into one row"""
+    overall = conversation.get("overall_sentiment") or {}
+    journey = conversation.get("sentiment_journey") or {}
+    row = {
+        "conversation_id": str(conversation["_id"]),
+        "user_id": conversation.get("user_id"),
+        "created_at": conversation.get("created_at"),
+        "completed_at": conversation.get("completed_at"),
+        "updated_at": conversation.get("updated_at"),
+        "status": conversation.get("status"),
+        "total_messages": conversation.get("total_messages", 0),
+        "overall_direction": overall.get("overall_emotional_direction"),
+        "average_sentiment_score": _number(overall.get("average_sentiment_score")),
+        "key_moments": len(conversation.get("key_emotional_moments") or []),
+        "insights": "\n".join(str(insight) for insight in conversation.get("insights") or [])
+    }
+    for phase in ("opening", "middle", "closing"):
+        details = journey.get(f"{phase}_phase") or {}
+        row[f"{phase}_sentiment"] = details.get("sentiment")
+        row[f"{phase}_score"] = _number(details.get("score"))
+    return row
+
+
+def turn_row(conversation: Dict, index: int, message: Dict) -> Dict:
+    """Flatten one message exchange into a row"""
+    sentiment = message.get("sentiment") or {}
+    usage = message.get("usage") or {}
+    return {
+        "conversation_id": str(conversation["_id"]),
+        "user_id": conversation.get("user_id"),
+        "created_at": conversation.get("created_at"),
+        "turn_index": index,
+        "timestamp": _timestamp(message.get("timestamp")),
+        "user_message": message.get("user_message"),
+        "bot_response": message.get("bot_response"),
+        "sentiment": sentiment.get("classification"),
+        "sentiment_score": _number(sentiment.get("score")),
+        "sentiment_confidence": sentiment.get("confidence"),
+        "model": message.get("model"),
+        "latency_ms": _number(message.get("latency_ms")),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "cached_tokens": usage.get("cached_tokens")
+    }
+
+
+class JSONLWriter:
+    """Writes rows as JSON lines (datetimes as ISO 8601)"""
+    
+    def __init__(self, path: str, columns: Dict[str, str]):
+        self.file = open(path, "w", encoding="utf-8")
+    
+    def write(self, row: Dict):
+        """Write one row"""
+        self.file.write(json.dumps(row, default=lambda value: value.isoformat(), ensure_ascii=False))
+        self.file.write("\n")
+    
+    def close(self):
+        """Flush and close the file"""
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Writes rows to a Parquet file in row groups of EXPORT_ROW_GROUP_SIZE
+    
+    Only one row group is held in memory at a time.
+    """
+    
+    TYPES = {
+        "string": lambda: pa.string(),
+        "int64": lambda: pa.int64(),
+        "float64": lambda: pa.float64(),
+        "timestamp": lambda: pa.timestamp("ms")
+    }
+    
+    def __init__(self, path: str, columns: Dict[str, str]):
+        if pa is None:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+        self.schema = pa.schema([(name, self.TYPES[kind]()) for name, kind in columns.items()])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self.rows: List[Dict] = []
+    
+    def write(self, row: Dict):
+        """Buffer one row, writing a row group when the buffer is full"""
+        self.rows.append(row)
+        if len(self.rows) >= Config.EXPORT_ROW_GROUP_SIZE:
+            self._flush()
+    
+    def _flush(self):
+        """Write buffered rows as one row group"""
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+    
+    def close(self):
+        """Write the last row group and the file footer"""
+        self._flush()
+        self.writer.close()
+
+
+WRITERS = {"jsonl": JSONLWriter, "parquet": ParquetWriter}
+
+
+class ConversationExporter:
+    """
+    Streams conversations out of MongoDB in constant memory
+    
+    The collection is read through a cursor in EXPORT_BATCH_SIZE batches and
+    rows are written as they are produced. Incremental exports are keyed on
+    the (updated_at, _id) of the last exported conversation: every save,
+    new turn and completion moves updated_at, so a run exports each
+    conversation created or changed since the previous one. A conversation
+    that was still active when exported appears again, in full, once it
+    changes; consumers keep the row with the latest updated_at per
+    conversation_id.
+    """
+    
+    def __init__(self, db: Optional[DatabaseManager] = None,
+                 per_turn: bool = False,
+                 status: Optional[str] = None):
+        """
+        Args:
+            db: Connected database manager
+            per_turn: One row per message exchange instead of per conversation
+            status: Only export conversations with this status
+        """
+        self.db = db or DatabaseManager()
+        self.per_turn = per_turn
+        self.status = status
+        self.conversations = 0
+        self.rows = 0
+    
+    @property
+    def columns(self) -> Dict[str, str]:
+        """Column names and types of the exported rows"""
+        return TURN_COLUMNS if self.per_turn else CONVERSATION_COLUMNS
+    
+    def iter_conversations(self, since: Optional[Dict] = None) -> Iterator[Dict]:
+        """Stream conversations updated after the since watermark, least recently updated first"""
+        if self.db.conversations is None:
+            raise ConnectionError("Not connected to MongoDB. Please check your connection.")
+        
+        query = watermark_filter(since)
+        if self.status:
+            query["status"] = self.status
+        
+        cursor = self.db.conversations.find(
+            query, view_projection("full" if self.per_turn else "summary")
+        ).sort(EXPORT_SORT).batch_size(Config.EXPORT_BATCH_SIZE)
+        with cursor:
+            for document in cursor:
+                yield read_conversation(document)
+    
+    def iter_rows(self, conversation: Dict) -> Iterator[Dict]:
+        """Rows for one conversation"""
+        if not self.per_turn:
+            yield conversation_row(conversation)
+            return
+        
+        if conversation.get("message_storage") == BUCKETED:
+            messages = self.db.iter_bucket_messages(str(conversation["_id"]))
+        else:
+            messages = conversation.get("messages") or []
+        for index, message in enumerate(messages):
+            yield turn_row(conversation, index, message)
+    
+    def export(self, path: str, output_format: str = "jsonl",
+               since: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Export to a file
+        
+        Args:
+            path: Output file (written to path + ".tmp" and renamed when done)
+            output_format: "jsonl" or "parquet"
+            since: Only conversations updated after this watermark (see
+                watermark_filter)
+        
+        Returns:
+            New watermark: updated_at and conversation_id of the last
+            exported conversation (since, if nothing was exported)
+        """
+        if output_format not in WRITERS:
+            raise ValueError(f"Unknown export format: {output_format!r} (use 'jsonl' or 'parquet')")
+        
+        watermark = since
+        temp_path = path + ".tmp"
+        writer = WRITERS[output_format](temp_path, self.columns)
+        try:
+            for conversation in self.iter_conversations(since):
+                for row in self.iter_rows(conversation):
+                    writer.write(row)
+                    self.rows += 1
+                self.conversations += 1
+                if isinstance(conversation.get("updated_at"), datetime):
+                    watermark = {
+                        "updated_at": conversation["updated_at"],
+                        "conversation_id": str(conversation["_id"])
+                    }
+                if self.conversations % Config.EXPORT_BATCH_SIZE == 0:
+                    print(f"📤 Exported {self.conversations} conversations ({self.rows} rows)")
+        finally:
+            writer.close()
+        
+        os.replace(temp_path, path)
+        print(f"✅ Exported {self.conversations} conversations ({self.rows} rows) to {path}")
+        return watermark
+
+
+def watermark_filter(since: Optional[Dict]) -> Dict:
+    """
+    Query for conversations after a watermark in EXPORT_SORT order
+    
+    Args:
+        since: {"updated_at": datetime, "conversation_id": str or None};
+            without a conversation_id everything updated after updated_at
+    """
+    if since is None:
+        return {}
+    if not since.get("conversation_id"):
+        return {"updated_at": {"$gt": since["updated_at"]}}
+    return {"$or": [
+        {"updated_at": {"$gt": since["updated_at"]}},
+        {"updated_at": since["updated_at"], "_id": {"$gt": ObjectId(since["conversation_id"])}}
+    ]}
+
+
+def read_watermark(path: str) -> Optional[Dict]:
+    """
+    Watermark saved by a previous export (None if there is none)
+    
+    Files written before exports were keyed on updated_at hold a bare
+    created_at timestamp; it is read as an updated_at watermark, which at
+    worst exports some conversations again.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        value = file.read().strip()
+    if not value:
+        return None
+    if not value.startswith("{"):
+        return {"updated_at": datetime.fromisoformat(value), "conversation_id": None}
+    watermark = json.loads(value)
+    return {
+        "updated_at": datetime.fromisoformat(watermark["updated_at"]),
+        "conversation_id": watermark.get("conversation_id")
+    }
+
+
+def write_watermark(path: str, watermark: Optional[Dict]):
+    """Save the watermark for the next incremental export"""
+    if watermark is None:
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({
+            "updated_at": watermark["updated_at"].isoformat(),
+            "conversation_id": watermark.get("conversation_id")
+        }, file)
@@ -0,0 +1,324 @@
+"""Write-behind persistence queue for conversation writes"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from config import Config
+from database import DatabaseManager, is_transient_error
+from src.utils.metrics import get_metrics
+from .spool import ConversationSpool, write_groups
+
+
+def coalesce_writes(writes: List[Dict]) -> List[Dict]:
+    """
+    Merge write records for the same conversation, preserving order
+    
+    Turns are concatenated (dropping any a retried record repeats) and the
+    latest summary/status wins, so each conversation becomes a single
+    operation in an unordered bulk_write.
+    """
+    merged: Dict[str, Dict] = {}
+    for write in writes:
+        current = merged.get(write["conversation_id"])
+        if current is None:
+            current = dict(write)
+            current["turns"] = list(write.get("turns") or [])
+            merged[write["conversation_id"]] = current
+            continue
+        
+        turns = write.get("turns") or []
+        if turns:
+            if current.get("start_index") is None:
+                current["start_index"] = write.get("start_index")
+            elif write.get("start_index") is not None:
+                end = current["start_index"] + len(current["turns"])
+                turns = turns[max(end - write["start_index"], 0):]
+            current["turns"].extend(turns)
+        if write.get("summary"):
+            current["summary"] = write["summary"]
+        if write.get("status"):
+            current["status"] = write["status"]
+    return list(merged.values())
+
+
+class QueueFullError(Exception):
+    """Raised when the write-behind queue stays full past the put timeout"""
+
+
+class WriteBehindQueue:
+    """
+    Background worker that batches conversation writes off the request path
+    
+    Callers submit write records and return immediately. A single daemon
+    thread drains the queue, waiting up to flush_interval to fill a batch of
+    at most batch_size records, coalesces them per conversation and hands
+    them to writer (one unordered bulk_write). A single worker keeps writes
+    for a conversation in submission order across batches.
+    
+    Backpressure: at most max_pending records are queued; submit blocks for
+    up to put_timeout seconds and then raises QueueFullError.
+    
+    With a spool, batches that cannot reach MongoDB (down, failing with
+    connection errors, or so slow the queue passes WRITE_QUEUE_SPOOL_DEPTH)
+    go to the local spool instead of being dropped. Spooled records are
+    replayed before any new batch is written, so per-conversation order is
+    kept.
+    
+    A batch MongoDB rejects for good (see database.is_transient_error) is not
+    retried or spooled: its conversations are written one by one and only
+    the failing ones are dead-lettered (or dropped without a spool), so one
+    bad write never blocks the others.
+    """
+    
+    def __init__(self,
+                 writer: Callable[[List[Dict]], None],
+                 batch_size: int = None,
+                 flush_interval: float = None,
+                 max_pending: int = None,
+                 put_timeout: float = None,
+                 max_retries: int = None,
+                 spool: Optional[ConversationSpool] = None):
+        self.writer = writer
+        self.spool = spool
+        self.spool_depth = Config.WRITE_QUEUE_SPOOL_DEPTH
+        self.batch_size = batch_size or Config.WRITE_QUEUE_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.WRITE_QUEUE_FLUSH_INTERVAL
+        self.put_timeout = Config.WRITE_QUEUE_PUT_TIMEOUT if put_timeout is None else put_timeout
+        self.max_retries = Config.WRITE_QUEUE_MAX_RETRIES if max_retries is None else max_retries
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_pending or Config.WRITE_QUEUE_MAX_PENDING)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._replay_failed_at: Optional[float] = None
+        
+        if spool is not None and spool.has_pending():
+            self._ensure_started()
+    
+    def _ensure_started(self):
+        """Start the worker thread on first use"""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="conversation-write-behind", daemon=True
+                    )
+                    self._thread.start()
+    
+    def submit(self, write: Dict):
+        """
+        Queue a conversation write record
+        
+        Raises:
+            QueueFullError: If the queue stayed full for put_timeout seconds
+        """
+        self._ensure_started()
+        try:
+            self._queue.put(write, timeout=self.put_timeout)
+        except queue.Full:
+            raise QueueFullError(
+                f"Write-behind queue full ({self._queue.maxsize} pending writes)"
+            )
+        self.submitted += 1
+    
+    def _next_batch(self) -> List[Dict]:
+        """Block for the first record, then gather more until full or timed out"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        
+        # Past the deadline, still take whatever is already queued
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        """Worker loop: drain, coalesce, write"""
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                if self.spool is not None and self.spool.has_pending():
+                    self._replay_spool()
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _write(self, batch: List[Dict]):
+        """Write one batch, retrying with backoff, spooling if MongoDB is unavailable"""
+        writes = coalesce_writes(batch)
+        if self.spool is not None:
+            if self.spool.has_pending() and not self._replay_spool():
+                self._spool(writes, len(batch))
+                return
+            if self._queue.qsize() >= self.spool_depth:
+                # MongoDB is not keeping up: take the local path until it does
+                self._spool(writes, len(batch))
+                return
+        
+        error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self.writer(writes)
+            except ConnectionError as e:
+                error = e  # not connected: retrying now will not help
+                break
+            except Exception as e:
+                error = e
+                if not is_transient_error(e):
+                    self._write_isolated(writes)
+                    return
+                if attempt < self.max_retries:
+                    time.sleep(min(0.1 * 2 ** attempt, 2.0))
+                continue
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.batches += 1
+            self.written += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            return
+        
+        self._unreachable(writes, len(batch), error)
+    
+    def _unreachable(self, writes: List[Dict], count: int, error: Exception):
+        """Spool (or drop, without a spool) writes that failed to reach MongoDB"""
+        if self.spool is not None:
+            print(f"⚠️ MongoDB write failed, spooling {count} writes locally: {error}")
+            self._spool(writes, count)
+        else:
+            self.failed += count
+            print(f"❌ Write-behind batch failed, {count} writes dropped: {error}")
+    
+    def _write_isolated(self, writes: List[Dict]):
+        """
+        Write a rejected batch one conversation at a time
+        
+        Conversations MongoDB rejects for good are dead-lettered (dropped
+        without a spool); a connection problem part-way spools the rest.
+        """
+        handled, rejected, error = write_groups(self.writer, [[write] for write in writes])
+        for (write,), write_error in rejected:
+            if self.spool is not None:
+                try:
+                    self.spool.dead_letter([write], write_error)
+                    continue
+                except OSError as e:
+                    print(f"❌ Could not dead-letter writes: {e}")
+            print(f"❌ Write for conversation {write['conversation_id']} rejected, dropped: {write_error}")
+        
+        # Counted per coalesced write: records no longer map 1:1 to writes
+        self.failed += len(rejected)
+        self.written += handled - len(rejected)
+        if error is not None:
+            self._unreachable(writes[handled:], len(writes) - handled, error)
+    
+    def _spool(self, writes: List[Dict], count: int):
+        """Append coalesced writes (count submitted records) to the local spool"""
+        try:
+            self.spool.append(writes)
+        except OSError as e:
+            self.failed += count
+            print(f"❌ Could not spool {count} writes, dropped: {e}")
+    
+    def _replay_spool(self) -> bool:
+        """Drain the spool into MongoDB (at most every SPOOL_REPLAY_INTERVAL after a failure)"""
+        if (self._replay_failed_at is not None
+                and time.monotonic() - self._replay_failed_at < Config.SPOOL_REPLAY_INTERVAL):
+            return False
+        if self.spool.replay(lambda records: self.writer(coalesce_writes(records))):
+            self._replay_failed_at = None
+            return True
+        self._replay_failed_at = time.monotonic()
+        return False
+    
+    def flush(self):
+        """Block until every submitted write has been processed"""
+        if self._thread is not None:
+            self._queue.join()
+    
+    def close(self, timeout: float = None):
+        """Drain remaining writes and stop the worker"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(Config.WRITE_QUEUE_SHUTDOWN_TIMEOUT if timeout is None else timeout)
+        if self._thread.is_alive():
+            print(f"⚠️ Write-behind queue shut down with {self._queue.qsize()} writes pending")
+        if self.spool is not None:
+            self.spool.close()
+    
+    def stats(self) -> Dict:
+        """Queue depth, throughput and flush latency"""
+        return {
+            "depth": self._queue.qsize(),
+            "submitted": self.submitted,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "spool": self.spool.stats() if self.spool is not None else None
+        }
+
+
+class DatabaseWriter:
+    """Queue writer that applies batches through a lazily connected DatabaseManager"""
+    
+    def __init__(self):
+        self.db: Optional[DatabaseManager] = None
+    
+    def __call__(self, writes: List[Dict]):
+        if self.db is None or self.db.conversations is None:
+            self.db = DatabaseManager()
+        self.db.apply_conversation_writes(writes)
+
+
+_write_queue: Optional[WriteBehindQueue] = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> Optional[WriteBehindQueue]:
+    """
+    Get the process-wide write-behind queue (None if WRITE_BEHIND is off)
+    
+    The queue is drained at interpreter exit.
+    """
+    global _write_queue
+    if not Config.WRITE_BEHIND:
+        return None
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                spool = ConversationSpool() if Config.SPOOL_ENABLED else None
+                _write_queue = WriteBehindQueue(DatabaseWriter(), spool=spool)
+                atexit.register(_write_queue.close)
+                get_metrics().register_gauge(
+                    "chatbot_write_queue_depth",
+                    "Conversation writes waiting in the write-behind queue",
+                    lambda: _write_queue.stats()["depth"]
+                )
+    return _write_queue
@@ -0,0 +1,263 @@
+"""Durable local spool for conversation writes while MongoDB is unavailable"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from config import Config
+from database import is_transient_error
+
+
+def _encode(value):
+    """json.dumps default: keep datetimes round-trippable"""
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Cannot spool value of type {type(value).__name__}")
+
+
+def _decode(obj: Dict):
+    """json.loads object_hook for _encode"""
+    if len(obj) == 1 and "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+
+def group_by_conversation(records: List[Dict]) -> List[List[Dict]]:
+    """Records grouped per conversation, groups in order of first appearance"""
+    groups: Dict[str, List[Dict]] = {}
+    for record in records:
+        groups.setdefault(record["conversation_id"], []).append(record)
+    return list(groups.values())
+
+
+def write_groups(writer: Callable[[List[Dict]], None], groups: List[List[Dict]]
+                 ) -> Tuple[int, List[Tuple[List[Dict], Exception]], Optional[Exception]]:
+    """
+    Write record groups one at a time, isolating permanent failures
+    
+    Args:
+        writer: Callable applying a list of write records (raises on failure)
+        groups: Record groups, one per conversation
+    
+    Returns:
+        (groups handled, rejected groups with their errors, the transient
+        error that stopped the run or None); groups from the handled count
+        on were not attempted
+    """
+    rejected = []
+    for handled, group in enumerate(groups):
+        try:
+            writer(group)
+        except Exception as e:
+            if is_transient_error(e):
+                return handled, rejected, e
+            rejected.append((group, e))
+    return len(groups), rejected, None
+
+
+class ConversationSpool:
+    """
+    Append-only JSONL file of conversation write records
+    
+    Records are appended in the order they would have been written to
+    MongoDB, flushed to the OS on every append and fsynced in batches (every
+    fsync_every records or fsync_interval seconds, and on close), trading a
+    bounded window of OS-crash exposure for fast appends.
+    
+    replay() moves the spool aside to <path>.replaying, so new appends can
+    continue while the old records are written to MongoDB; the file is only
+    removed once the writer succeeds. Writer calls must be idempotent on the
+    conversation key (see database.build_write_op), since a crash after
+    writing but before removal replays the same records again.
+    
+    Replay goes conversation by conversation: records MongoDB rejects for
+    good (database.is_transient_error is False) are moved to the dead-letter
+    file and replay carries on; a connection problem stops it, keeping only
+    the records not yet written.
+    """
+    
+    def __init__(self, path: str = None, fsync_every: int = None, fsync_interval: float = None,
+                 dead_letter_path: str = None, replay_batch: int = None):
+        self.path = path or Config.SPOOL_PATH
+        self.replay_path = self.path + ".replaying"
+        self.dead_letter_path = dead_letter_path or Config.SPOOL_DEAD_LETTER_PATH
+        self.replay_batch = replay_batch or Config.WRITE_QUEUE_BATCH_SIZE
+        self.fsync_every = fsync_every or Config.SPOOL_FSYNC_EVERY
+        self.fsync_interval = Config.SPOOL_FSYNC_INTERVAL if fsync_interval is None else fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        
+        self.spooled = 0
+        self.replayed = 0
+        self.dead_lettered = 0
+        
+        for path in (self.path, self.dead_letter_path):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+    
+    def _open(self):
+        """Open the spool for appending"""
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+    
+    def _sync(self):
+        """fsync buffered records"""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+    
+    def append(self, writes: List[Dict]):
+        """Append write records"""
+        if not writes:
+            return
+        with self._lock:
+            spool_file = self._open()
+            for write in writes:
+                spool_file.write(json.dumps(write, default=_encode, separators=(",", ":")) + "\n")
+            spool_file.flush()
+            self._unsynced += len(writes)
+            self.spooled += len(writes)
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+    
+    def has_pending(self) -> bool:
+        """Whether any records are waiting to be replayed"""
+        return (os.path.exists(self.replay_path)
+                or (os.path.exists(self.path) and os.path.getsize(self.path) > 0))
+    
+    @staticmethod
+    def _read(path: str) -> List[Dict]:
+        """Read records, skipping a torn final line from a crash mid-append"""
+        records = []
+        if not os.path.exists(path):
+            return records
+        with open(path, encoding="utf-8") as spool_file:
+            for line in spool_file:
+                try:
+                    records.append(json.loads(line, object_hook=_decode))
+                except json.JSONDecodeError:
+                    continue
+        return records
+    
+    def _rotate(self):
+        """Move current records behind any older ones in the replay file"""
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not os.path.exists(self.path):
+                return
+            if not os.path.exists(self.replay_path):
+                os.replace(self.path, self.replay_path)
+                return
+            with open(self.path, encoding="utf-8") as current, \
+                    open(self.replay_path, "a", encoding="utf-8") as older:
+                older.write(current.read())
+                older.flush()
+                os.fsync(older.fileno())
+            os.remove(self.path)
+    
+    def dead_letter(self, records: List[Dict], error: Exception):
+        """Append records MongoDB rejected for good, with the error, to the dead-letter file"""
+        failed_at = datetime.utcnow()
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead_file:
+            for record in records:
+                dead_file.write(json.dumps(
+                    {"failed_at": failed_at, "error": f"{type(error).__name__}: {error}", "write": record},
+                    default=_encode, separators=(",", ":")
+                ) + "\n")
+            dead_file.flush()
+            os.fsync(dead_file.fileno())
+        self.dead_lettered += len(records)
+        print(f"❌ {len(records)} writes for conversation {records[0]['conversation_id']} "
+              f"rejected by MongoDB, moved to {self.dead_letter_path}: {error}")
+    
+    def _keep(self, groups: List[List[Dict]]):
+        """Replace the replay file with the records not yet written"""
+        temporary = self.replay_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as replay_file:
+            for group in groups:
+                for record in group:
+                    replay_file.write(json.dumps(record, default=_encode, separators=(",", ":")) + "\n")
+            replay_file.flush()
+            os.fsync(replay_file.fileno())
+        os.replace(temporary, self.replay_path)
+    
+    def replay(self, writer: Callable[[List[Dict]], None]) -> bool:
+        """
+        Write spooled records through writer, oldest first
+        
+        Conversations are written replay_batch at a time; when a batch is
+        rejected for a non-transient reason its conversations are retried one
+        by one and only the failing ones are dead-lettered.
+        
+        Args:
+            writer: Callable applying a list of write records (raises on failure)
+        
+        Returns:
+            True if the spool was fully drained
+        """
+        self._rotate()
+        groups = group_by_conversation(self._read(self.replay_path))
+        done = written = 0
+        try:
+            while done < len(groups):
+                chunk = groups[done:done + self.replay_batch]
+                try:
+                    writer([record for group in chunk for record in group])
+                    done += len(chunk)
+                    written += sum(len(group) for group in chunk)
+                    continue
+                except Exception as e:
+                    if is_transient_error(e):
+                        raise
+                
+                handled, rejected, error = write_groups(writer, chunk)
+                for group, group_error in rejected:
+                    self.dead_letter(group, group_error)
+                written += sum(len(group) for group in chunk[:handled]) - sum(
+                    len(group) for group, _ in rejected
+                )
+                done += handled
+                if error is not None:
+                    raise error
+        except Exception as e:
+            remaining = groups[done:]
+            try:
+                self._keep(remaining)
+            except OSError as keep_error:
+                # The replay file is unchanged; written records are replayed again
+                print(f"⚠️ Could not update the spool replay file: {keep_error}")
+            self.replayed += written
+            print(f"⚠️ Spool replay stopped, {sum(len(group) for group in remaining)} writes kept: {e}")
+            return False
+        
+        if os.path.exists(self.replay_path):
+            os.remove(self.replay_path)
+        self.replayed += written
+        if written:
+            print(f"📤 Replayed {written} spooled writes to MongoDB")
+        return True
+    
+    def close(self):
+        """fsync and close the spool file"""
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def stats(self) -> Dict:
+        """Spool counters"""
+        return {"spooled": self.spooled, "replayed": self.replayed,
+                "dead_lettered": self.dead_lettered, "pending": self.has_pending()}
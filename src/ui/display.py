@@ -1,6 +1,8 @@
 """Display and formatting for console and terminal output"""
 
-from typing import Dict, List, Optional
+import sys
+from typing import Dict, List, Optional, Iterable
+from src.utils.helpers import SentimentUtils
 
 
 class ConsoleDisplay:
@@ -18,12 +20,45 @@ class ConsoleDisplay:
         """Display bot response with formatting"""
         ConsoleDisplay.display_header("🤖 BOT RESPONSE")
         print(response_data.get('response', 'No response'))
+        ConsoleDisplay.display_response_footer(response_data)
+    
+    @staticmethod
+    def display_stream(chunks: Iterable[str]) -> str:
+        """
+        Display bot response text as it is streamed
+        
+        Args:
+            chunks: Iterable of reply text chunks
         
+        Returns:
+            The full text that was displayed
+        """
+        ConsoleDisplay.display_header("🤖 BOT RESPONSE")
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+        print()
+        return "".join(parts)
+    
+    @staticmethod
+    def display_response_footer(response_data: Dict):
+        """Display summary (if any) and close the response block"""
         if 'conversation_summary' in response_data:
             ConsoleDisplay._display_summary(response_data['conversation_summary'])
         
         print("=" * 70 + "\n")
     
+    @staticmethod
+    def display_sentiment(sentiment: Optional[Dict]):
+        """Display the per-turn sentiment of the user's last message"""
+        if not sentiment:
+            return
+        emoji = SentimentUtils.get_emoji(sentiment['score'])
+        print(f"{emoji} Your sentiment: {sentiment['classification']} "
+              f"(score: {sentiment['score']:+.2f}, confidence: {sentiment['confidence']})")
+    
     @staticmethod
     def _display_summary(summary: Dict):
         """Display conversation summary"""
@@ -69,6 +104,22 @@ class ConsoleDisplay:
         print(f"Average Sentiment: {stats.get('average_sentiment', 0):.3f}")
         print("=" * 70 + "\n")
     
+    @staticmethod
+    def display_usage_report(rows: List[Dict], group_by: str):
+        """Display a usage report (see DatabaseManager.usage_report)"""
+        ConsoleDisplay.display_header(f"⏱️ USAGE BY {group_by.upper()}", width=110)
+        print(f"{group_by.title():<28} {'Turns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'Prompt':>10} {'Max prompt':>10} {'Output':>9} {'Cost':>10}")
+        for row in rows:
+            print(f"{str(row.get('group'))[:28]:<28} {row['turns']:>7,} "
+                  f"{row.get('p50_ms') or 0:>9.0f} {row.get('p95_ms') or 0:>9.0f} "
+                  f"{row.get('p99_ms') or 0:>9.0f} {row['prompt_tokens']:>10,} "
+                  f"{row['max_prompt_tokens'] or 0:>10,} {row['completion_tokens']:>9,} "
+                  f"${row['cost']:>9.4f}")
+        if not rows:
+            print("No turns with latency and token telemetry")
+        print("=" * 110 + "\n")
+    
     @staticmethod
     def display_cost(cost_data: Dict):
         """Display cost breakdown"""
@@ -76,9 +127,17 @@ class ConsoleDisplay:
         print("💰 COST BREAKDOWN".center(70))
         print("=" * 70)
         print(f"Input Tokens:   {cost_data['input_tokens']:>10,}")
+        if 'cached_input_tokens' in cost_data:
+            print(f"  Cached:       {cost_data['cached_input_tokens']:>10,}  "
+                  f"({cost_data.get('cache_hit_rate', 0):.0%} hit rate)")
         print(f"Output Tokens:  {cost_data['output_tokens']:>10,}")
         print(f"Total Tokens:   {cost_data['total_tokens']:>10,}")
         print(f"\nInput Cost:     ${cost_data['input_cost']:>9.6f}")
+        if 'cached_input_cost' in cost_data:
+            print(f"  Cached:       ${cost_data['cached_input_cost']:>9.6f}")
+            print(f"  Uncached:     ${cost_data['uncached_input_cost']:>9.6f}")
         print(f"Output Cost:    ${cost_data['output_cost']:>9.6f}")
         print(f"Total Cost:     ${cost_data['total_cost']:>9.6f}")
+        if cost_data.get('compaction_saved_tokens'):
+            print(f"\nSaved by Context Compaction: {cost_data['compaction_saved_tokens']:,} tokens")
         print("=" * 70 + "\n")
@@ -1,5 +1,5 @@
 """Utils initialization"""
-from .helpers import JSONUtils, SentimentUtils, FormatUtils
+from .helpers import JSONUtils, StreamingFieldParser, SentimentUtils, FormatUtils
 from .constants import (
     SENTIMENT_THRESHOLDS,
     API_COSTS,
@@ -9,6 +9,7 @@ from .constants import (
 
 __all__ = [
     "JSONUtils",
+    "StreamingFieldParser",
     "SentimentUtils", 
     "FormatUtils",
     "SENTIMENT_THRESHOLDS",
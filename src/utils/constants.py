@@ -12,6 +12,7 @@ SENTIMENT_THRESHOLDS = {
 # API Costs (per 1M tokens)
 API_COSTS = {
     "input": 0.15,
+    "cached_input": 0.075,
     "output": 0.60
 }
 
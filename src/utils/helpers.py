@@ -1,7 +1,7 @@
 """Utility functions for JSON, text formatting, etc."""
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 
 class JSONUtils:
@@ -32,6 +32,134 @@ class JSONUtils:
             return {"error": f"JSON Parse Error: {e}"}
 
 
+class StreamingFieldParser:
+    """
+    Incrementally extract one top-level string field from a streamed JSON object
+    
+    Chunks are fed as they arrive from the API. While the target field's string
+    value is open, each call to ``feed`` returns the newly decoded text. Once the
+    closing quote is seen nothing more is emitted, but the raw text keeps being
+    collected so ``finish`` can parse the complete object (e.g. a trailing
+    ``conversation_summary``).
+    """
+    
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b',
+                'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+    
+    def __init__(self, field: str = "response"):
+        self.field = field
+        self._raw: List[str] = []
+        self._state = "seek"  # seek -> colon -> value_start -> value -> done
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._token: List[str] = []
+        self._last_string: Optional[str] = None
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+    
+    @property
+    def done(self) -> bool:
+        """Whether the target field has been fully emitted"""
+        return self._state == "done"
+    
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of raw JSON text and return newly decoded field text"""
+        self._raw.append(chunk)
+        if self._state == "done":
+            return ""
+        
+        out: List[str] = []
+        for ch in chunk:
+            if self._state == "value":
+                self._feed_value(ch, out)
+                if self._state == "done":
+                    break
+            elif self._state == "seek":
+                self._feed_structure(ch)
+            elif self._state == "colon":
+                if ch == ":":
+                    self._state = "value_start"
+                elif not ch.isspace():
+                    self._state = "seek"
+                    self._feed_structure(ch)
+            elif self._state == "value_start":
+                if ch == '"':
+                    self._state = "value"
+                elif not ch.isspace():
+                    # Non-string value: nothing to stream, finish() still parses it
+                    self._state = "done"
+                    break
+        return "".join(out)
+    
+    def _feed_structure(self, ch: str):
+        """Track object depth and top-level keys while looking for the field"""
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_string = "".join(self._token)
+                    if self._last_string == self.field:
+                        self._state = "colon"
+            elif self._depth == 1:
+                self._token.append(ch)
+            return
+        
+        if ch == '"':
+            self._in_string = True
+            self._token = []
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+    
+    def _feed_value(self, ch: str, out: List[str]):
+        """Decode one character of the field's JSON string value"""
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) == 4:
+                self._emit_codepoint(int(self._unicode, 16), out)
+                self._unicode = None
+            return
+        
+        if self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            else:
+                out.append(self._ESCAPES.get(ch, ch))
+            return
+        
+        if ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._state = "done"
+        else:
+            out.append(ch)
+    
+    def _emit_codepoint(self, code: int, out: List[str]):
+        """Emit a \\uXXXX escape, joining UTF-16 surrogate pairs"""
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        out.append(chr(code))
+    
+    def get_text(self) -> str:
+        """Get all raw text received so far"""
+        return "".join(self._raw)
+    
+    def finish(self) -> Dict[str, Any]:
+        """Parse the complete streamed object (raises json.JSONDecodeError)"""
+        return json.loads(JSONUtils.clean_json_response(self.get_text()))
+
+
 class SentimentUtils:
     """Sentiment analysis utilities"""
     
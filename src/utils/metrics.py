@@ -0,0 +1,314 @@
+"""
+Turn timing spans, histograms and counters
+
+Every stage of a turn is timed into the chatbot_stage_duration_seconds
+histogram (label "stage"):
+
+- history_build: building the request messages from the history
+- llm_request: the chat completion call (when streaming, the time spent
+  waiting on the API for chunks, not the consumer's handling of them)
+- llm_ttfb: request start to first streamed chunk
+- parse: JSON cleanup and parsing of the reply
+- persistence: handing turns or the summary to the conversation manager
+- db_write: the MongoDB bulk_write of conversation writes
+
+The registry renders the Prometheus text exposition format (served by
+start_metrics_server) and, with OTEL_METRICS_ENABLED, mirrors every
+observation to OpenTelemetry instruments.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config import Config
+
+try:
+    from opentelemetry import metrics as otel_metrics
+except ImportError:  # optional: only needed with OTEL_METRICS_ENABLED
+    otel_metrics = None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    """Hashable, ordered label set"""
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    """Label value escaped for the exposition format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Prometheus label block, e.g. {stage="parse",le="0.1"}"""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Prometheus sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set"""
+    
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        """Add amount to the counter for the label set"""
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def values(self) -> Dict[Labels, float]:
+        """Current value per label set"""
+        with self._lock:
+            return dict(self._values)
+    
+    def render(self) -> List[str]:
+        """Exposition lines"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+    
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        """Record one observation"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+    
+    def snapshot(self) -> Dict[Labels, Dict]:
+        """Per label set: cumulative bucket counts, sum and count"""
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        snapshot = {}
+        for key, (counts, total, count) in series.items():
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            snapshot[key] = {"buckets": cumulative, "sum": total, "count": count}
+        return snapshot
+    
+    def render(self) -> List[str]:
+        """Exposition lines"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.snapshot().items()):
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class OTelExporter:
+    """
+    Mirrors observations to OpenTelemetry instruments
+    
+    Instruments come from the global MeterProvider. If none is configured
+    and the SDK and OTLP exporter are installed, a periodic OTLP exporter is
+    set up (endpoint from the standard OTEL_EXPORTER_OTLP_* variables).
+    """
+    
+    def __init__(self):
+        if otel_metrics is None:
+            raise ImportError("OpenTelemetry metrics need opentelemetry-api: pip install opentelemetry-api")
+        self._configure_provider()
+        meter = otel_metrics.get_meter("liaplus-chatbot")
+        self.stage_duration = meter.create_histogram(
+            "chatbot.stage.duration", unit="s", description="Duration of each stage of a turn"
+        )
+        self.turns = meter.create_counter("chatbot.turns", description="Chat turns by outcome")
+        self.tokens = meter.create_counter("chatbot.tokens", description="LLM tokens by kind")
+    
+    @staticmethod
+    def _configure_provider():
+        """Install an OTLP MeterProvider when the application has not set one"""
+        try:
+            from opentelemetry.sdk.metrics import MeterProvider
+            from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        except ImportError:
+            print("⚠️ OpenTelemetry SDK/OTLP exporter not installed; "
+                  "metrics go to the configured (or no-op) provider")
+            return
+        if isinstance(otel_metrics.get_meter_provider(), MeterProvider):
+            return
+        reader = PeriodicExportingMetricReader(OTLPMetricExporter())
+        otel_metrics.set_meter_provider(MeterProvider(metric_readers=[reader]))
+
+
+class MetricsRegistry:
+    """Process-wide turn metrics"""
+    
+    def __init__(self, otel: Optional[OTelExporter] = None):
+        self.stage_duration = Histogram(
+            "chatbot_stage_duration_seconds", "Duration of each stage of a chat turn"
+        )
+        self.turns = Counter("chatbot_turns_total", "Chat turns by outcome (ok, cached, error)")
+        self.tokens = Counter("chatbot_tokens_total", "LLM tokens by kind (input, cached_input, output)")
+        self._gauges: Dict[str, Tuple[str, Callable[[], Optional[float]]]] = {}
+        self.otel = otel
+    
+    def observe_stage(self, stage: str, seconds: float, timings: Optional[Dict[str, float]] = None):
+        """
+        Record the duration of a stage
+        
+        Args:
+            stage: Stage name (see the module docstring)
+            seconds: Duration
+            timings: Per-turn dict that also receives the duration (ms)
+        """
+        self.stage_duration.observe(seconds, stage=stage)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 3)
+        if self.otel is not None:
+            self.otel.stage_duration.record(seconds, {"stage": stage})
+    
+    @contextmanager
+    def span(self, stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """Time the enclosed block as a stage (recorded even if it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start, timings)
+    
+    def count_turn(self, outcome: str):
+        """Count a finished turn ("ok", "cached" or "error")"""
+        self.turns.inc(outcome=outcome)
+        if self.otel is not None:
+            self.otel.turns.add(1, {"outcome": outcome})
+    
+    def count_tokens(self, input_tokens: int, cached_tokens: int, output_tokens: int):
+        """Count the tokens of one API response"""
+        for kind, amount in (("input", input_tokens), ("cached_input", cached_tokens),
+                             ("output", output_tokens)):
+            if amount:
+                self.tokens.inc(amount, kind=kind)
+                if self.otel is not None:
+                    self.otel.tokens.add(amount, {"kind": kind})
+    
+    def register_gauge(self, name: str, help_text: str, read: Callable[[], Optional[float]]):
+        """Expose a value read at scrape time (None: omitted)"""
+        self._gauges[name] = (help_text, read)
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = self.stage_duration.render() + self.turns.render() + self.tokens.render()
+        for name, (help_text, read) in sorted(self._gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                value = None
+            if value is not None:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge",
+                          f"{name} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+    
+    def stage_summary(self) -> Dict[str, Dict]:
+        """Count, total and mean seconds per stage (for get_metrics)"""
+        summary = {}
+        for labels, series in self.stage_duration.snapshot().items():
+            stage = dict(labels).get("stage")
+            summary[stage] = {
+                "count": series["count"],
+                "total_s": round(series["sum"], 6),
+                "mean_ms": round(series["sum"] / series["count"] * 1000, 3) if series["count"] else 0.0
+            }
+        return summary
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                otel = None
+                if Config.OTEL_METRICS_ENABLED:
+                    try:
+                        otel = OTelExporter()
+                    except ImportError as e:
+                        print(f"⚠️ {e}")
+                _metrics = MetricsRegistry(otel)
+    return _metrics
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics"""
+    
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        """Scrapes are not logged"""
+
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> ThreadingHTTPServer:
+    """
+    Serve /metrics for Prometheus scrapes from a daemon thread
+    
+    Args:
+        port: Port to listen on (default METRICS_PORT; 0 picks a free port)
+        host: Interface to bind (default METRICS_HOST)
+    
+    Returns:
+        The running server (server.server_address holds the bound port)
+    """
+    server = ThreadingHTTPServer(
+        (host or Config.METRICS_HOST, Config.METRICS_PORT if port is None else port),
+        _MetricsHandler
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"📈 Metrics at http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,248 @@
+"""
+Opt-in per-turn profiling
+
+Modes (PROFILE, the --profile flag or ChatService(profile=...)):
+
+- cpu: cProfile stats of every PROFILE_EVERY-th turn and, with
+  PROFILE_SLOW_MS set, of every turn that took longer (with a threshold
+  every turn runs under the profiler and only the slow ones are kept)
+- memory: tracemalloc snapshots on the same turns, each diffed against the
+  previous one to show where memory grew, with a separate section for
+  conversation history and response parsing
+- all: both
+
+Reports are written to PROFILE_DIR, keeping the newest PROFILE_KEEP files.
+With profiling off, services hold no profiler and turns run unwrapped.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from fnmatch import fnmatch
+from typing import Callable, Dict, Iterator, List, Optional
+from config import Config
+
+PROFILE_MODES = ("off", "cpu", "memory", "all")
+
+# Files whose growth is reported on its own: history, context and parsing
+FOCUS_PATTERNS = ("*/src/core/chatbot.py", "*/src/core/context.py",
+                  "*/src/utils/helpers.py", "*/json/*")
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# Only one cProfile profiler can be active at a time
+_cpu_lock = threading.Lock()
+
+
+def _format_size(size: int) -> str:
+    """Signed byte count in KiB"""
+    return f"{size / 1024:+,.1f} KiB"
+
+
+class TurnProfiler:
+    """
+    Captures cProfile and tracemalloc reports of selected turns
+    
+    The profiler is process-wide: turns of every conversation are counted
+    together and memory diffs span whatever ran in between. With concurrent
+    turns a CPU profile can include other threads' (or tasks') work, and a
+    turn is not CPU-profiled while another one is.
+    """
+    
+    def __init__(self, mode: str, every: Optional[int] = None, slow_ms: Optional[float] = None,
+                 directory: Optional[str] = None, keep: Optional[int] = None):
+        """
+        Args:
+            mode: "cpu", "memory" or "all"
+            every: Capture every Nth turn (default PROFILE_EVERY; 0: none)
+            slow_ms: Also capture turns slower than this (default
+                PROFILE_SLOW_MS; 0: no threshold)
+            directory: Report directory (default PROFILE_DIR)
+            keep: Newest report files kept (default PROFILE_KEEP)
+        """
+        if mode not in PROFILE_MODES or mode == "off":
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.mode = mode
+        self.cpu = mode in ("cpu", "all")
+        self.memory = mode in ("memory", "all")
+        self.every = Config.PROFILE_EVERY if every is None else every
+        self.slow_ms = Config.PROFILE_SLOW_MS if slow_ms is None else slow_ms
+        self.directory = directory or Config.PROFILE_DIR
+        self.keep = Config.PROFILE_KEEP if keep is None else keep
+        self.turns = 0
+        self.reports = 0
+        self.skipped = 0
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_turn = 0
+        self._lock = threading.Lock()
+        
+        os.makedirs(self.directory, exist_ok=True)
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        print(f"🔬 Profiling ({mode}) every {self.every or '-'} turns"
+              f"{f', slower than {self.slow_ms:g} ms' if self.slow_ms else ''} -> {self.directory}")
+    
+    def _start_cpu(self, sampled: bool) -> Optional[cProfile.Profile]:
+        """Enable cProfile for this turn, if it may be reported and none is active"""
+        if not self.cpu or not (sampled or self.slow_ms):
+            return None
+        if not _cpu_lock.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler (e.g. a debugger) is active
+            _cpu_lock.release()
+            self.skipped += 1
+            return None
+        return profile
+    
+    @contextmanager
+    def turn(self, details: Optional[Callable[[], Dict]] = None) -> Iterator[None]:
+        """
+        Profile the enclosed turn
+        
+        Args:
+            details: Called after the turn for context written into the
+                reports (e.g. user id and history length)
+        """
+        with self._lock:
+            self.turns += 1
+            number = self.turns
+        sampled = bool(self.every) and number % self.every == 0
+        profile = self._start_cpu(sampled)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if profile is not None:
+                profile.disable()
+                _cpu_lock.release()
+            slow = bool(self.slow_ms) and elapsed_ms >= self.slow_ms
+            if sampled or slow:
+                try:
+                    self._report(number, elapsed_ms, "slow" if slow else "sampled",
+                                 profile, details() if details else {})
+                except Exception as e:
+                    print(f"⚠️ Could not write profile of turn {number}: {e}")
+    
+    def _report(self, number: int, elapsed_ms: float, reason: str,
+                profile: Optional[cProfile.Profile], details: Dict):
+        """Write the reports of one turn and apply retention"""
+        prefix = os.path.join(
+            self.directory,
+            f"{datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}-turn{number:06d}"
+        )
+        header = [
+            f"Turn {number} ({reason}): {elapsed_ms:.1f} ms",
+            *(f"{key}: {value}" for key, value in details.items()),
+            ""
+        ]
+        if profile is not None:
+            profile.dump_stats(f"{prefix}-cpu.prof")
+            self._write(f"{prefix}-cpu.txt", header + self._cpu_lines(profile))
+        if self.memory:
+            self._write(f"{prefix}-memory.txt", header + self._memory_lines(number))
+        with self._lock:
+            self.reports += 1
+        self._prune()
+    
+    @staticmethod
+    def _cpu_lines(profile: cProfile.Profile) -> List[str]:
+        """Top functions by cumulative time"""
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        return stream.getvalue().splitlines()
+    
+    def _memory_lines(self, number: int) -> List[str]:
+        """Allocation growth since the previous snapshot (top allocations on the first)"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1024:,.1f} KiB (peak {peak / 1024:,.1f} KiB)", ""]
+        
+        with self._lock:
+            previous, previous_turn = self._snapshot, self._snapshot_turn
+            self._snapshot, self._snapshot_turn = snapshot, number
+        if previous is None:
+            lines.append("Top allocations (first snapshot, no diff yet):")
+            lines += [f"  {stat}" for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]]
+            return lines
+        
+        growth = [stat for stat in snapshot.compare_to(previous, "lineno") if stat.size_diff > 0]
+        lines.append(f"Top growth since turn {previous_turn}:")
+        lines += [self._diff_line(stat) for stat in growth[:TOP_ALLOCATIONS]]
+        
+        focus = [stat for stat in growth
+                 if any(fnmatch(stat.traceback[0].filename, pattern) for pattern in FOCUS_PATTERNS)]
+        lines += ["", "Conversation history and response parsing:"]
+        lines += [self._diff_line(stat) for stat in focus[:TOP_ALLOCATIONS]] or ["  (no growth)"]
+        return lines
+    
+    @staticmethod
+    def _diff_line(stat: tracemalloc.StatisticDiff) -> str:
+        """One growth line: size change, block change and location"""
+        frame = stat.traceback[0]
+        return (f"  {_format_size(stat.size_diff):>16}  {stat.count_diff:+8,} blocks  "
+                f"{frame.filename}:{frame.lineno}")
+    
+    @staticmethod
+    def _write(path: str, lines: List[str]):
+        """Write a text report"""
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+    
+    def _prune(self):
+        """Delete all but the newest keep report files"""
+        if self.keep <= 0:
+            return
+        paths = [entry.path for entry in os.scandir(self.directory)
+                 if entry.is_file() and entry.name.endswith(("-cpu.prof", "-cpu.txt", "-memory.txt"))]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[self.keep:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def stats(self) -> Dict:
+        """Turns seen, reports written and CPU captures skipped"""
+        return {"mode": self.mode, "turns": self.turns, "reports": self.reports,
+                "skipped": self.skipped, "directory": self.directory}
+
+
+_profilers: Dict[str, TurnProfiler] = {}
+_profilers_lock = threading.Lock()
+
+
+def get_profiler(mode: Optional[str] = None) -> Optional[TurnProfiler]:
+    """
+    Get the process-wide profiler for a mode
+    
+    Args:
+        mode: Profiling mode (default PROFILE)
+    
+    Returns:
+        The profiler, or None when profiling is off
+    """
+    mode = (mode or Config.PROFILE).lower()
+    if mode == "off":
+        return None
+    if mode not in _profilers:
+        with _profilers_lock:
+            if mode not in _profilers:
+                _profilers[mode] = TurnProfiler(mode)
+    return _profilers[mode]
@@ -0,0 +1,96 @@
+"""Shared fixtures and builders for the tests"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import MemoryMongoClient, canned_summary  # noqa: E402
+from config import Config  # noqa: E402
+from database import DatabaseManager  # noqa: E402
+from src.core.tokens import TokenEstimator  # noqa: E402
+
+CREATED_AT = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def estimator():
+    """Token estimator using the word heuristic, whether or not tiktoken is installed"""
+    token_estimator = TokenEstimator(model="test")
+    token_estimator.encoding = None
+    return token_estimator
+
+
+def make_history(count: int, words: int = 30):
+    """Chat history entries with a few sentences each"""
+    return [
+        {
+            "user_message": f"Question {index}. " + " ".join(["tell me more"] * words),
+            "bot_response": f"Answer {index}! " + " ".join(["here is more"] * words)
+        }
+        for index in range(count)
+    ]
+
+
+def make_turns(start: int, count: int):
+    """Stored message exchanges numbered from start"""
+    return [
+        {
+            "user_message": f"message {index}",
+            "bot_response": f"response {index}",
+            "sentiment": "neutral",
+            "sentiment_score": 0.0,
+            "timestamp": CREATED_AT + timedelta(minutes=index)
+        }
+        for index in range(start, start + count)
+    ]
+
+
+def make_write(conversation_id: str, start: int = 0, count: int = 0, **fields):
+    """Conversation write record appending count turns from start"""
+    write = {"conversation_id": conversation_id, "user_id": "user", "created_at": CREATED_AT}
+    if count:
+        write["turns"] = make_turns(start, count)
+        write["start_index"] = start
+    write.update(fields)
+    return write
+
+
+def summary(score: float):
+    """Conversation summary with an overall sentiment score"""
+    conversation_summary = canned_summary(2)
+    conversation_summary["full_conversation_sentiment"]["average_sentiment_score"] = score
+    return conversation_summary
+
+
+def v1_document(index: int = 0, completed_at: datetime = CREATED_AT):
+    """Conversation as stored before schema v2"""
+    conversation_summary = summary(0.5)
+    turns = [dict(turn, timestamp=turn["timestamp"].isoformat()) for turn in make_turns(0, 2)]
+    return {
+        "user_id": f"user {index}",
+        "created_at": CREATED_AT,
+        "completed_at": completed_at,
+        "status": "completed",
+        "total_messages": 2,
+        "messages": turns,
+        "overall_sentiment": conversation_summary["full_conversation_sentiment"],
+        "full_summary": conversation_summary
+    }
+
+
+@pytest.fixture
+def db():
+    """DatabaseManager over a fresh in-memory client, embedded storage"""
+    return DatabaseManager(client=MemoryMongoClient())
+
+
+@pytest.fixture
+def bucketed_db(monkeypatch):
+    """DatabaseManager over a fresh in-memory client, bucketed storage"""
+    monkeypatch.setattr(Config, "MESSAGE_STORAGE", "bucketed")
+    monkeypatch.setattr(Config, "MESSAGE_BUCKET_SIZE", 4)
+    return DatabaseManager(client=MemoryMongoClient())
@@ -0,0 +1,93 @@
+"""Batch mode: script parsing, read-ahead and result records"""
+
+import io
+import json
+import threading
+import time
+
+from src.services.batch import BatchRunner, read_scripts
+
+
+class ScriptedRunner(BatchRunner):
+    """BatchRunner whose conversations sleep instead of calling the model"""
+    
+    def __init__(self, workers: int = 2, delays=None, release: threading.Event = None):
+        super().__init__(workers=workers)
+        self.delays = delays or {}
+        self.release = release
+    
+    def run_script(self, script):
+        if self.release is not None:
+            self.release.wait(5)
+        time.sleep(self.delays.get(script["id"], 0))
+        if script["messages"] == ["raise"]:
+            raise RuntimeError("model unavailable")
+        return {"id": script["id"], "user_id": script["user_id"], "errors": 0}
+
+
+def lines(*scripts):
+    return [json.dumps(script) if not isinstance(script, str) else script for script in scripts]
+
+
+def results(output):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_read_scripts_accepts_lists_and_objects():
+    scripts = list(read_scripts(lines(["hi"], "", {"id": "a", "messages": ["hello"], "user_id": "u"})))
+    
+    assert scripts == [
+        {"messages": ["hi"], "id": 1, "user_id": "batch-1"},
+        {"id": "a", "messages": ["hello"], "user_id": "u"}
+    ]
+
+
+def test_read_scripts_yields_error_records_for_bad_lines():
+    scripts = list(read_scripts(lines("{not json", {"messages": "hi"}, {"messages": ["ok"], "error": "x"})))
+    
+    assert [script["id"] for script in scripts] == [1, 2, 3]
+    assert scripts[0]["error"].startswith("Line 1: invalid JSON")
+    assert scripts[1]["error"] == "Line 2: expected a list of messages"
+    assert "error" not in scripts[2]
+
+
+def test_bad_lines_are_recorded_without_stopping_the_batch():
+    output = io.StringIO()
+    
+    counts = ScriptedRunner().run(read_scripts(lines(["one"], "{not json", ["raise"], ["two"])), output)
+    
+    assert counts == {"completed": 2, "failed": 2}
+    records = {record["id"]: record for record in results(output)}
+    assert set(records) == {1, 2, 3, 4}
+    assert records[2]["error"].startswith("Line 2")
+    assert records[3]["error"] == "model unavailable"
+
+
+def test_results_are_written_in_completion_order():
+    output = io.StringIO()
+    
+    ScriptedRunner(workers=2, delays={1: 0.2}).run(read_scripts(lines(["slow"], ["fast"])), output)
+    
+    assert [record["id"] for record in results(output)] == [2, 1]
+
+
+def test_reads_at_most_twice_the_workers_ahead():
+    read = []
+    
+    def scripts():
+        for index in range(20):
+            read.append(index)
+            yield {"id": index, "user_id": "user", "messages": ["hi"]}
+    
+    release = threading.Event()
+    runner = ScriptedRunner(workers=2, release=release)
+    worker = threading.Thread(target=runner.run, args=(scripts(), io.StringIO()))
+    worker.start()
+    time.sleep(0.1)
+    
+    # Four scripts are queued and the fifth waits for a free slot
+    assert len(read) == 5
+    release.set()
+    worker.join(5)
+    assert len(read) == 20
+    assert runner.completed == 20
@@ -0,0 +1,103 @@
+"""ContextWindow: budgeting, rolling summary folds and summary token accounting"""
+
+import pytest
+
+from conftest import make_history
+from src.core.context import ContextWindow
+
+SYSTEM_PROMPT = "You are a helpful assistant. Reply in JSON."
+
+
+def window(estimator, **options):
+    settings = dict(token_budget=400, keep_last_turns=2, summary_max_tokens=120, fold_batch=1)
+    settings.update(options)
+    return ContextWindow(estimator=estimator, **settings)
+
+
+def recount(context, estimator):
+    """Summary tokens counted from scratch, as the fold must match"""
+    summary = context.get_summary()
+    return estimator.count_message({"content": summary}) if summary else 0
+
+
+def test_short_history_is_sent_verbatim(estimator):
+    context = window(estimator, token_budget=10_000)
+    history = make_history(3)
+    
+    messages = context.build_messages(SYSTEM_PROMPT, history)
+    
+    assert len(messages) == 1 + 2 * 3
+    assert context.folded_turns == 0
+    assert context.get_summary() == ""
+    assert context.summary_tokens == 0
+
+
+def test_old_turns_fold_into_summary_within_budget(estimator):
+    context = window(estimator)
+    history = make_history(20, words=5)
+    
+    messages = context.build_messages(SYSTEM_PROMPT, history)
+    
+    assert context.folded_turns > 0
+    assert context.context_tokens <= context.token_budget
+    assert messages[1]["role"] == "system"
+    assert messages[1]["content"].startswith(ContextWindow.SUMMARY_HEADER)
+    last_folded = context.folded_turns
+    assert f"Message #{last_folded}: user said \"Question {last_folded - 1}.\"" in messages[1]["content"]
+    assert messages[-1]["content"] == '{"response": "' + history[-1]["bot_response"] + '"}'
+
+
+def test_last_turns_are_never_folded(estimator):
+    context = window(estimator, token_budget=50, keep_last_turns=3)
+    
+    context.build_messages(SYSTEM_PROMPT, make_history(6))
+    
+    assert context.folded_turns == 3
+
+
+@pytest.mark.parametrize("summary_max_tokens", [60, 120, 10_000])
+def test_summary_count_matches_full_recount(estimator, summary_max_tokens):
+    context = window(estimator, token_budget=150, keep_last_turns=1, summary_max_tokens=summary_max_tokens)
+    history = []
+    
+    for entry in make_history(25):
+        history.append(entry)
+        context.build_messages(SYSTEM_PROMPT, history)
+        assert context.summary_tokens == recount(context, estimator)
+
+
+def test_summary_is_bounded_by_dropping_old_lines(estimator):
+    context = window(estimator, token_budget=150, keep_last_turns=1, summary_max_tokens=80)
+    
+    context.build_messages(SYSTEM_PROMPT, make_history(20))
+    
+    assert context.omitted_turns > 0
+    assert context.summary_tokens <= 80 or len(context.summary_lines) == 1
+    assert f"({context.omitted_turns} earlier turns omitted)" in context.get_summary()
+    assert context.omitted_turns + len(context.summary_lines) == context.folded_turns
+
+
+def test_folds_are_batched(estimator):
+    context = window(estimator, token_budget=300, fold_batch=4)
+    history = []
+    
+    for entry in make_history(30, words=5):
+        history.append(entry)
+        folded_before = context.folded_turns
+        context.build_messages(SYSTEM_PROMPT, history)
+        assert context.folded_turns - folded_before <= 4
+        assert context.folded_turns <= max(len(history) - context.keep_last_turns, 0)
+    
+    assert context.folded_turns >= 8
+    assert context.prefix_resets < context.folded_turns / 2
+
+
+def test_prefix_is_stable_between_folds(estimator):
+    context = window(estimator, token_budget=100_000)
+    history = make_history(3)
+    
+    first = context.build_messages(SYSTEM_PROMPT, history)
+    history.append(make_history(4)[3])
+    second = context.build_messages(SYSTEM_PROMPT, history)
+    
+    assert second[:len(first)] == first
@@ -0,0 +1,119 @@
+"""Read-through caching of ConversationManager lookups"""
+
+import pytest
+
+import main
+from conftest import CREATED_AT, make_turns, make_write, summary
+from src.core.conversation import ConversationManager
+from src.core.conversation_cache import ConversationCache
+
+
+class CountingLoads:
+    """Wrap a DatabaseManager method, counting the calls that reach it"""
+    
+    def __init__(self, method):
+        self.method = method
+        self.calls = 0
+    
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.method(*args, **kwargs)
+
+
+@pytest.fixture
+def manager(db):
+    return ConversationManager(db=db, cache=ConversationCache())
+
+
+def save(manager, conversation_id, user_id="user"):
+    manager.db.apply_conversation_writes([
+        make_write(conversation_id, start=0, count=1, user_id=user_id, summary=summary(0.5))
+    ])
+
+
+# --- ConversationCache ----------------------------------------------------------
+
+def test_read_through_caches_loaded_values():
+    cache = ConversationCache()
+    load = CountingLoads(lambda: {"value": 1})
+    
+    assert ConversationCache.read_through(cache.conversations, "key", load) == {"value": 1}
+    assert ConversationCache.read_through(cache.conversations, "key", load) == {"value": 1}
+    assert load.calls == 1
+
+
+def test_read_through_does_not_cache_misses():
+    cache = ConversationCache()
+    load = CountingLoads(lambda: None)
+    
+    ConversationCache.read_through(cache.conversations, "key", load)
+    ConversationCache.read_through(cache.conversations, "key", load)
+    
+    assert load.calls == 2
+
+
+def test_invalidate_user_drops_only_that_users_lists():
+    cache = ConversationCache()
+    cache.user_conversations.set(("alice", 10, "summary"), [])
+    cache.user_conversations.set(("alice", 5, "full"), [])
+    cache.user_conversations.set(("bob", 10, "summary"), [])
+    cache.statistics.set("statistics", {})
+    
+    cache.invalidate_user("alice")
+    
+    assert len(cache.user_conversations) == 1
+    assert cache.user_conversations.get(("bob", 10, "summary")) == []
+    assert len(cache.statistics) == 0
+
+
+# --- ConversationManager ----------------------------------------------------------
+
+def test_conversation_reads_are_cached(manager):
+    conversation_id = manager.db.new_conversation_id()
+    save(manager, conversation_id)
+    manager.db.get_conversation = CountingLoads(manager.db.get_conversation)
+    
+    first = manager.get_conversation(conversation_id)
+    second = manager.get_conversation(conversation_id)
+    
+    assert first is second
+    assert manager.db.get_conversation.calls == 1
+    assert manager.cache_stats()["get_conversation"]["hits"] == 1
+
+
+def test_user_conversations_are_cached_per_limit_and_view(manager):
+    save(manager, manager.db.new_conversation_id())
+    manager.db.find_conversations = CountingLoads(manager.db.find_conversations)
+    
+    manager.get_user_conversations("user", limit=5)
+    full = manager.get_user_conversations("user", limit=5)
+    listed = manager.get_user_conversations("user", limit=5, view="summary")
+    
+    assert manager.db.find_conversations.calls == 2
+    assert "messages" in full[0]
+    assert "messages" not in listed[0]
+
+
+def test_writes_invalidate_cached_reads(manager):
+    conversation_id = manager.db.new_conversation_id()
+    save(manager, conversation_id)
+    assert manager.get_conversation(conversation_id)["total_messages"] == 1
+    assert manager.get_statistics()["total_messages"] == 1
+    
+    manager.append_turns(conversation_id, "user", CREATED_AT, make_turns(1, 1), start_index=1)
+    
+    assert manager.get_conversation(conversation_id)["total_messages"] == 2
+    assert manager.get_statistics()["total_messages"] == 2
+
+
+# --- main.get_stats_manager ----------------------------------------------------------
+
+def test_stats_manager_reconnects_after_a_failed_connect(monkeypatch, db):
+    save(ConversationManager(db=db, cache=ConversationCache()), db.new_conversation_id())
+    db.conversations = None
+    monkeypatch.setattr(main, "_stats_manager", ConversationManager(db=db, cache=ConversationCache()))
+    
+    manager = main.get_stats_manager()
+    
+    assert manager.db.conversations is not None
+    assert manager.get_statistics()["total_conversations"] == 1
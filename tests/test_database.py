@@ -0,0 +1,275 @@
+"""Conversation write records (conditional appends, overlaps and gaps), the statistics counters and conversation queries"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from bson.objectid import ObjectId
+
+from benchmarks.fakes import AsyncMemoryMongoClient
+from conftest import CREATED_AT, make_turns, make_write, summary
+from config import Config
+from database import STATS_ID, AsyncDatabaseManager, build_query_filter, build_write_op, resolve_overlap
+
+
+def stored(db, conversation_id):
+    return db.conversations.find_one({"_id": ObjectId(conversation_id)})
+
+
+def stored_messages(db, conversation_id):
+    return [turn["user_message"] for turn in stored(db, conversation_id)["messages"]]
+
+
+def counted_messages(db):
+    return db.counters.find_one({"_id": STATS_ID})["total_messages"]
+
+
+# --- build_write_op / resolve_overlap --------------------------------------
+
+def test_first_append_may_create_the_conversation():
+    conversation_id = str(ObjectId())
+    operation = build_write_op(make_write(conversation_id, start=0, count=2))
+    
+    assert operation._filter == {"_id": ObjectId(conversation_id), "total_messages": 0}
+    assert operation._upsert
+    assert len(operation._doc["$push"]["messages"]["$each"]) == 2
+    assert operation._doc["$inc"] == {"total_messages": 2}
+
+
+def test_later_append_never_creates_the_conversation():
+    conversation_id = str(ObjectId())
+    operation = build_write_op(make_write(conversation_id, start=3, count=2))
+    
+    assert operation._filter == {"_id": ObjectId(conversation_id), "total_messages": 3}
+    assert not operation._upsert
+
+
+def test_finalize_is_unconditional():
+    conversation_id = str(ObjectId())
+    operation = build_write_op(make_write(conversation_id, summary={"insights": []}, status="completed"))
+    
+    assert operation._filter == {"_id": ObjectId(conversation_id)}
+    assert operation._upsert
+    assert operation._doc["$set"]["status"] == "completed"
+    assert "$push" not in operation._doc
+
+
+def test_resolve_overlap_trims_stored_turns():
+    write = make_write(str(ObjectId()), start=2, count=3)
+    
+    resolved = resolve_overlap(write, 4)
+    
+    assert resolved["start_index"] == 4
+    assert [turn["user_message"] for turn in resolved["turns"]] == ["message 4"]
+    assert len(write["turns"]) == 3
+
+
+def test_resolve_overlap_rejects_gap():
+    assert resolve_overlap(make_write(str(ObjectId()), start=0, count=2), 2)["turns"] == []
+    with pytest.raises(ValueError):
+        resolve_overlap(make_write(str(ObjectId()), start=5, count=1), 3)
+
+
+# --- apply_conversation_writes -----------------------------------------------
+
+def test_appends_build_the_transcript(db):
+    conversation_id = db.new_conversation_id()
+    
+    db.apply_conversation_writes([make_write(conversation_id, start=0, count=2)])
+    db.apply_conversation_writes([make_write(conversation_id, start=2, count=1)])
+    
+    assert stored(db, conversation_id)["total_messages"] == 3
+    assert stored_messages(db, conversation_id) == ["message 0", "message 1", "message 2"]
+    assert counted_messages(db) == 3
+
+
+@pytest.mark.parametrize("start", [0, 2])
+def test_replayed_append_is_idempotent(db, start):
+    conversation_id = db.new_conversation_id()
+    db.apply_conversation_writes([make_write(conversation_id, start=0, count=2)])
+    write = make_write(conversation_id, start=start, count=2)
+    
+    db.apply_conversation_writes([write])
+    db.apply_conversation_writes([write])
+    
+    assert stored(db, conversation_id)["total_messages"] == start + 2
+    assert len(stored_messages(db, conversation_id)) == start + 2
+    assert counted_messages(db) == start + 2
+
+
+@pytest.mark.parametrize("start", [0, 1])
+def test_partial_overlap_appends_only_missing_turns(db, start):
+    conversation_id = db.new_conversation_id()
+    db.apply_conversation_writes([make_write(conversation_id, start=0, count=2)])
+    
+    db.apply_conversation_writes([make_write(conversation_id, start=start, count=4 - start)])
+    
+    assert stored_messages(db, conversation_id) == ["message 0", "message 1", "message 2", "message 3"]
+    assert stored(db, conversation_id)["total_messages"] == 4
+    assert counted_messages(db) == 4
+
+
+def test_later_append_to_a_missing_conversation_is_rejected(db):
+    conversation_id = db.new_conversation_id()
+    
+    with pytest.raises(ValueError, match="not stored"):
+        db.apply_conversation_writes([make_write(conversation_id, start=3, count=2)])
+    
+    assert stored(db, conversation_id) is None
+
+
+def test_gap_is_rejected(db):
+    conversation_id = db.new_conversation_id()
+    db.apply_conversation_writes([make_write(conversation_id, start=0, count=1)])
+    
+    with pytest.raises(ValueError, match="cannot append from turn 3"):
+        db.apply_conversation_writes([make_write(conversation_id, start=3, count=1)])
+    assert stored(db, conversation_id)["total_messages"] == 1
+
+
+def test_rejected_write_does_not_hold_back_the_batch(db):
+    existing, lost, fresh = (db.new_conversation_id() for _ in range(3))
+    db.apply_conversation_writes([make_write(existing, start=0, count=1)])
+    
+    with pytest.raises(ValueError):
+        db.apply_conversation_writes([
+            make_write(existing, start=1, count=1),
+            make_write(lost, start=4, count=1),
+            make_write(fresh, start=0, count=2)
+        ])
+    
+    assert stored(db, existing)["total_messages"] == 2
+    assert stored(db, fresh)["total_messages"] == 2
+    assert stored(db, lost) is None
+    assert counted_messages(db) == 4
+
+
+def test_replays_in_a_batch_are_not_counted_twice(db):
+    first, second = db.new_conversation_id(), db.new_conversation_id()
+    db.apply_conversation_writes([make_write(first, start=0, count=1), make_write(second, start=0, count=1)])
+    db.apply_conversation_writes([make_write(first, start=1, count=1)])
+    
+    db.apply_conversation_writes([make_write(first, start=1, count=1), make_write(second, start=1, count=2)])
+    
+    assert stored(db, first)["total_messages"] == 2
+    assert stored(db, second)["total_messages"] == 3
+    assert counted_messages(db) == 5
+
+
+def test_async_later_append_to_a_missing_conversation_is_rejected():
+    async def run():
+        db = await AsyncDatabaseManager.create(client=AsyncMemoryMongoClient())
+        conversation_id = str(ObjectId())
+        await db.apply_conversation_writes([make_write(conversation_id, start=0, count=1)])
+        await db.apply_conversation_writes([make_write(conversation_id, start=0, count=2)])
+        with pytest.raises(ValueError, match="not stored"):
+            await db.apply_conversation_writes([make_write(str(ObjectId()), start=3, count=2)])
+        return await db.conversations.find_one({"_id": ObjectId(conversation_id)})
+    
+    document = asyncio.run(run())
+    assert document["total_messages"] == 2
+    assert [turn["user_message"] for turn in document["messages"]] == ["message 0", "message 1"]
+
+
+# --- $inc statistics counters ------------------------------------------------
+
+def test_stats_counters_follow_writes(db):
+    first, second = db.new_conversation_id(), db.new_conversation_id()
+    
+    db.apply_conversation_writes([make_write(first, start=0, count=2),
+                                  make_write(second, start=0, count=1)])
+    db.apply_conversation_writes([make_write(first, start=2, count=1, summary=summary(0.5),
+                                             status="completed")])
+    db.finalize_conversation(second, "user", CREATED_AT, summary(-0.25))
+    
+    assert counted_messages(db) == 4
+    assert db.get_statistics() == {
+        "total_conversations": 2, "total_messages": 4, "average_sentiment": 0.125
+    }
+
+
+def test_save_complete_conversation_counts(db):
+    db.save_complete_conversation("user", make_turns(0, 3), summary(1.0), CREATED_AT)
+    db.save_complete_conversation("user", make_turns(0, 1), summary(0.0), CREATED_AT)
+    
+    assert db.get_statistics() == {
+        "total_conversations": 2, "total_messages": 4, "average_sentiment": 0.5
+    }
+
+
+# --- keyset pagination --------------------------------------------------------
+
+def test_pages_cover_every_conversation_once(db):
+    ids = set()
+    for index in range(7):
+        conversation_id = db.new_conversation_id()
+        ids.add(conversation_id)
+        # Pairs share created_at, so _id breaks the tie
+        write = make_write(conversation_id, start=0, count=1,
+                           created_at=CREATED_AT + timedelta(minutes=index // 2))
+        db.apply_conversation_writes([write])
+    
+    seen = []
+    after = None
+    while True:
+        page = db.find_conversations(limit=3, after=after)
+        seen += [(conversation["created_at"], conversation["_id"]) for conversation in page["conversations"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+    
+    assert len(seen) == 7
+    assert {str(oid) for _, oid in seen} == ids
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_last_page_has_no_cursor(db):
+    db.apply_conversation_writes([make_write(db.new_conversation_id(), start=0, count=1)])
+    
+    assert db.find_conversations(limit=1)["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "2026-01-01T00:00:00|nope", "|"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        build_query_filter(after=cursor)
+
+
+# --- unpaged queries ---------------------------------------------------------------
+
+def save_summaries(db, count):
+    for _ in range(count):
+        db.apply_conversation_writes([make_write(db.new_conversation_id(), start=0, count=1,
+                                                 summary=summary(0.5), status="completed")])
+    return summary(0.5)["full_conversation_sentiment"]["overall_emotional_direction"]
+
+
+def test_search_by_direction_returns_every_full_match_by_default(db, monkeypatch):
+    monkeypatch.setattr(Config, "QUERY_PAGE_SIZE", 2)
+    direction = save_summaries(db, 3)
+    
+    found = db.search_by_sentiment_direction(direction)
+    
+    assert len(found) == 3
+    assert all(conversation["messages"] for conversation in found)
+    assert len(db.search_by_sentiment_direction(direction, limit=2, view="summary")) == 2
+
+
+def test_recent_conversations_include_messages_by_default(db):
+    save_summaries(db, 2)
+    
+    assert all("messages" in conversation for conversation in db.get_recent_conversations())
+    assert all("messages" not in conversation for conversation in db.get_recent_conversations(view="summary"))
+
+
+def test_async_search_by_direction_returns_every_match_by_default(monkeypatch):
+    monkeypatch.setattr(Config, "QUERY_PAGE_SIZE", 2)
+    
+    async def run():
+        db = await AsyncDatabaseManager.create(client=AsyncMemoryMongoClient())
+        writes = [make_write(str(ObjectId()), start=0, count=1, summary=summary(0.5)) for _ in range(3)]
+        await db.apply_conversation_writes(writes)
+        direction = summary(0.5)["full_conversation_sentiment"]["overall_emotional_direction"]
+        return await db.search_by_sentiment_direction(direction)
+    
+    assert len(asyncio.run(run())) == 3
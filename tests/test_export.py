@@ -0,0 +1,97 @@
+"""Incremental exports keyed on the (updated_at, _id) watermark"""
+
+import json
+import time
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+from conftest import make_write, summary
+from src.services.export import (ConversationExporter, read_watermark, watermark_filter,
+                                 write_watermark)
+
+UPDATED_AT = datetime(2026, 2, 1, 9, 30)
+
+
+def exported_ids(path):
+    with open(path, encoding="utf-8") as export_file:
+        return [json.loads(line)["conversation_id"] for line in export_file]
+
+
+def test_watermark_filter_breaks_ties_on_id():
+    conversation_id = str(ObjectId())
+    
+    assert watermark_filter(None) == {}
+    assert watermark_filter({"updated_at": UPDATED_AT, "conversation_id": None}) == {
+        "updated_at": {"$gt": UPDATED_AT}
+    }
+    assert watermark_filter({"updated_at": UPDATED_AT, "conversation_id": conversation_id}) == {"$or": [
+        {"updated_at": {"$gt": UPDATED_AT}},
+        {"updated_at": UPDATED_AT, "_id": {"$gt": ObjectId(conversation_id)}}
+    ]}
+
+
+def test_watermark_round_trip(tmp_path):
+    path = str(tmp_path / "watermark")
+    watermark = {"updated_at": UPDATED_AT, "conversation_id": str(ObjectId())}
+    
+    assert read_watermark(path) is None
+    write_watermark(path, watermark)
+    assert read_watermark(path) == watermark
+
+
+def test_legacy_watermark_is_read_as_updated_at(tmp_path):
+    path = tmp_path / "watermark"
+    path.write_text(UPDATED_AT.isoformat() + "\n", encoding="utf-8")
+    
+    assert read_watermark(str(path)) == {"updated_at": UPDATED_AT, "conversation_id": None}
+
+
+def test_incremental_export_picks_up_finished_conversations(db, tmp_path):
+    active, done = db.new_conversation_id(), db.new_conversation_id()
+    db.apply_conversation_writes([make_write(active, start=0, count=1),
+                                  make_write(done, start=0, count=1, summary=summary(0.5),
+                                             status="completed")])
+    
+    first = str(tmp_path / "first.jsonl")
+    watermark = ConversationExporter(db).export(first)
+    assert sorted(exported_ids(first)) == sorted([active, done])
+    
+    time.sleep(0.002)  # stored timestamps have millisecond precision
+    db.finalize_conversation(active, "user", datetime(2026, 1, 1), summary(0.5))
+    second = str(tmp_path / "second.jsonl")
+    watermark = ConversationExporter(db).export(second, since=watermark)
+    assert exported_ids(second) == [active]
+    
+    third = str(tmp_path / "third.jsonl")
+    assert ConversationExporter(db).export(third, since=watermark) == watermark
+    assert exported_ids(third) == []
+
+
+def test_conversations_sharing_updated_at_are_not_lost(db, tmp_path):
+    ids = sorted(db.new_conversation_id() for _ in range(3))
+    for conversation_id in ids:
+        db.conversations.insert_one({"_id": ObjectId(conversation_id), "user_id": "user",
+                                     "created_at": UPDATED_AT, "updated_at": UPDATED_AT,
+                                     "schema_version": 2, "status": "completed"})
+    
+    path = str(tmp_path / "export.jsonl")
+    since = {"updated_at": UPDATED_AT, "conversation_id": ids[0]}
+    watermark = ConversationExporter(db).export(path, since=since)
+    
+    assert exported_ids(path) == ids[1:]
+    assert watermark == {"updated_at": UPDATED_AT, "conversation_id": ids[-1]}
+
+
+@pytest.mark.parametrize("status, expected", [("completed", 1), (None, 2)])
+def test_status_filter(db, tmp_path, status, expected):
+    db.apply_conversation_writes([
+        make_write(db.new_conversation_id(), start=0, count=1),
+        make_write(db.new_conversation_id(), start=0, count=1, summary=summary(0.5), status="completed")
+    ])
+    
+    path = str(tmp_path / "export.jsonl")
+    ConversationExporter(db, status=status).export(path)
+    
+    assert len(exported_ids(path)) == expected
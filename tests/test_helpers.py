@@ -0,0 +1,80 @@
+"""StreamingFieldParser: incremental extraction of the streamed response field"""
+
+import json
+
+import pytest
+
+from src.utils.helpers import StreamingFieldParser
+
+
+def stream(chunks, field="response"):
+    """Feed chunks, returning the parser and everything it emitted"""
+    parser = StreamingFieldParser(field)
+    return parser, "".join(parser.feed(chunk) for chunk in chunks)
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+REPLY = {
+    "response": 'Line one\nsays "hi" \\ back é \U0001F600 /',
+    "conversation_summary": {"response": "nested", "insights": ["a", "b"]}
+}
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 1000])
+def test_emits_decoded_field_at_any_chunk_boundary(size):
+    text = json.dumps(REPLY)
+    
+    parser, emitted = stream(split(text, size))
+    
+    assert emitted == REPLY["response"]
+    assert parser.done
+    assert parser.finish() == REPLY
+
+
+@pytest.mark.parametrize("size", [1, 2, 4])
+def test_unicode_escapes_split_across_chunks(size):
+    text = '{"response": "caf\\u00e9 \\ud83d\\ude00 tab\\tend"}'
+    
+    assert stream(split(text, size))[1] == "café \U0001F600 tab\tend"
+
+
+def test_key_in_a_nested_object_or_value_is_ignored():
+    text = '{"meta": {"response": "inner"}, "note": "response", "response": "outer"}'
+    
+    assert stream(split(text, 1))[1] == "outer"
+
+
+def test_escaped_quote_in_a_preceding_value_does_not_end_it():
+    text = '{"note": "a \\"response\\": \\"x\\"", "response": "real"}'
+    
+    assert stream([text])[1] == "real"
+
+
+def test_nothing_is_emitted_after_the_field_closes():
+    parser, emitted = stream(['{"response": "done"', ', "response2": "more"}'])
+    
+    assert emitted == "done"
+    assert parser.feed("ignored") == ""
+    assert parser.get_text().endswith("ignored")
+
+
+def test_non_string_value_is_not_streamed():
+    parser, emitted = stream(['{"response": null}'])
+    
+    assert emitted == ""
+    assert parser.done
+    assert parser.finish() == {"response": None}
+
+
+def test_other_field():
+    assert stream(['{"response": "a", "summary": "b"}'], field="summary")[1] == "b"
+
+
+def test_finish_accepts_fenced_replies():
+    parser, emitted = stream(["```json\n", '{"response": "hi"}', "\n```"])
+    
+    assert emitted == "hi"
+    assert parser.finish() == {"response": "hi"}
@@ -0,0 +1,79 @@
+"""LazyConversation: the RawBSON read path"""
+
+import bson
+import pytest
+from bson.raw_bson import RawBSONDocument
+
+from conftest import make_write, v1_document
+from schema import SCHEMA_VERSION, LazyConversation, read_conversation, upgrade_document
+
+
+def raw(document):
+    return RawBSONDocument(bson.encode(document))
+
+
+def stored_v2(db, count=2):
+    conversation_id = db.new_conversation_id()
+    db.apply_conversation_writes([make_write(conversation_id, start=0, count=count, status="completed")])
+    return conversation_id
+
+
+@pytest.mark.parametrize("document", [
+    v1_document(),
+    upgrade_document(v1_document()),
+    upgrade_document(v1_document(), compress=True)
+], ids=["v1", "v2", "v2 compressed"])
+def test_decodes_like_read_conversation(document):
+    document["_id"] = bson.ObjectId()
+    
+    lazy = LazyConversation(raw(document))
+    
+    assert lazy.to_dict() == read_conversation(bson.decode(bson.encode(document)))
+    assert lazy["schema_version"] == SCHEMA_VERSION
+    assert "full_summary" not in lazy
+    assert "messages_z" not in lazy
+
+
+def test_fields_are_decoded_on_access():
+    lazy = LazyConversation(raw(upgrade_document(v1_document(), compress=True)))
+    assert lazy._fields == {}
+    
+    assert lazy["user_id"] == "user 0"
+    assert list(lazy._fields) == ["user_id"]
+    assert [turn["user_message"] for turn in lazy["messages"]] == ["message 0", "message 1"]
+
+
+def test_assignments_and_deletions_overlay_the_raw_document():
+    lazy = LazyConversation(raw(upgrade_document(v1_document())))
+    
+    lazy["status"] = "abandoned"
+    lazy["note"] = "added"
+    del lazy["messages"]
+    
+    assert lazy["status"] == "abandoned"
+    assert lazy["note"] == "added"
+    assert "messages" not in lazy
+    with pytest.raises(KeyError):
+        lazy["messages"]
+    with pytest.raises(KeyError):
+        del lazy["missing"]
+    assert lazy.to_dict()["status"] == "abandoned"
+
+
+def test_lazy_and_eager_reads_agree(db):
+    conversation_id = stored_v2(db)
+    
+    lazy = db.get_conversation(conversation_id, lazy=True)
+    
+    assert isinstance(lazy, LazyConversation)
+    assert lazy.to_dict() == db.get_conversation(conversation_id, lazy=False)
+
+
+def test_lazy_pages_honour_the_view(db):
+    stored_v2(db)
+    
+    page = db.find_conversations(view="summary", lazy=True)
+    
+    assert all(isinstance(conversation, LazyConversation) for conversation in page["conversations"])
+    assert "messages" not in page["conversations"][0]
+    assert page["conversations"][0]["total_messages"] == 2
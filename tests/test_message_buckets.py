@@ -0,0 +1,97 @@
+"""Bucketed transcript storage: spans, slot upserts and reads"""
+
+import pytest
+from bson.objectid import ObjectId
+
+from conftest import make_write
+from message_buckets import bucket_query, bucket_span, build_bucket_ops, slice_buckets
+
+
+def transcript(db, conversation_id):
+    return [turn["user_message"] for turn in db.iter_bucket_messages(conversation_id)]
+
+
+def buckets(db, conversation_id):
+    return list(db.messages.find({"conversation_id": ObjectId(conversation_id)}).sort("bucket", 1))
+
+
+@pytest.mark.parametrize("start, count, spans", [
+    (0, 3, [(0, 0, 0)]),
+    (2, 5, [(0, 2, 0), (1, 0, 2)]),
+    (4, 4, [(1, 0, 0)]),
+    (3, 10, [(0, 3, 0), (1, 0, 1), (2, 0, 5), (3, 0, 9)]),
+    (5, 0, [])
+])
+def test_bucket_span(start, count, spans):
+    assert bucket_span(start, count, 4) == spans
+
+
+def test_ops_target_one_bucket_each():
+    conversation_id = str(ObjectId())
+    
+    operations = build_bucket_ops(make_write(conversation_id, start=3, count=3), 4)
+    
+    assert [op._filter for op in operations] == [
+        {"conversation_id": ObjectId(conversation_id), "bucket": 0},
+        {"conversation_id": ObjectId(conversation_id), "bucket": 1}
+    ]
+    assert all(op._upsert for op in operations)
+    chunks = [op._doc[0]["$set"]["messages"]["$concatArrays"][1]["$literal"] for op in operations]
+    assert [[turn["user_message"] for turn in chunk] for chunk in chunks] == [
+        ["message 3"], ["message 4", "message 5"]
+    ]
+
+
+def test_ops_need_start_index():
+    write = make_write(str(ObjectId()), start=0, count=1, start_index=None)
+    
+    with pytest.raises(ValueError):
+        build_bucket_ops(write, 4)
+    assert build_bucket_ops(make_write(str(ObjectId())), 4) == []
+
+
+def test_appends_fill_slots_across_buckets(bucketed_db):
+    conversation_id = bucketed_db.new_conversation_id()
+    
+    bucketed_db.apply_conversation_writes([make_write(conversation_id, start=0, count=3)])
+    bucketed_db.apply_conversation_writes([make_write(conversation_id, start=3, count=3)])
+    
+    assert transcript(bucketed_db, conversation_id) == [f"message {index}" for index in range(6)]
+    assert [(bucket["bucket"], bucket["start_index"], bucket["count"])
+            for bucket in buckets(bucketed_db, conversation_id)] == [(0, 0, 4), (1, 4, 2)]
+    document = bucketed_db.conversations.find_one({"_id": ObjectId(conversation_id)})
+    assert document["total_messages"] == 6
+    assert "messages" not in document
+
+
+def test_replayed_turns_overwrite_their_slots(bucketed_db):
+    conversation_id = bucketed_db.new_conversation_id()
+    bucketed_db.apply_conversation_writes([make_write(conversation_id, start=0, count=5)])
+    
+    bucketed_db.apply_conversation_writes([make_write(conversation_id, start=2, count=4)])
+    bucketed_db.apply_conversation_writes([make_write(conversation_id, start=2, count=4)])
+    
+    assert transcript(bucketed_db, conversation_id) == [f"message {index}" for index in range(6)]
+    assert bucketed_db.conversations.find_one({"_id": ObjectId(conversation_id)})["total_messages"] == 6
+
+
+def test_dollar_text_is_stored_literally(bucketed_db):
+    conversation_id = bucketed_db.new_conversation_id()
+    write = make_write(conversation_id, start=0, count=1)
+    write["turns"][0]["user_message"] = "$messages"
+    
+    bucketed_db.apply_conversation_writes([write])
+    
+    assert transcript(bucketed_db, conversation_id) == ["$messages"]
+
+
+def test_pages_read_only_the_needed_buckets(bucketed_db):
+    conversation_id = bucketed_db.new_conversation_id()
+    bucketed_db.apply_conversation_writes([make_write(conversation_id, start=0, count=10)])
+    
+    assert bucket_query(conversation_id, 3, 4, 4)["bucket"] == {"$gte": 0, "$lte": 1}
+    page = bucketed_db.get_messages(conversation_id, start=3, limit=4)
+    assert [turn["user_message"] for turn in page] == ["message 3", "message 4", "message 5", "message 6"]
+    
+    stored = buckets(bucketed_db, conversation_id)
+    assert [turn["user_message"] for turn in slice_buckets(stored, 8, 5)] == ["message 8", "message 9"]
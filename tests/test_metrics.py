@@ -0,0 +1,90 @@
+"""Turn metrics: histogram buckets, exposition format and the streamed llm_request span"""
+
+import asyncio
+import time
+
+from benchmarks.fakes import AsyncFakeOpenAI, FakeOpenAI
+from src.core.chatbot import AsyncSentimentChatbot, SentimentChatbot
+from src.utils.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0, 0.5))
+    
+    for value in (0.05, 0.1, 0.3, 0.7, 5.0):
+        histogram.observe(value, stage="parse")
+    
+    series = histogram.snapshot()[(("stage", "parse"),)]
+    assert histogram.buckets == (0.1, 0.5, 1.0)
+    assert series["buckets"] == [2, 3, 4]
+    assert series["count"] == 5
+    assert series["sum"] == 6.15
+
+
+def test_histogram_renders_every_bucket_with_inf():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    histogram.observe(0.5, stage="parse")
+    histogram.observe(2.0, stage="parse")
+    
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="parse",le="0.1"} 0',
+        'latency_seconds_bucket{stage="parse",le="1.0"} 1',
+        'latency_seconds_bucket{stage="parse",le="+Inf"} 2',
+        'latency_seconds_sum{stage="parse"} 2.5',
+        'latency_seconds_count{stage="parse"} 2'
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("turns_total", "Turns")
+    counter.inc(outcome='say "hi"\n')
+    
+    assert counter.render()[-1] == 'turns_total{outcome="say \\"hi\\"\\n"} 1'
+
+
+def test_registry_skips_failing_gauges():
+    registry = MetricsRegistry()
+    registry.register_gauge("queue_depth", "Queued writes", lambda: 3)
+    registry.register_gauge("broken", "Raises", lambda: 1 / 0)
+    registry.observe_stage("parse", 0.002)
+    
+    rendered = registry.render()
+    
+    assert "queue_depth 3\n" in rendered
+    assert "broken" not in rendered
+    assert registry.stage_summary()["parse"] == {"count": 1, "total_s": 0.002, "mean_ms": 2.0}
+
+
+# --- streamed llm_request --------------------------------------------------------
+
+CONSUMER_DELAY = 0.02
+
+
+def test_streamed_request_excludes_consumer_time():
+    bot = SentimentChatbot(client=FakeOpenAI(stream_chunks=8))
+    
+    chunks = 0
+    for _ in bot.send_message_stream("hello"):
+        chunks += 1
+        time.sleep(CONSUMER_DELAY)
+    
+    assert chunks >= 4
+    assert bot.turn_timings["llm_request"] < chunks * CONSUMER_DELAY * 1000 / 2
+
+
+def test_async_streamed_request_excludes_consumer_time():
+    bot = AsyncSentimentChatbot(client=AsyncFakeOpenAI(stream_chunks=8))
+    
+    async def consume():
+        chunks = 0
+        async for _ in bot.send_message_stream("hello"):
+            chunks += 1
+            await asyncio.sleep(CONSUMER_DELAY)
+        return chunks
+    
+    chunks = asyncio.run(consume())
+    
+    assert chunks >= 4
+    assert bot.turn_timings["llm_request"] < chunks * CONSUMER_DELAY * 1000 / 2
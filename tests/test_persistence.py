@@ -0,0 +1,271 @@
+"""Write coalescing, the write-behind queue and the local spool"""
+
+import json
+import os
+
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import (AutoReconnect, BulkWriteError, DuplicateKeyError, OperationFailure,
+                            WTimeoutError)
+
+from conftest import CREATED_AT, make_write, summary
+from database import is_transient_error
+from src.services.persistence import WriteBehindQueue, coalesce_writes
+from src.services.spool import ConversationSpool
+
+
+def messages(write):
+    return [turn["user_message"] for turn in write["turns"]]
+
+
+def stored_messages(db, conversation_id):
+    document = db.conversations.find_one({"_id": ObjectId(conversation_id)})
+    return [turn["user_message"] for turn in document["messages"]]
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return ConversationSpool(str(tmp_path / "spool.jsonl"), fsync_every=1,
+                             dead_letter_path=str(tmp_path / "dead-letter.jsonl"), replay_batch=2)
+
+
+class FlakyWriter:
+    """Writer failing with a connection error for the first failures calls"""
+    
+    def __init__(self, db, failures: int = 0):
+        self.db = db
+        self.failures = failures
+        self.calls = []
+    
+    def __call__(self, writes):
+        self.calls.append(writes)
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        self.db.apply_conversation_writes(writes)
+
+
+# --- coalesce_writes ---------------------------------------------------------
+
+def test_coalesce_merges_turns_per_conversation():
+    first, second = str(ObjectId()), str(ObjectId())
+    
+    merged = coalesce_writes([
+        make_write(first, start=0, count=1),
+        make_write(second, start=0, count=1),
+        make_write(first, start=1, count=2)
+    ])
+    
+    assert [write["conversation_id"] for write in merged] == [first, second]
+    assert merged[0]["start_index"] == 0
+    assert messages(merged[0]) == ["message 0", "message 1", "message 2"]
+
+
+def test_coalesce_drops_turns_a_retry_repeats():
+    conversation_id = str(ObjectId())
+    
+    merged = coalesce_writes([
+        make_write(conversation_id, start=0, count=2),
+        make_write(conversation_id, start=1, count=2)
+    ])
+    
+    assert messages(merged[0]) == ["message 0", "message 1", "message 2"]
+
+
+def test_coalesce_latest_summary_and_status_win():
+    conversation_id = str(ObjectId())
+    
+    merged = coalesce_writes([
+        make_write(conversation_id, start=0, count=1, summary=summary(0.1), status="abandoned"),
+        make_write(conversation_id, summary=summary(0.9), status="completed")
+    ])
+    
+    assert merged[0]["status"] == "completed"
+    assert merged[0]["summary"]["full_conversation_sentiment"]["average_sentiment_score"] == 0.9
+    assert messages(merged[0]) == ["message 0"]
+
+
+def test_coalesce_does_not_modify_records():
+    write = make_write(str(ObjectId()), start=0, count=1)
+    
+    coalesce_writes([write, make_write(write["conversation_id"], start=1, count=1)])
+    
+    assert messages(write) == ["message 0"]
+
+
+# --- spool -------------------------------------------------------------------
+
+def test_spool_round_trips_records(spool, db):
+    conversation_id = db.new_conversation_id()
+    spool.append([make_write(conversation_id, start=0, count=2)])
+    assert spool.has_pending()
+    
+    written = []
+    assert spool.replay(written.extend)
+    
+    assert not spool.has_pending()
+    assert written[0]["created_at"] == CREATED_AT
+    assert messages(written[0]) == ["message 0", "message 1"]
+    assert spool.stats()["replayed"] == 1
+
+
+def test_spool_skips_torn_final_line(spool):
+    spool.append([make_write(str(ObjectId()), start=0, count=1)])
+    spool.close()
+    with open(spool.path, "a", encoding="utf-8") as spool_file:
+        spool_file.write('{"conversation_id": "torn')
+    
+    written = []
+    assert spool.replay(written.extend)
+    assert len(written) == 1
+
+
+def test_rotate_keeps_older_records_first(spool):
+    first, second = str(ObjectId()), str(ObjectId())
+    spool.append([make_write(first, start=0, count=1)])
+    spool._rotate()
+    spool.append([make_write(second, start=0, count=1)])
+    spool._rotate()
+    
+    assert [record["conversation_id"] for record in spool._read(spool.replay_path)] == [first, second]
+    assert not os.path.exists(spool.path)
+
+
+def test_appends_during_replay_wait_for_next_replay(spool):
+    first, second = str(ObjectId()), str(ObjectId())
+    spool.append([make_write(first, start=0, count=1)])
+    written = []
+    
+    def writer(records):
+        spool.append([make_write(second, start=0, count=1)])
+        written.extend(records)
+    
+    assert spool.replay(writer)
+    assert [record["conversation_id"] for record in written] == [first]
+    assert spool.has_pending()
+    
+    written.clear()
+    assert spool.replay(written.extend)
+    assert [record["conversation_id"] for record in written] == [second]
+
+
+def test_transient_failure_keeps_unwritten_records(spool, db):
+    ids = [db.new_conversation_id() for _ in range(4)]
+    spool.append([make_write(conversation_id, start=0, count=1) for conversation_id in ids])
+    writer = FlakyWriter(db)
+    
+    def fail_second_batch(records):
+        if len(writer.calls) == 1:
+            writer.failures = 1
+        writer(records)
+    
+    assert not spool.replay(fail_second_batch)
+    
+    kept = [record["conversation_id"] for record in spool._read(spool.replay_path)]
+    assert kept == ids[2:]
+    assert spool.replay(writer)
+    assert all(stored_messages(db, conversation_id) == ["message 0"] for conversation_id in ids)
+
+
+def test_rejected_conversation_is_dead_lettered(spool, db):
+    good, bad = db.new_conversation_id(), db.new_conversation_id()
+    db.apply_conversation_writes([make_write(bad, start=0, count=1)])
+    spool.append([make_write(bad, start=5, count=1), make_write(good, start=0, count=1)])
+    
+    assert spool.replay(db.apply_conversation_writes)
+    
+    assert stored_messages(db, good) == ["message 0"]
+    assert stored_messages(db, bad) == ["message 0"]
+    assert not spool.has_pending()
+    with open(spool.dead_letter_path, encoding="utf-8") as dead_file:
+        dead = [json.loads(line) for line in dead_file]
+    assert len(dead) == 1
+    assert dead[0]["write"]["conversation_id"] == bad
+    assert dead[0]["error"].startswith("ValueError")
+    assert spool.stats()["dead_lettered"] == 1
+
+
+# --- WriteBehindQueue --------------------------------------------------------
+
+def run_queue(writer, writes, spool=None):
+    write_queue = WriteBehindQueue(writer, batch_size=len(writes), flush_interval=0.01,
+                                   max_retries=0, spool=spool)
+    for write in writes:
+        write_queue.submit(write)
+    write_queue.flush()
+    return write_queue
+
+
+def test_queue_writes_coalesced_batches(db):
+    conversation_id = db.new_conversation_id()
+    writer = FlakyWriter(db)
+    
+    write_queue = run_queue(writer, [make_write(conversation_id, start=0, count=1),
+                                     make_write(conversation_id, start=1, count=1)])
+    write_queue.close()
+    
+    assert stored_messages(db, conversation_id) == ["message 0", "message 1"]
+    assert write_queue.stats()["written"] == 2
+    assert all(len(call) == 1 for call in writer.calls)
+
+
+def test_queue_spools_on_connection_error_and_replays(db, spool):
+    first, second = db.new_conversation_id(), db.new_conversation_id()
+    writer = FlakyWriter(db, failures=1)
+    
+    write_queue = run_queue(writer, [make_write(first, start=0, count=1)], spool)
+    assert spool.has_pending()
+    assert db.conversations.find_one({"_id": ObjectId(first)}) is None
+    
+    write_queue.submit(make_write(second, start=0, count=1))
+    write_queue.flush()
+    write_queue.close()
+    
+    assert stored_messages(db, first) == ["message 0"]
+    assert stored_messages(db, second) == ["message 0"]
+    assert not spool.has_pending()
+    assert write_queue.stats()["failed"] == 0
+
+
+def test_queue_dead_letters_only_the_rejected_write(db, spool):
+    good, bad = db.new_conversation_id(), db.new_conversation_id()
+    db.apply_conversation_writes([make_write(bad, start=0, count=1)])
+    
+    write_queue = run_queue(FlakyWriter(db), [make_write(bad, start=4, count=1),
+                                              make_write(good, start=0, count=1)], spool)
+    write_queue.close()
+    
+    assert stored_messages(db, good) == ["message 0"]
+    assert not spool.has_pending()
+    assert spool.stats()["dead_lettered"] == 1
+    assert write_queue.stats()["failed"] == 1
+
+
+def test_queue_drops_rejected_write_without_spool(db):
+    good, bad = db.new_conversation_id(), db.new_conversation_id()
+    db.apply_conversation_writes([make_write(bad, start=0, count=1)])
+    
+    write_queue = run_queue(FlakyWriter(db), [make_write(bad, start=4, count=1),
+                                              make_write(good, start=0, count=1)])
+    write_queue.close()
+    
+    assert stored_messages(db, good) == ["message 0"]
+    assert write_queue.stats()["failed"] == 1
+    assert write_queue.stats()["written"] == 1
+
+
+# --- is_transient_error ------------------------------------------------------
+
+@pytest.mark.parametrize("error, transient", [
+    (ConnectionError("not connected"), True),
+    (AutoReconnect("connection reset"), True),
+    (WTimeoutError("write concern timeout"), True),
+    (BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"code": 64}]}), True),
+    (BulkWriteError({"writeErrors": [{"index": 0, "code": 10334}], "writeConcernErrors": []}), False),
+    (DuplicateKeyError("E11000", 11000), False),
+    (OperationFailure("retry me", 91, {"errorLabels": ["RetryableWriteError"]}), True),
+    (OperationFailure("document too large", 10334), False),
+    (ValueError("gap"), False)
+])
+def test_is_transient_error(error, transient):
+    assert is_transient_error(error) is transient
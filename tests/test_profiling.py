@@ -0,0 +1,118 @@
+"""Per-turn profiling: sampling, slow turns, reports and retention"""
+
+import os
+import time
+import tracemalloc
+
+import pytest
+
+from config import Config
+from src.utils import profiling
+from src.utils.profiling import TurnProfiler, get_profiler
+
+
+def reports(directory):
+    return sorted(name for name in os.listdir(directory))
+
+
+def run_turns(profiler, count, seconds=0.0, details=None):
+    for _ in range(count):
+        with profiler.turn(details):
+            time.sleep(seconds)
+
+
+@pytest.fixture
+def stop_tracemalloc():
+    tracing = tracemalloc.is_tracing()
+    yield
+    if not tracing:
+        tracemalloc.stop()
+
+
+def test_every_nth_turn_is_captured(tmp_path):
+    profiler = TurnProfiler("cpu", every=2, slow_ms=0, directory=str(tmp_path), keep=0)
+    
+    run_turns(profiler, 4, details=lambda: {"user_id": "alice"})
+    
+    names = reports(tmp_path)
+    assert [name.split("-")[-2:] for name in names] == [
+        ["turn000002", "cpu.prof"], ["turn000002", "cpu.txt"],
+        ["turn000004", "cpu.prof"], ["turn000004", "cpu.txt"]
+    ]
+    with open(tmp_path / names[1], encoding="utf-8") as report:
+        assert report.readline().startswith("Turn 2 (sampled)")
+        assert report.readline() == "user_id: alice\n"
+    assert profiler.stats()["reports"] == 2
+
+
+def test_only_slow_turns_are_kept_with_a_threshold(tmp_path):
+    profiler = TurnProfiler("cpu", every=0, slow_ms=20, directory=str(tmp_path), keep=0)
+    
+    run_turns(profiler, 2)
+    run_turns(profiler, 1, seconds=0.03)
+    
+    names = reports(tmp_path)
+    assert len(names) == 2
+    assert all("turn000003" in name for name in names)
+    with open(tmp_path / names[-1], encoding="utf-8") as report:
+        assert report.readline().startswith("Turn 3 (slow)")
+
+
+def test_busy_cpu_profiler_skips_the_turn(tmp_path):
+    profiler = TurnProfiler("cpu", every=1, slow_ms=0, directory=str(tmp_path), keep=0)
+    
+    with profiling._cpu_lock:
+        run_turns(profiler, 1)
+    
+    assert profiler.stats()["skipped"] == 1
+    assert not any(name.endswith(".prof") for name in reports(tmp_path))
+
+
+def test_memory_reports_diff_against_the_previous_capture(tmp_path, stop_tracemalloc):
+    profiler = TurnProfiler("memory", every=1, slow_ms=0, directory=str(tmp_path), keep=0)
+    
+    run_turns(profiler, 2)
+    
+    names = reports(tmp_path)
+    assert all(name.endswith("-memory.txt") for name in names)
+    first, second = ((tmp_path / name).read_text(encoding="utf-8") for name in names)
+    assert "first snapshot, no diff yet" in first
+    assert "Top growth since turn 1:" in second
+    assert "Conversation history and response parsing:" in second
+
+
+def test_only_the_newest_reports_are_kept(tmp_path):
+    profiler = TurnProfiler("cpu", every=1, slow_ms=0, directory=str(tmp_path), keep=3)
+    (tmp_path / "notes.txt").write_text("not a report", encoding="utf-8")
+    
+    for _ in range(3):
+        run_turns(profiler, 1)
+        time.sleep(0.01)  # distinct modification times
+    
+    names = reports(tmp_path)
+    assert "notes.txt" in names
+    names.remove("notes.txt")
+    assert len(names) == 3
+    assert names[-1].endswith("turn000003-cpu.txt")
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TurnProfiler("off", directory=str(tmp_path))
+    with pytest.raises(ValueError):
+        TurnProfiler("gpu", directory=str(tmp_path))
+
+
+def test_profiling_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(Config, "PROFILE", "off")
+    
+    assert get_profiler() is None
+    assert get_profiler("OFF") is None
+
+
+def test_profilers_are_shared_per_mode(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_profilers", {})
+    
+    assert get_profiler("cpu") is get_profiler("CPU")
+    assert get_profiler("cpu").directory == str(tmp_path)
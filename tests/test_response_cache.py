@@ -0,0 +1,138 @@
+"""ResponseCache keys and backends, and what the chatbot caches"""
+
+import pytest
+
+from benchmarks.fakes import FakeOpenAI
+from src.core.chatbot import SentimentChatbot
+from src.core.response_cache import MemoryCacheBackend, ResponseCache, SQLiteCacheBackend
+
+REPLY = {"response": "Hi! How can I help?"}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteCacheBackend(str(tmp_path / "responses.sqlite3"), max_entries=10, ttl=60)
+    return MemoryCacheBackend(max_entries=10, ttl=60)
+
+
+@pytest.mark.parametrize("message", ["Hello", "hello!", "  HELLO  ", "hello?!.", "Hello\n"])
+def test_keys_ignore_case_whitespace_and_trailing_punctuation(message):
+    assert ResponseCache.make_key("model", b"[]", message) == ResponseCache.make_key("model", b"[]", "hello")
+
+
+def test_keys_depend_on_model_context_and_message():
+    key = ResponseCache.make_key("model", b"[]", "hello")
+    
+    assert ResponseCache.make_key("other", b"[]", "hello") != key
+    assert ResponseCache.make_key("model", b"[{}]", "hello") != key
+    assert ResponseCache.make_key("model", b"[]", "hello there") != key
+    assert ResponseCache.make_key("model", b"[]", "hell o") != key
+
+
+def test_summaries_and_errors_are_not_cached(backend):
+    cache = ResponseCache(backend)
+    
+    cache.set("summary", {"response": "Bye", "conversation_summary": {}})
+    cache.set("error", {"response": "Sorry", "error": "boom"})
+    cache.set("plain", REPLY)
+    
+    assert cache.get("summary") is None
+    assert cache.get("error") is None
+    assert cache.get("plain") == REPLY
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_hits_are_copies(backend):
+    response = {"response": "Hi", "details": {"tone": "warm"}}
+    backend.set("key", response)
+    response["details"]["tone"] = "changed by the caller"
+    
+    hit = backend.get("key")
+    hit["details"]["tone"] = "changed again"
+    
+    assert backend.get("key") == {"response": "Hi", "details": {"tone": "warm"}}
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2, ttl=60)
+    backend.set("a", REPLY)
+    backend.set("b", REPLY)
+    backend.get("a")
+    
+    backend.set("c", REPLY)
+    
+    assert backend.get("b") is None
+    assert backend.get("a") == REPLY
+    assert backend.evictions == 1
+
+
+def test_sqlite_backend_expires_entries(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "responses.sqlite3"), max_entries=10, ttl=-1)
+    
+    backend.set("key", REPLY)
+    
+    assert backend.get("key") is None
+
+
+def test_sqlite_backend_enforces_size_bound(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteCacheBackend, "EVICT_EVERY", 1)
+    backend = SQLiteCacheBackend(str(tmp_path / "responses.sqlite3"), max_entries=2, ttl=60)
+    
+    for key in "abc":
+        backend.set(key, REPLY)
+    
+    assert backend.get("a") is None
+    assert backend.get("c") == REPLY
+    assert backend.evictions == 1
+
+
+# --- SentimentChatbot ---------------------------------------------------------
+
+def chatbot(content=None):
+    client = FakeOpenAI()
+    if content is not None:
+        client.chat.completions._content = lambda messages: content
+    bot = SentimentChatbot(client=client)
+    bot.response_cache = ResponseCache(MemoryCacheBackend(max_entries=10, ttl=60))
+    return bot
+
+
+def test_repeated_opener_is_served_from_cache():
+    first = chatbot()
+    first.send_message("Hello!")
+    second = chatbot()
+    second.response_cache = first.response_cache
+    
+    response = second.send_message("hello")
+    
+    assert response["response"] == first.last_response["response"]
+    assert second.client.chat.completions.requests == 0
+    assert second.conversation_history[0]["usage"]["prompt_tokens"] == 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_reply_failing_validation_is_not_cached(stream):
+    bot = chatbot('{"text": "no response field"}')
+    
+    if stream:
+        list(bot.send_message_stream("Hello"))
+    else:
+        bot.send_message("Hello")
+    
+    assert "error" in bot.last_response
+    assert len(bot.response_cache.backend.cache) == 0
+
+
+def test_changing_a_hit_does_not_change_the_cache():
+    bot = chatbot()
+    bot.send_message("Hello")
+    other = chatbot()
+    other.response_cache = bot.response_cache
+    
+    other.send_message("Hello")["response"] = "changed"
+    
+    third = chatbot()
+    third.response_cache = bot.response_cache
+    assert third.send_message("Hello")["response"] == bot.last_response["response"]
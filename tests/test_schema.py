@@ -0,0 +1,96 @@
+"""SchemaMigrator: batches, checkpoints and resuming"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import CREATED_AT, v1_document
+from schema import MIGRATION_ID, SCHEMA_VERSION, SchemaMigrator, read_messages
+
+
+class FailingConversations:
+    """Conversations collection whose bulk_write fails after a number of calls"""
+    
+    def __init__(self, collection, succeed: int):
+        self.collection = collection
+        self.succeed = succeed
+    
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+    
+    def bulk_write(self, operations, ordered=True):
+        if not self.succeed:
+            raise RuntimeError("interrupted")
+        self.succeed -= 1
+        return self.collection.bulk_write(operations, ordered=ordered)
+
+
+@pytest.fixture
+def collections(db):
+    for index in range(5):
+        db.conversations.insert_one(v1_document(index))
+    return db.conversations, db.db["migrations"]
+
+
+def test_migrates_v1_documents(collections):
+    conversations, checkpoints = collections
+    
+    assert SchemaMigrator(conversations, checkpoints, batch_size=2).run() == {"migrated": 5, "skipped": 0}
+    
+    for document in conversations.find():
+        assert document["schema_version"] == SCHEMA_VERSION
+        assert "full_summary" not in document
+        assert document["insights"] == ["Scripted traffic"]
+        assert isinstance(document["messages"][0]["timestamp"], datetime)
+        assert document["updated_at"] == CREATED_AT
+
+
+def test_resumes_from_checkpoint(collections):
+    conversations, checkpoints = collections
+    ids = sorted(document["_id"] for document in conversations.find())
+    
+    with pytest.raises(RuntimeError):
+        SchemaMigrator(FailingConversations(conversations, succeed=1), checkpoints, batch_size=2).run()
+    assert checkpoints.find_one({"_id": MIGRATION_ID})["last_id"] == ids[1]
+    assert conversations.count_documents({"schema_version": SCHEMA_VERSION}) == 2
+    
+    assert SchemaMigrator(conversations, checkpoints, batch_size=2).run() == {"migrated": 3, "skipped": 0}
+    assert conversations.count_documents({"schema_version": SCHEMA_VERSION}) == 5
+    assert checkpoints.find_one({"_id": MIGRATION_ID})["last_id"] == ids[-1]
+
+
+def test_finished_run_is_not_repeated_unless_restarted(collections):
+    conversations, checkpoints = collections
+    SchemaMigrator(conversations, checkpoints, batch_size=2).run()
+    
+    assert SchemaMigrator(conversations, checkpoints, batch_size=2).run() == {"migrated": 0, "skipped": 0}
+    assert SchemaMigrator(conversations, checkpoints, batch_size=2).run(restart=True) == {
+        "migrated": 0, "skipped": 0
+    }
+
+
+def test_compresses_old_conversations(db):
+    old = db.conversations.insert_one(v1_document(0, datetime.utcnow() - timedelta(days=40))).inserted_id
+    recent = db.conversations.insert_one(v1_document(1, datetime.utcnow())).inserted_id
+    
+    SchemaMigrator(db.conversations, db.db["migrations"], compress_after_days=30).run()
+    
+    archived = db.conversations.find_one({"_id": old})
+    assert "messages" not in archived
+    assert [turn["user_message"] for turn in read_messages(archived)] == ["message 0", "message 1"]
+    assert "messages_z" not in db.conversations.find_one({"_id": recent})
+
+
+def test_document_changed_meanwhile_is_skipped(collections):
+    conversations, checkpoints = collections
+    target = sorted(document["_id"] for document in conversations.find())[0]
+    
+    class RacingConversations(FailingConversations):
+        def bulk_write(self, operations, ordered=True):
+            conversations.update_one({"_id": target}, {"$inc": {"total_messages": 1}})
+            return conversations.bulk_write(operations, ordered=ordered)
+    
+    result = SchemaMigrator(RacingConversations(conversations, succeed=0), checkpoints, batch_size=5).run()
+    
+    assert result == {"migrated": 4, "skipped": 1}
+    assert conversations.find_one({"_id": target}).get("schema_version", 1) == 1
@@ -0,0 +1,78 @@
+"""SentimentScorer lexicon rules"""
+
+import pytest
+
+from src.core.sentiment import SentimentScorer
+
+
+@pytest.fixture
+def scorer():
+    return SentimentScorer()
+
+
+@pytest.mark.parametrize("text", ["❤️", "❤", "Thanks ❤️"])
+def test_heart_counts_with_or_without_variation_selector(scorer, text):
+    result = scorer.score(text)
+    
+    assert result.score > 0
+    assert "❤" in result.key_indicators
+
+
+def test_neutral_text_scores_zero(scorer):
+    result = scorer.score("I have a question about my account")
+    
+    assert result.score == 0.0
+    assert result.confidence == "low"
+    assert result.key_indicators == []
+
+
+def test_polarity_and_range(scorer):
+    assert scorer.score("This is great, thanks!").score > 0.5
+    assert scorer.score("This is terrible and broken").score < -0.5
+    assert -1.0 <= scorer.score("worst worst worst awful horrible!!!!").score <= 1.0
+
+
+def test_negation_flips_valence(scorer):
+    assert scorer.score("I am happy").score > 0
+    assert scorer.score("I am not happy").score < 0
+    assert scorer.score("I'm not very happy").score < 0
+    assert scorer.score("this isn't bad").score > 0
+    assert "with negation" in scorer.score("not happy").brief_reasoning
+
+
+def test_negation_only_reaches_three_words_back(scorer):
+    assert scorer.score("not that it was really happy").score > 0
+
+
+def test_boosters_intensify_and_dampen(scorer):
+    plain = scorer.score("I am happy").score
+    
+    assert scorer.score("I am extremely happy").score > plain
+    assert scorer.score("I am slightly happy").score < plain
+    assert scorer.score("I am extremely upset").score < scorer.score("I am upset").score
+
+
+def test_contrast_weights_the_clause_after_but(scorer):
+    assert scorer.score("The app is great but the checkout is broken").score < 0
+    assert scorer.score("The app was broken but support was great").score > 0
+    assert scorer.score("great, BUT broken").score == scorer.score("great, but broken").score
+
+
+def test_emphasis(scorer):
+    plain = scorer.score("this is good").score
+    
+    assert scorer.score("this is good!!").score > plain
+    assert scorer.score("this is GOOD").score > plain
+    # All caps is not emphasis when the whole message is shouted
+    assert scorer.score("THIS IS GOOD").score == plain
+
+
+def test_emoticons(scorer):
+    assert scorer.score("thanks :)").score > scorer.score("thanks").score
+    assert scorer.score("still waiting :(").score < 0
+    assert scorer.score("😡").classification == "negative"
+
+
+def test_confidence(scorer):
+    assert scorer.score("good").confidence == "medium"
+    assert scorer.score("good great awesome").confidence == "high"
@@ -0,0 +1,53 @@
+"""ConversationState: turns prepared once, byte-stable payloads"""
+
+import json
+
+from conftest import make_history
+from src.core.context import ContextWindow
+from src.core.state import ConversationState
+
+
+def test_sync_prepares_only_new_turns(estimator):
+    state = ConversationState(estimator)
+    history = make_history(3)
+    state.sync(history)
+    first = state.turns[0]
+    
+    history += make_history(5)[3:]
+    state.sync(history)
+    
+    assert len(state) == 5
+    assert state.turns[0] is first
+    assert state.total_tokens == sum(turn.tokens for turn in state.turns)
+
+
+def test_turn_messages_and_tokens(estimator):
+    state = ConversationState(estimator)
+    
+    turn = state.append_turn("Hi there", 'Say "hello"')
+    
+    assert turn.user_message == {"role": "user", "content": "Hi there"}
+    assert json.loads(turn.assistant_message["content"]) == {"response": 'Say "hello"'}
+    assert turn.tokens == (estimator.count_message(turn.user_message)
+                           + estimator.count_message(turn.assistant_message))
+
+
+def test_slices_from_a_turn(estimator):
+    state = ConversationState(estimator)
+    state.sync(make_history(4))
+    
+    assert state.messages_from(3) == [state.turns[3].user_message, state.turns[3].assistant_message]
+    assert json.loads(b"[" + state.payload_from(1) + b"]") == state.messages_from(1)
+    assert state.payload_from(4) == b""
+
+
+def test_payload_is_the_serialized_request(estimator):
+    context = ContextWindow(token_budget=300, keep_last_turns=2, fold_batch=2, estimator=estimator)
+    history = make_history(12, words=5)
+    history[0]["user_message"] = "Ünïcode and \"quotes\" stay byte-stable"
+    
+    payload = context.payload_bytes("System prompt.", history)
+    
+    messages = context.build_messages("System prompt.", history)
+    assert payload == json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert context.payload_bytes("System prompt.", history) == payload
@@ -0,0 +1,54 @@
+"""TokenEstimator heuristics and pre-flight token previews"""
+
+import pytest
+
+from conftest import make_history
+from src.core.context import ContextWindow
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("", 0),
+    ("hi", 1),
+    ("hello", 2),
+    ("hello, world!", 6),
+    ("internationalization", 5),
+    ("I'm fine", 4)
+])
+def test_heuristic_count(estimator, text, tokens):
+    assert estimator.count(text) == tokens
+
+
+def test_message_overheads(estimator):
+    messages = [{"role": "system", "content": "hello"}, {"role": "user", "content": None}]
+    
+    assert estimator.count_message(messages[0]) == estimator.MESSAGE_OVERHEAD + 2
+    assert estimator.count_message(messages[1]) == estimator.MESSAGE_OVERHEAD
+    assert estimator.count_messages(messages) == 2 * estimator.MESSAGE_OVERHEAD + 2 + estimator.REPLY_PRIMING
+
+
+@pytest.mark.parametrize("turns", [0, 3, 30])
+def test_preview_matches_the_request_it_predicts(estimator, turns):
+    context = ContextWindow(token_budget=500, keep_last_turns=2, summary_max_tokens=100,
+                            fold_batch=1, estimator=estimator)
+    history = make_history(turns, words=5)
+    
+    preview = context.preview_tokens("System prompt.", history, "What next?")
+    
+    request = context.build_messages("System prompt.", history)
+    request.append({"role": "user", "content": "What next?"})
+    assert preview == estimator.count_messages(request)
+
+
+def test_turns_are_counted_once(estimator, monkeypatch):
+    context = ContextWindow(token_budget=100_000, estimator=estimator)
+    history = make_history(5)
+    context.preview_tokens("System prompt.", history, "next")
+    
+    counted = []
+    count = estimator.count
+    monkeypatch.setattr(estimator, "count", lambda text: counted.append(text) or count(text))
+    history += make_history(6)[5:]
+    context.preview_tokens("System prompt.", history, "next")
+    
+    assert history[-1]["user_message"] in counted
+    assert not any(entry["user_message"] in counted for entry in history[:-1])
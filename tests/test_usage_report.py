@@ -0,0 +1,110 @@
+"""Usage report aggregation pipelines"""
+
+from datetime import datetime
+
+import pytest
+
+from config import Config
+from database import USAGE_GROUPS, build_usage_report_pipeline
+from src.utils.constants import API_COSTS
+
+
+def stages(pipeline):
+    return [next(iter(stage)) for stage in pipeline]
+
+
+class RecordingAggregate:
+    """Stand-in for collection.aggregate that keeps the pipeline it was given"""
+    
+    def __init__(self):
+        self.pipeline = None
+    
+    def __call__(self, pipeline, **kwargs):
+        self.pipeline = pipeline
+        return iter([])
+
+
+@pytest.mark.parametrize("fixture, unioned", [("db", False), ("bucketed_db", True)])
+def test_buckets_are_unioned_only_in_bucketed_mode(request, fixture, unioned):
+    db = request.getfixturevalue(fixture)
+    db.conversations.aggregate = RecordingAggregate()
+    
+    db.usage_report("user", limit=5)
+    
+    assert ("$unionWith" in stages(db.conversations.aggregate.pipeline)) is unioned
+    assert db.conversations.aggregate.pipeline[-1] == {"$limit": 5}
+    if unioned:
+        union = next(stage for stage in db.conversations.aggregate.pipeline if "$unionWith" in stage)
+        assert union["$unionWith"]["coll"] == Config.MESSAGES_COLLECTION
+
+
+# --- build_usage_report_pipeline ---------------------------------------------------
+
+SINCE = datetime(2026, 10, 1)
+
+
+def evaluate(expression, turn):
+    """Value of the arithmetic expressions the cost stage uses, for one turn"""
+    if isinstance(expression, str) and expression.startswith("$turn."):
+        value = turn
+        for part in expression.split(".")[1:]:
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+    if not isinstance(expression, dict):
+        return expression
+    op, args = next(iter(expression.items()))
+    values = [evaluate(arg, turn) for arg in args]
+    if op == "$ifNull":
+        return values[0] if values[0] is not None else values[1]
+    if op == "$add":
+        return sum(values)
+    if op == "$subtract":
+        return values[0] - values[1]
+    if op == "$multiply":
+        return values[0] * values[1]
+    if op == "$divide":
+        return values[0] / values[1]
+    raise NotImplementedError(op)
+
+
+def test_unknown_grouping_is_rejected():
+    with pytest.raises(ValueError, match="Unknown usage grouping"):
+        build_usage_report_pipeline("week")
+
+
+def test_turns_without_telemetry_are_skipped():
+    pipeline = build_usage_report_pipeline("model")
+    
+    assert stages(pipeline) == ["$unwind", "$project", "$match", "$group", "$project", "$sort"]
+    assert pipeline[2] == {"$match": {"turn.latency_ms": {"$type": "number"}}}
+    assert pipeline[3]["$group"]["_id"] == USAGE_GROUPS["model"]
+    assert pipeline[-1] == {"$sort": {"group": 1}}
+
+
+def test_since_filters_conversations_buckets_and_turns():
+    pipeline = build_usage_report_pipeline("day", SINCE, "messages")
+    
+    assert pipeline[0] == {"$match": {"$or": [
+        {"updated_at": {"$gte": SINCE}}, {"completed_at": {"$gte": SINCE}}
+    ]}}
+    union = next(stage["$unionWith"] for stage in pipeline if "$unionWith" in stage)
+    assert union["pipeline"][0] == {"$match": {"updated_at": {"$gte": SINCE}}}
+    turn_filter = next(stage["$match"] for stage in pipeline if "turn.latency_ms" in stage.get("$match", {}))
+    assert turn_filter["turn.timestamp"] == {"$gte": SINCE}
+
+
+def test_conversations_are_ranked_by_largest_prompt():
+    pipeline = build_usage_report_pipeline("conversation")
+    
+    assert pipeline[-1] == {"$sort": {"max_prompt_tokens": -1}}
+    assert pipeline[-2]["$project"]["p95_ms"] == {"$arrayElemAt": ["$latency", 1]}
+
+
+def test_cost_discounts_cached_input():
+    cost = build_usage_report_pipeline("user")[3]["$group"]["cost"]["$sum"]
+    turn = {"usage": {"prompt_tokens": 1000, "cached_tokens": 400, "completion_tokens": 200}}
+    
+    assert evaluate(cost, turn) == pytest.approx(
+        (600 * API_COSTS["input"] + 400 * API_COSTS["cached_input"] + 200 * API_COSTS["output"]) / 1_000_000
+    )
+    assert evaluate(cost, {"usage": {}}) == 0